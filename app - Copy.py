@@ -9,6 +9,7 @@ Features:
 - Visual results display
 - JSON output download
 - Preprocessing visualization
+- Re-OCR of selected detections / drawn-in regions (recognition only)
 """
 
 import streamlit as st
@@ -22,6 +23,7 @@ import sys
 
 # Import OCR system
 from main import IndustrialOCRSystem
+from detections import json_default
 
 # Page configuration
 st.set_page_config(
@@ -168,17 +170,16 @@ def main():
             with st.spinner("Running OCR inference..."):
                 detections = ocr_system.run_ocr(image_cv, preprocessed)
             
-            # Filter by confidence
-            filtered_detections = [
-                d for d in detections 
-                if d['confidence'] >= confidence_threshold
-            ]
+            # Filter by confidence (vectorized over the confidence column)
+            filtered_detections = detections.subset(
+                detections.confidence >= confidence_threshold
+            )
             
             # Display results
             st.markdown("---")
             st.subheader("📊 OCR Results")
             
-            if not filtered_detections:
+            if not len(filtered_detections):
                 st.warning("No text detected above confidence threshold. Try lowering the threshold.")
                 return
             
@@ -189,11 +190,11 @@ def main():
                 st.metric("Total Detections", len(filtered_detections))
             
             with col_m2:
-                avg_conf = np.mean([d['confidence'] for d in filtered_detections])
+                avg_conf = filtered_detections.mean_confidence()
                 st.metric("Avg Confidence", f"{avg_conf:.2%}")
             
             with col_m3:
-                high_conf = sum(1 for d in filtered_detections if d['confidence'] > 0.8)
+                high_conf = int((filtered_detections.confidence > 0.8).sum())
                 st.metric("High Confidence", high_conf)
             
             with col_m4:
@@ -261,16 +262,18 @@ def main():
                 uploaded_file.name
             )
             
+            json_str = json.dumps(output_data, indent=2, ensure_ascii=False,
+                                  default=json_default)
+            
             # Display JSON in expandable section
             with st.expander("View JSON", expanded=False):
-                st.json(output_data)
+                st.json(json_str)
             
             # Download buttons
             col_d1, col_d2 = st.columns(2)
             
             with col_d1:
                 # Download JSON
-                json_str = json.dumps(output_data, indent=2, ensure_ascii=False)
                 st.download_button(
                     label="⬇️ Download JSON",
                     data=json_str,
@@ -293,6 +296,72 @@ def main():
             
             # Success message
             st.success(f"✅ OCR completed successfully! Detected {len(filtered_detections)} text regions.")
+            
+            # Keep the result for re-OCR of single regions
+            st.session_state['ocr_result'] = {'file': uploaded_file.name, 'output': output_data}
+        
+        # Re-OCR selected regions of the last result (recognition only)
+        last = st.session_state.get('ocr_result')
+        if last is not None and last['file'] == uploaded_file.name:
+            st.markdown("---")
+            st.subheader("✏️ Re-OCR Regions")
+            result = last['output']
+            detections = result['detections']
+            
+            selected = st.multiselect(
+                "Detections to read again",
+                options=list(range(len(detections))),
+                format_func=lambda i: f"{i}: {detections.texts[i]} ({detections.confidence[i]:.2f})"
+            )
+            roi_text = st.text_input(
+                "Additional regions (x1,y1,x2,y2; ...)",
+                help="Pixel rectangles in the original image, separated by ';'. "
+                     "Detections mostly inside a region are replaced."
+            )
+            allowlist = st.text_input(
+                "Allowed characters (optional)",
+                help="Restrict recognition to these characters, e.g. 0123456789-"
+            )
+            
+            if st.button("🔁 Re-run Recognition", use_container_width=True):
+                try:
+                    rois = [[int(v) for v in part.split(',')] for part in roi_text.split(';') if part.strip()]
+                    if any(len(roi) != 4 for roi in rois):
+                        raise ValueError
+                except ValueError:
+                    st.error("Regions must be four integers each: x1,y1,x2,y2")
+                    return
+                if not selected and not rois:
+                    st.warning("Select detections or enter regions to read again.")
+                    return
+                
+                ocr_system = load_ocr_system(use_gpu)
+                with st.spinner("Re-running recognition..."):
+                    updated = ocr_system.reocr_regions(
+                        image_cv, result, indices=selected, rois=rois,
+                        params={'allowlist': allowlist} if allowlist else None
+                    )
+                last['output'] = updated
+                
+                import pandas as pd
+                st.dataframe(pd.DataFrame([
+                    {
+                        'Text': d['text'],
+                        'Confidence': f"{d['confidence']:.2%}",
+                        'Bounding Box': f"({d['bbox'][0]}, {d['bbox'][1]}) - ({d['bbox'][2]}, {d['bbox'][3]})",
+                        'Re-read': '✔' if d.get('reocr') else ''
+                    }
+                    for d in updated['detections']
+                ]), use_container_width=True)
+                
+                st.download_button(
+                    label="⬇️ Download Updated JSON",
+                    data=json.dumps(updated, indent=2, ensure_ascii=False, default=json_default),
+                    file_name=f"{Path(uploaded_file.name).stem}_ocr.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+                st.success(f"✅ Re-read {updated['metadata']['reocr']['recognized']} region(s).")
     
     else:
         # Instructions when no file uploaded
@@ -0,0 +1,648 @@
+"""
+Benchmark Suite for Industrial OCR System
+==========================================
+Measures the cost of pipeline components that do not need the OCR model
+(preprocess --ocr additionally loads it to compare recognition accuracy)
+
+Usage:
+- python benchmark.py detections --count 1000000
+- python benchmark.py serialize --images 2000
+- python benchmark.py lexicon --codes 150000
+- python benchmark.py memory --megapixels 48
+- python benchmark.py logging --images 2000
+- python benchmark.py preprocess --images 50 [--manifest labels.jsonl] [--ocr]
+- python benchmark.py pipeline --images 50 [--latency-ms 0] [--format json]
+"""
+
+import gc
+import os
+import copy
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from detections import DetectionSet
+from lexicon import CodeLexicon
+from log_config import DETECTION_LOGGER, setup_logging, shutdown_logging
+from memory_budget import MemoryBudget, MemoryTracker
+from preprocessing import (FastPreprocessor, apply_adaptive_threshold, apply_bilateral,
+                           apply_clahe, apply_morphology, deskew, preprocess_params, to_gray)
+from serializers import ColumnarBatchWriter, available_serializers, get_serializer
+
+
+def _synthetic_readtext(rng: np.random.Generator, count: int):
+    """Generate EasyOCR-shaped (bbox, text, confidence) tuples."""
+    results = []
+    for i in range(count):
+        x, y = rng.integers(0, 3000, size=2).tolist()
+        w, h = rng.integers(40, 400, size=2).tolist()
+        bbox = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+        text = f"SERIAL-{i % 1000:03d}-{i:06d}"
+        # About a third of raw strings carry a stray character
+        raw = text + '.' if i % 3 == 0 else text
+        results.append((bbox, raw, float(rng.random())))
+    return results
+
+
+def _clean(text: str) -> str:
+    return text.rstrip('.')
+
+
+def _legacy_detections(results):
+    """Dict-per-detection representation used before DetectionSet."""
+    detections = []
+    for idx, (bbox, text, confidence) in enumerate(results):
+        bbox_array = np.array(bbox).astype(int)
+        detections.append({
+            'id': f"detection_{idx:03d}",
+            'text': _clean(text),
+            'raw_text': text,
+            'confidence': round(confidence, 3),
+            'bbox': [int(bbox_array[:, 0].min()), int(bbox_array[:, 1].min()),
+                     int(bbox_array[:, 0].max()), int(bbox_array[:, 1].max())],
+            'bbox_polygon': bbox_array.tolist()
+        })
+    return detections
+
+
+def _measure(build) -> Dict:
+    """Return retained bytes and build time of build()."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    gc.collect()
+    return {'retained_mb': current / 1e6, 'peak_mb': peak / 1e6, 'seconds': elapsed}
+
+
+def bench_detection_memory(count: int = 1_000_000, per_image: int = 20,
+                           seed: int = 0) -> Dict:
+    """
+    Compare memory retained by a batch of detections.
+
+    Args:
+        count: Total number of detections in the batch
+        per_image: Detections per image (one container per image)
+        seed: RNG seed for reproducible geometry
+
+    Returns:
+        Dictionary with measurements for both representations
+    """
+    rng = np.random.default_rng(seed)
+    images = [
+        _synthetic_readtext(rng, per_image)
+        for _ in range(max(count // per_image, 1))
+    ]
+
+    legacy = _measure(lambda: [_legacy_detections(r) for r in images])
+    compact = _measure(lambda: [DetectionSet.from_readtext(r, _clean) for r in images])
+
+    return {
+        'detections': len(images) * per_image,
+        'legacy': legacy,
+        'compact': compact,
+        'reduction': legacy['retained_mb'] / max(compact['retained_mb'], 1e-9),
+    }
+
+
+def _synthetic_results(images: int, per_image: int, seed: int = 0):
+    """Generate structure_output()-shaped results without the OCR model."""
+    rng = np.random.default_rng(seed)
+    results = []
+    for i in range(images):
+        detections = DetectionSet.from_readtext(_synthetic_readtext(rng, per_image), _clean)
+        results.append({
+            'metadata': {
+                'filename': f"box_{i:05d}.jpg",
+                'timestamp': f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+                'total_detections': len(detections),
+                'average_confidence': round(detections.mean_confidence(), 3),
+                'high_confidence_count': int((detections.confidence > 0.8).sum()),
+                'processing_version': '1.0.0'
+            },
+            'detections': detections,
+            'summary': {
+                'extracted_texts': list(detections.texts),
+                'quality_score': 'GOOD'
+            }
+        })
+    return results
+
+
+def bench_serializers(images: int = 2000, per_image: int = 20) -> Dict:
+    """
+    Compare encode time and size of the available result formats.
+
+    Args:
+        images: Number of synthetic results
+        per_image: Detections per result
+
+    Returns:
+        {format_name: {'seconds', 'bytes', 'ms_per_image'}}
+    """
+    results = _synthetic_results(images, per_image)
+    report = {}
+
+    for name in available_serializers():
+        serializer = get_serializer(name)
+        start = time.perf_counter()
+        size = sum(len(serializer.dumps(r)) for r in results)
+        elapsed = time.perf_counter() - start
+        report[name] = {
+            'seconds': elapsed,
+            'bytes': size,
+            'ms_per_image': elapsed * 1000 / images,
+        }
+
+    for suffix in ('.parquet', '.arrow'):
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / f"batch{suffix}"
+                start = time.perf_counter()
+                with ColumnarBatchWriter(str(path)) as writer:
+                    for r in results:
+                        writer.add(r)
+                elapsed = time.perf_counter() - start
+                report[f"batch{suffix}"] = {
+                    'seconds': elapsed,
+                    'bytes': os.path.getsize(path),
+                    'ms_per_image': elapsed * 1000 / images,
+                }
+        except ImportError:
+            pass
+
+    return report
+
+
+def bench_lexicon(codes: int = 150_000, queries: int = 2000,
+                  max_distance: int = 1, seed: int = 0) -> Dict:
+    """
+    Measure lexicon build time, index size and lookup latency.
+
+    Queries are lexicon codes with one random substitution, so every
+    query has a correct answer within the distance budget.
+    """
+    rng = np.random.default_rng(seed)
+    letters = np.array(list('ABCDEFGHJKMNPRTUVWXY'))
+    code_list = [
+        f"SKU-{''.join(rng.choice(letters, 3))}-{int(n):06d}"
+        for n in rng.integers(0, 1_000_000, size=codes)
+    ]
+
+    start = time.perf_counter()
+    lexicon = CodeLexicon(code_list, max_distance=max_distance)
+    build = time.perf_counter() - start
+
+    targets = [lexicon.codes[int(i)] for i in rng.integers(0, len(lexicon), size=queries)]
+    noisy = []
+    for code in targets:
+        pos = int(rng.integers(0, len(code)))
+        noisy.append(code[:pos] + str(rng.integers(0, 10)) + code[pos + 1:])
+
+    start = time.perf_counter()
+    matches = [lexicon.lookup(q) for q in noisy]
+    elapsed = time.perf_counter() - start
+
+    correct = sum(1 for m, t in zip(matches, targets) if m is not None and m.code == t)
+    return {
+        'codes': len(lexicon),
+        'build_seconds': build,
+        'index_mb': (lexicon._hashes.nbytes + lexicon._ids.nbytes) / 1e6,
+        'lookup_ms': elapsed * 1000 / queries,
+        'recovered': correct / queries,
+    }
+
+
+def bench_decode_memory(megapixels: float = 48.0, budget_mb: float = 2000.0,
+                        seed: int = 0, grayscale: bool = False) -> Dict:
+    """
+    Peak memory of decode + grayscale/blur at each reduced-decode factor.
+
+    A synthetic JPEG of the given size is written once; each factor is
+    measured in its own tracker stage (tracemalloc covers numpy buffers).
+    Also reports the factor a MemoryBudget of budget_mb would choose.
+    With grayscale, images are decoded single-channel (performance.grayscale)
+    and no colour conversion runs.
+    """
+    rng = np.random.default_rng(seed)
+    side = int(np.sqrt(megapixels * 1e6 / 0.75))
+    w, h = side, int(side * 0.75)
+    # Low-frequency noise compresses like a real photo, unlike white noise
+    small = rng.integers(0, 255, size=(h // 16, w // 16, 3), dtype=np.uint8)
+    image = cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+    flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+             4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+    if grayscale:
+        flags = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+    tracker = MemoryTracker(trace_python=True)
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'large.jpg')
+        cv2.imwrite(path, image)
+        del image, small
+        gc.collect()
+
+        for factor, flag in flags.items():
+            start = time.perf_counter()
+            with tracker.stage(f'reduce_{factor}'):
+                decoded = cv2.imread(path, flag)
+                gray = decoded if decoded.ndim == 2 else cv2.cvtColor(decoded, cv2.COLOR_BGR2GRAY)
+                blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+            elapsed = time.perf_counter() - start
+            record = tracker.stages[f'reduce_{factor}']
+            report[factor] = {
+                'shape': decoded.shape[:2],
+                'python_peak_mb': record['python_peak_mb'],
+                'rss_delta_mb': record['rss_delta_mb'],
+                'seconds': elapsed,
+            }
+            del decoded, gray, blurred
+            gc.collect()
+
+    tracemalloc.stop()
+    return {'size': (w, h), 'factors': report,
+            'budget_choice': MemoryBudget(budget_mb, image_bytes_per_pixel=10.0 if grayscale else 12.0
+                                          ).decode_reduction(w, h)}
+
+
+def _log_image_legacy(log: logging.Logger, name: str, detections):
+    """Log calls of one image as the pipeline made them originally."""
+    log.info(f"Processing image: {name}")
+    log.info("Starting preprocessing pipeline...")
+    log.info("Preprocessing completed successfully")
+    log.info("Running OCR inference...")
+    for text, confidence in detections:
+        log.info(f"Detected: '{text}' (confidence: {confidence:.3f})")
+    log.info(f"OCR completed: {len(detections)} text regions detected")
+    log.info(f"JSON saved: outputs/{name}.json")
+    log.info(f"Annotated image saved: outputs/{name}_annotated.jpg")
+    log.info(f"Processing completed successfully")
+
+
+def _log_image_current(log: logging.Logger, det_log: logging.Logger, name: str,
+                       detections):
+    """Log calls of one image as the pipeline makes them now."""
+    log.debug("Processing image: %s", name)
+    log.debug("Starting preprocessing pipeline...")
+    log.debug("Preprocessing completed successfully")
+    log.debug("Running OCR inference...")
+    if det_log.isEnabledFor(logging.DEBUG):
+        for text, confidence in detections:
+            det_log.debug("Detected: '%s' (confidence: %.3f)", text, confidence)
+    log.debug("OCR completed: %d text regions detected", len(detections))
+    log.debug("JSON saved: %s", name)
+    log.debug("Annotated image saved: %s", name)
+    log.info("%s: %d detections, avg confidence %.3f, %.0f ms", name, len(detections),
+             0.85, 120.0, extra={'image': name, 'detections': len(detections)})
+
+
+def bench_logging(images: int = 2000, per_image: int = 20) -> Dict:
+    """
+    Logging cost per image on the pipeline thread.
+
+    legacy:     synchronous file + console handlers, INFO per stage and
+                per detection (the original basicConfig setup)
+    queue:      setup_logging() defaults (queue listener, one summary line)
+    queue-json: same with structured JSON records
+    Console output goes to os.devnull; the file goes to a temp folder.
+    """
+    detections = [(f"SERIAL-{i:04d}", 0.5 + i / (2 * per_image)) for i in range(per_image)]
+    log = logging.getLogger('bench.pipeline')
+    det_log = logging.getLogger(DETECTION_LOGGER)
+    root = logging.getLogger()
+    report = {}
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        for name in ('legacy', 'queue', 'queue-json'):
+            log_file = str(Path(tmp) / f"{name}.log")
+            with redirect_stdout(devnull):
+                if name == 'legacy':
+                    setup_logging({'file': log_file}, use_queue=False)
+                else:
+                    setup_logging({'file': log_file, 'structured': name == 'queue-json'})
+
+            start = time.perf_counter()
+            for i in range(images):
+                if name == 'legacy':
+                    _log_image_legacy(log, f"img_{i:05d}.jpg", detections)
+                else:
+                    _log_image_current(log, det_log, f"img_{i:05d}.jpg", detections)
+            elapsed = time.perf_counter() - start
+            # Drain the listener so its I/O is not charged to the next run
+            shutdown_logging()
+            drained = time.perf_counter() - start
+
+            report[name] = {
+                'us_per_image': elapsed * 1e6 / images,
+                'drained_us_per_image': drained * 1e6 / images,
+                'log_bytes': os.path.getsize(log_file),
+            }
+            for handler in root.handlers[:]:
+                root.removeHandler(handler)
+                handler.close()
+
+    return report
+
+
+def _preprocess_inputs(images: int, manifest: Optional[str],
+                       seed: int) -> Iterator[Tuple[np.ndarray, List[str]]]:
+    """(image, expected texts) from a labelled set or the synthetic generator."""
+    if manifest:
+        from tuner import load_manifest
+        for entry in load_manifest(manifest)[:images]:
+            yield cv2.imread(entry.path), entry.texts
+    else:
+        from synth_dataset import render_sample
+        for i in range(images):
+            image, sample = render_sample(i, seed, size=(1920, 1440))
+            yield image, sample.texts
+
+
+def _standard_chain(image: np.ndarray, params: Dict) -> np.ndarray:
+    enhanced = apply_clahe(to_gray(image), params['clahe'])
+    binary = apply_adaptive_threshold(apply_bilateral(enhanced, params['bilateral']),
+                                      params['adaptive_threshold'])
+    return deskew(apply_morphology(binary, params['morphology']), params['deskew'])
+
+
+def bench_preprocess(images: int = 50, manifest: Optional[str] = None, ocr: bool = False,
+                     config: Optional[Dict] = None, seed: int = 0) -> Dict:
+    """
+    Standard vs. fast preprocessing: time per image and output parity.
+    
+    Parity compares the binary outputs pixel by pixel: agreement over the
+    whole image, and IoU of the minority value (the text strokes, or the
+    background for light-on-dark labels).
+    With ocr=True both chains also feed the OCR engine and are scored
+    against the expected texts (exact-match F1, as in tuner.py).
+    """
+    config = config or {}
+    params = preprocess_params(config.get('preprocessing'))
+    fast = FastPreprocessor(params)
+
+    systems = {}
+    if ocr:
+        from main import IndustrialOCRSystem
+        from tuner import score_texts
+        for profile in ('standard', 'fast'):
+            profile_config = copy.deepcopy(config)
+            profile_config.setdefault('preprocessing', {})['profile'] = profile
+            systems[profile] = IndustrialOCRSystem(config=profile_config)
+
+    times = {'standard': [], 'fast': []}
+    agreement, iou = [], []
+    counts = {name: np.zeros(3) for name in systems}
+    for image, texts in _preprocess_inputs(images, manifest, seed):
+        start = time.perf_counter()
+        standard = _standard_chain(image, params)
+        times['standard'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        quick, _ = fast.apply(image)
+        times['fast'].append(time.perf_counter() - start)
+
+        agreement.append(float((standard == quick).mean()))
+        minority = 0 if (standard == 0).mean() < 0.5 else 255
+        a, b = standard == minority, quick == minority
+        union = np.logical_or(a, b).sum()
+        iou.append(float(np.logical_and(a, b).sum() / union) if union else 1.0)
+
+        for name, system in systems.items():
+            preprocessed, _ = system.preprocess_image(image)
+            detections = system.run_ocr(image, preprocessed)
+            counts[name] += score_texts(detections.texts, texts)[:3]
+
+    report = {
+        name: {'ms_per_image': 1000 * float(np.mean(t)), 'p95_ms': 1000 * float(np.percentile(t, 95))}
+        for name, t in times.items()
+    }
+    report['speedup'] = report['standard']['ms_per_image'] / report['fast']['ms_per_image']
+    report['pixel_agreement'] = float(np.mean(agreement))
+    report['text_iou'] = float(np.mean(iou))
+    report['images'] = len(agreement)
+    for name, (matches, predicted, expected) in counts.items():
+        precision = matches / predicted if predicted else 0.0
+        recall = matches / expected if expected else 0.0
+        report[name]['ocr_f1'] = (2 * precision * recall / (precision + recall)
+                                  if precision + recall else 0.0)
+    return report
+
+
+PIPELINE_STAGES = ('load', 'preprocess', 'ocr', 'structure', 'serialize', 'save')
+
+
+def bench_pipeline(images: int = 50, latency_ms: float = 0.0, per_region_ms: float = 0.0,
+                   regions: int = 6, output_format: str = 'json',
+                   manifest: Optional[str] = None, seed: int = 0) -> Dict:
+    """
+    Cost of the pipeline around the model, with the stub engine.
+    
+    Every image goes through the steps of process_image, each timed on
+    its own: load (decode), preprocess, ocr (stub, includes the simulated
+    latency), structure, serialize (encode only) and save (result file +
+    annotated image). A second pass through process_image gives the
+    end-to-end time; overhead = end-to-end - simulated model time.
+    """
+    from main import IndustrialOCRSystem
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if manifest:
+            from tuner import load_manifest
+            paths = [entry.path for entry in load_manifest(manifest)[:images]]
+        else:
+            paths = []
+            for i, (image, _) in enumerate(_preprocess_inputs(images, None, seed)):
+                path = tmp / f"stub_{i:04d}.jpg"
+                cv2.imwrite(str(path), image)
+                paths.append(str(path))
+        
+        config = {'ocr': {'engine_options': {'stub': {
+            'regions': regions, 'latency_ms': latency_ms,
+            'per_region_ms': per_region_ms, 'seed': seed}}}}
+        system = IndustrialOCRSystem(config=config, engine='stub', output_format=output_format)
+        system.output_dir = tmp / 'outputs'
+        system.output_dir.mkdir()
+        
+        times = {stage: [] for stage in PIPELINE_STAGES}
+        for path in paths:
+            stamps = [time.perf_counter()]
+            image, _ = system._load_image(path)
+            stamps.append(time.perf_counter())
+            preprocessed, _ = system.preprocess_image(image)
+            stamps.append(time.perf_counter())
+            detections = system.run_ocr(image, preprocessed, system.plan_scale(preprocessed))
+            stamps.append(time.perf_counter())
+            output_data = system.structure_output(detections, Path(path).name)
+            stamps.append(time.perf_counter())
+            system.serializer.dumps(output_data)
+            stamps.append(time.perf_counter())
+            system.save_results(output_data, image, detections, Path(path).stem)
+            stamps.append(time.perf_counter())
+            for stage, begin, end in zip(PIPELINE_STAGES, stamps, stamps[1:]):
+                times[stage].append(end - begin)
+        
+        end_to_end = []
+        for path in paths:
+            start = time.perf_counter()
+            system.process_image(path)
+            end_to_end.append(time.perf_counter() - start)
+    
+    report = {
+        stage: {'ms_per_image': 1000 * float(np.mean(t)), 'p95_ms': 1000 * float(np.percentile(t, 95))}
+        for stage, t in times.items()
+    }
+    report['end_to_end'] = {'ms_per_image': 1000 * float(np.mean(end_to_end)),
+                            'p95_ms': 1000 * float(np.percentile(end_to_end, 95))}
+    report['model_ms'] = latency_ms + per_region_ms * regions
+    report['overhead_ms'] = report['end_to_end']['ms_per_image'] - report['model_ms']
+    report['images'] = len(paths)
+    return report
+
+
+def _print_header(title: str):
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def main():
+    """Benchmark CLI entry point."""
+    parser = argparse.ArgumentParser(description='Industrial OCR benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    det_p = sub.add_parser('detections', help='Detection representation memory')
+    det_p.add_argument('--count', type=int, default=1_000_000, help='Total detections')
+    det_p.add_argument('--per-image', type=int, default=20, help='Detections per image')
+
+    ser_p = sub.add_parser('serialize', help='Result format encode time and size')
+    ser_p.add_argument('--images', type=int, default=2000, help='Number of results')
+    ser_p.add_argument('--per-image', type=int, default=20, help='Detections per image')
+
+    lex_p = sub.add_parser('lexicon', help='Lexicon build time and lookup latency')
+    lex_p.add_argument('--codes', type=int, default=150_000, help='Number of codes')
+    lex_p.add_argument('--queries', type=int, default=2000, help='Number of lookups')
+    lex_p.add_argument('--max-distance', type=int, default=1, help='Edit distance budget')
+
+    mem_p = sub.add_parser('memory', help='Reduced-decode memory and budget choice')
+    mem_p.add_argument('--megapixels', type=float, default=48.0, help='Synthetic image size')
+    mem_p.add_argument('--budget', type=float, default=2000.0, help='Memory budget in MB')
+    mem_p.add_argument('--grayscale', action='store_true', help='Single-channel decode')
+
+    log_p = sub.add_parser('logging', help='Logging overhead per image')
+    log_p.add_argument('--images', type=int, default=2000, help='Number of images')
+    log_p.add_argument('--per-image', type=int, default=20, help='Detections per image')
+
+    pre_p = sub.add_parser('preprocess', help='Standard vs. fast preprocessing profile')
+    pre_p.add_argument('--images', type=int, default=50, help='Number of images')
+    pre_p.add_argument('--manifest', type=str,
+                       help='Labelled set (JSONL); default: synthetic stencil images')
+    pre_p.add_argument('--ocr', action='store_true',
+                       help='Also compare OCR accuracy (loads the model)')
+    pre_p.add_argument('--config', type=str, help='YAML configuration (preprocessing section)')
+
+    pipe_p = sub.add_parser('pipeline', help='Per-stage pipeline cost with the stub engine')
+    pipe_p.add_argument('--images', type=int, default=50, help='Number of images')
+    pipe_p.add_argument('--manifest', type=str,
+                        help='Labelled set (JSONL); default: synthetic stencil images')
+    pipe_p.add_argument('--latency-ms', type=float, default=0.0,
+                        help='Simulated detector time per image')
+    pipe_p.add_argument('--per-region-ms', type=float, default=0.0,
+                        help='Simulated recognizer time per region')
+    pipe_p.add_argument('--regions', type=int, default=6, help='Detections per image')
+    pipe_p.add_argument('--format', type=str, default='json', help='Result format')
+
+    args = parser.parse_args()
+
+    if args.command == 'detections':
+        _print_header(f"DETECTION MEMORY ({args.count:,} detections)")
+        r = bench_detection_memory(args.count, args.per_image)
+        for name in ('legacy', 'compact'):
+            m = r[name]
+            print(f"  {name:<8} retained: {m['retained_mb']:8.1f} MB | "
+                  f"peak: {m['peak_mb']:8.1f} MB | build: {m['seconds']:.2f} s")
+        print(f"  Reduction: {r['reduction']:.1f}x")
+
+    elif args.command == 'serialize':
+        _print_header(f"SERIALIZATION ({args.images:,} images x {args.per_image} detections)")
+        report = bench_serializers(args.images, args.per_image)
+        baseline = report['json']
+        for name, m in report.items():
+            print(f"  {name:<15} {m['ms_per_image']:7.3f} ms/image | "
+                  f"{m['bytes'] / 1e6:8.2f} MB | "
+                  f"{baseline['seconds'] / m['seconds']:5.1f}x faster | "
+                  f"{m['bytes'] / baseline['bytes']:5.2f}x size")
+
+    elif args.command == 'lexicon':
+        _print_header(f"LEXICON ({args.codes:,} codes, max_distance={args.max_distance})")
+        r = bench_lexicon(args.codes, args.queries, args.max_distance)
+        print(f"  Build: {r['build_seconds']:.2f} s | index: {r['index_mb']:.1f} MB")
+        print(f"  Lookup: {r['lookup_ms']:.3f} ms | recovered: {r['recovered']:.1%}")
+
+    elif args.command == 'memory':
+        _print_header(f"DECODE MEMORY ({args.megapixels:g} MP JPEG, "
+                      f"{'grayscale' if args.grayscale else 'colour'})")
+        r = bench_decode_memory(args.megapixels, args.budget, grayscale=args.grayscale)
+        for factor, m in r['factors'].items():
+            print(f"  1/{factor:<3} {m['shape'][1]:>6}x{m['shape'][0]:<6} "
+                  f"peak: {m['python_peak_mb']:8.1f} MB | "
+                  f"rss delta: {m['rss_delta_mb']:8.1f} MB | {m['seconds'] * 1000:7.1f} ms")
+        print(f"  Budget {args.budget:g} MB -> decode at 1/{r['budget_choice']}")
+
+    elif args.command == 'logging':
+        _print_header(f"LOGGING ({args.images:,} images x {args.per_image} detections)")
+        report = bench_logging(args.images, args.per_image)
+        for name, m in report.items():
+            print(f"  {name:<11} {m['us_per_image']:8.1f} us/image on pipeline thread | "
+                  f"{m['drained_us_per_image']:8.1f} us/image incl. I/O | "
+                  f"{m['log_bytes'] / 1e6:6.2f} MB")
+
+    elif args.command == 'preprocess':
+        source = args.manifest or 'synthetic 1920x1440'
+        _print_header(f"PREPROCESSING PROFILES ({args.images} images, {source})")
+        config = {}
+        if args.config:
+            import yaml
+            with open(args.config, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+        r = bench_preprocess(args.images, args.manifest, args.ocr, config)
+        for name in ('standard', 'fast'):
+            m = r[name]
+            line = f"  {name:<9} {m['ms_per_image']:8.1f} ms/image | p95 {m['p95_ms']:8.1f} ms"
+            if 'ocr_f1' in m:
+                line += f" | OCR F1 {m['ocr_f1']:.3f}"
+            print(line)
+        print(f"  Speedup: {r['speedup']:.1f}x | pixel agreement {r['pixel_agreement']:.1%} | "
+              f"text IoU {r['text_iou']:.1%}")
+        if args.ocr:
+            print(f"  OCR F1 difference (fast - standard): "
+                  f"{r['fast']['ocr_f1'] - r['standard']['ocr_f1']:+.3f}")
+
+    elif args.command == 'pipeline':
+        source = args.manifest or 'synthetic 1920x1440'
+        _print_header(f"PIPELINE WITH STUB ENGINE ({args.images} images, {source}, {args.format})")
+        r = bench_pipeline(args.images, args.latency_ms, args.per_region_ms, args.regions,
+                           args.format, args.manifest)
+        for name in PIPELINE_STAGES + ('end_to_end',):
+            m = r[name]
+            print(f"  {name:<11} {m['ms_per_image']:8.2f} ms/image | p95 {m['p95_ms']:8.2f} ms")
+        print(f"  Simulated model: {r['model_ms']:.1f} ms | pipeline overhead: "
+              f"{r['overhead_ms']:.1f} ms/image")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Multi-Frame Consensus for Industrial OCR System
+================================================
+Read the same box from several photos and stop once the frames agree
+
+Why:
+- Critical serials are photographed several times; reading all frames
+  and comparing by hand is slow, and reading all of them is often
+  unnecessary (two clean frames that agree settle the question)
+
+TECHNICAL APPROACH:
+- Alignment: each detection joins the field whose current reading is
+  closest by normalized edit distance (handheld frames move, so text is
+  a better key than position); unmatched detections open a new field
+- Voting: per field, candidate readings are weighted by confidence;
+  when frames disagree, equal-length readings are combined position by
+  position (each frame may get a different character wrong)
+- Early stopping: consensus is reached when every field seen in at
+  least half the frames is read identically by min_agreement frames
+
+Usage:
+    result = ocr_system.process_frames(['box_1.jpg', 'box_2.jpg', ...])
+    result['metadata']['consensus']  # frames used, per-field votes
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from detections import DetectionSet
+from lexicon import edit_distance
+
+logger = logging.getLogger(__name__)
+
+
+class Reading(NamedTuple):
+    """One frame's reading of a field."""
+    frame: int
+    index: int          # row in that frame's DetectionSet
+    text: str
+    confidence: float
+
+
+class FieldVote(NamedTuple):
+    """Voting outcome for one field."""
+    text: str
+    confidence: float   # mean confidence of the readings that agree
+    agreeing: int       # frames reading exactly `text`
+    seen: int           # frames in which the field was detected
+    share: float        # confidence-weighted share of `text`
+
+
+def _distance_ratio(a: str, b: str) -> float:
+    """Edit distance normalized by the longer string (0 = identical)."""
+    longest = max(len(a), len(b), 1)
+    return edit_distance(a, b, max_distance=longest) / longest
+
+
+class ConsensusVoter:
+    """
+    Accumulate detections of one object over frames and vote per field.
+
+    Key Features:
+    - Text-based alignment across frames (one reading per field per frame)
+    - Confidence-weighted string vote, character-level fallback
+    - reached() tells the caller when further frames are unnecessary
+    """
+
+    def __init__(self, min_agreement: int = 2, min_frames: int = 2,
+                 match_distance: float = 0.34, min_presence: float = 0.5):
+        """
+        Args:
+            min_agreement: Frames that must read a field identically
+            min_frames: Frames processed before consensus can be declared
+            match_distance: Maximum normalized edit distance for a
+                            detection to join an existing field
+            min_presence: Fields detected in fewer than this fraction of
+                          frames are treated as noise for the stop rule
+        """
+        self.min_agreement = min_agreement
+        self.min_frames = max(min_frames, min_agreement)
+        self.match_distance = match_distance
+        self.min_presence = min_presence
+
+        self.frames: List[DetectionSet] = []
+        self.fields: List[List[Reading]] = []
+
+    def add(self, detections: DetectionSet) -> int:
+        """
+        Align one frame's detections to the fields.
+
+        Returns:
+            Index of the added frame
+        """
+        frame = len(self.frames)
+        self.frames.append(detections)
+        keys = [self.vote(field).text for field in self.fields]
+        taken = set()
+
+        # Most confident detections choose their field first
+        for i in np.argsort(-detections.confidence).tolist():
+            text = detections.texts[i]
+            if not text:
+                continue
+            best, best_dist = None, self.match_distance
+            for f, key in enumerate(keys):
+                if f in taken:
+                    continue
+                dist = _distance_ratio(text, key)
+                if dist <= best_dist:
+                    best, best_dist = f, dist
+            reading = Reading(frame, i, text, float(detections.confidence[i]))
+            if best is None:
+                self.fields.append([reading])
+                keys.append(text)
+                taken.add(len(self.fields) - 1)
+            else:
+                self.fields[best].append(reading)
+                taken.add(best)
+        return frame
+
+    def vote(self, readings: List[Reading]) -> FieldVote:
+        """Confidence-weighted reading of one field."""
+        weights: Dict[str, float] = defaultdict(float)
+        for r in readings:
+            weights[r.text] += max(r.confidence, 1e-3)
+        total = sum(weights.values())
+        text = max(weights, key=lambda t: (weights[t], t))
+
+        agreeing = [r for r in readings if r.text == text]
+        if len(agreeing) < 2 and len(weights) > 1:
+            # No two frames agree: combine character by character
+            text = self._character_vote(readings)
+            agreeing = [r for r in readings if r.text == text]
+
+        confidence = (float(np.mean([r.confidence for r in agreeing])) if agreeing
+                      else float(np.mean([r.confidence for r in readings])))
+        return FieldVote(text, round(confidence, 3), len(agreeing), len(readings),
+                         round(weights.get(text, 0.0) / total, 3))
+
+    @staticmethod
+    def _character_vote(readings: List[Reading]) -> str:
+        """Per-position weighted vote over readings of the dominant length."""
+        by_length: Dict[int, float] = defaultdict(float)
+        for r in readings:
+            by_length[len(r.text)] += r.confidence
+        length = max(by_length, key=by_length.get)
+        same = [r for r in readings if len(r.text) == length]
+
+        chars = []
+        for pos in range(length):
+            votes: Dict[str, float] = defaultdict(float)
+            for r in same:
+                votes[r.text[pos]] += max(r.confidence, 1e-3)
+            chars.append(max(votes, key=lambda c: (votes[c], c)))
+        return ''.join(chars)
+
+    def _relevant_fields(self) -> List[List[Reading]]:
+        needed = self.min_presence * len(self.frames)
+        return [field for field in self.fields if len(field) >= needed]
+
+    def reached(self) -> bool:
+        """True once every relevant field has min_agreement identical readings."""
+        if len(self.frames) < self.min_frames:
+            return False
+        relevant = self._relevant_fields()
+        return bool(relevant) and all(
+            self.vote(field).agreeing >= self.min_agreement for field in relevant
+        )
+
+    def result(self) -> Tuple[DetectionSet, List[Dict]]:
+        """
+        Consensus detections and per-field vote summaries.
+
+        Geometry of each field comes from its most confident agreeing
+        reading; the 'frame' column says which frame that is.
+        """
+        rows, summaries = [], []
+        for field in self._relevant_fields():
+            vote = self.vote(field)
+            agreeing = [r for r in field if r.text == vote.text] or field
+            best = max(agreeing, key=lambda r: r.confidence)
+            source = self.frames[best.frame]
+
+            row = source.subset([best.index])
+            row.texts[0] = vote.text
+            if vote.text != best.text:
+                row.raw_texts[0] = best.text
+            row.confidence[0] = vote.confidence
+            row.set_column('frame', [best.frame])
+            row.set_column('votes', [vote.agreeing])
+            row.set_column('frames_seen', [vote.seen])
+            rows.append(row)
+            summaries.append({
+                'text': vote.text,
+                'agreeing_frames': vote.agreeing,
+                'seen_in_frames': vote.seen,
+                'vote_share': vote.share,
+                'readings': [r.text for r in field],
+            })
+        return DetectionSet.concat(rows), summaries
+
+    def reference_frame(self) -> Optional[int]:
+        """Frame supplying the most consensus geometry (for annotation)."""
+        detections, _ = self.result()
+        if not len(detections):
+            return None
+        frames = detections.extra['frame']
+        return max(set(frames), key=frames.count)
@@ -0,0 +1,222 @@
+"""
+Deadline-Aware Processing for Industrial OCR System
+====================================================
+Per-image time budget with graceful degradation
+
+Why:
+- Inline stations need a result in under ~1 s per image; the full
+  pipeline takes 2-5 s on CPU
+- Missing the deadline is worse than a slightly less careful read, so
+  when time runs short the pipeline should trade accuracy for speed,
+  step by step, and say what it traded
+
+Degradations (cheapest loss first):
+- fast_preprocess: FastPreprocessor instead of the standard chain
+- skip_deskew:     no skew estimation / rotation
+- reduced_canvas:  smaller detector canvas (detector cost ~ canvas pixels)
+- region_cap:      recognize only the K largest regions (RegionFilter top_k)
+
+Key Features:
+- StageCostModel: per-unit stage costs (ms per megapixel, ms per region)
+  as running averages of measured times, so decisions adapt to the
+  machine after a few images
+- Deadline: the clock for one image; each decision compares the
+  estimated remaining work with the remaining budget
+- report(): budget, elapsed, met, applied degradations, stage times
+  (stored as metadata.deadline)
+
+Usage:
+    costs = StageCostModel()
+    deadline = Deadline(800, costs)
+    fast, deskew = deadline.choose_preprocess(megapixels, canvas_mp)
+    ...
+    deadline.report()
+"""
+
+import math
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEGRADATIONS = ('fast_preprocess', 'skip_deskew', 'reduced_canvas', 'region_cap')
+
+# Starting estimates for a 4-core industrial PC (CPU inference); replaced
+# by measurements as images are processed
+DEFAULT_COSTS: Dict[str, float] = {
+    'preprocess': 60.0,         # ms per image megapixel, standard chain
+    'preprocess_fast': 25.0,    # ms per image megapixel, fast chain
+    'deskew': 8.0,              # ms per image megapixel
+    'detect': 900.0,            # ms per detector canvas megapixel
+    'recognize': 35.0,          # ms per recognized region
+    'regions': 12.0,            # regions per image (not a cost: expected count)
+}
+
+
+def canvas_megapixels(height: int, width: int, canvas_size: int, mag_ratio: float) -> float:
+    """Pixels (MP) the detector sees: long side min(mag * long, canvas)."""
+    long_side = max(height, width)
+    target = min(mag_ratio * long_side, canvas_size)
+    scale = target / max(long_side, 1)
+    return height * scale * width * scale / 1e6
+
+
+class StageCostModel:
+    """
+    Running per-unit stage costs.
+
+    Each observation moves the estimate toward the measured value by
+    `alpha` (exponential moving average); the model is shared by all
+    images of one IndustrialOCRSystem.
+    """
+
+    def __init__(self, costs: Optional[Dict[str, float]] = None, alpha: float = 0.3):
+        """
+        Args:
+            costs: Starting estimates (keys of DEFAULT_COSTS)
+            alpha: Weight of a new measurement
+        """
+        self.costs = dict(DEFAULT_COSTS, **(costs or {}))
+        self.alpha = alpha
+
+    def estimate(self, stage: str, units: float) -> float:
+        """Estimated milliseconds for `units` of work."""
+        return self.costs[stage] * units
+
+    def observe(self, stage: str, units: float, ms: float):
+        """Update a per-unit cost from one measurement."""
+        if units <= 0:
+            return
+        self.costs[stage] += self.alpha * (ms / units - self.costs[stage])
+
+    def observe_ocr(self, canvas_mp: float, regions: int, ms: float):
+        """
+        Update detect and recognize costs from one engine call.
+
+        The engine reports only the total, so both coefficients are
+        scaled by the same observed/predicted ratio.
+        """
+        predicted = self.estimate('detect', canvas_mp) + self.estimate('recognize', regions)
+        if predicted <= 0:
+            return
+        factor = 1.0 + self.alpha * (ms / predicted - 1.0)
+        self.costs['detect'] *= factor
+        self.costs['recognize'] *= factor
+        self.costs['regions'] += self.alpha * (regions - self.costs['regions'])
+
+    def as_dict(self) -> Dict[str, float]:
+        return {k: round(v, 2) for k, v in self.costs.items()}
+
+
+class Deadline:
+    """
+    Time budget of one image and the degradation decisions against it.
+
+    Decisions keep `safety` of the remaining budget as the target, leaving
+    headroom for structuring and saving the result.
+    """
+
+    def __init__(self, budget_ms: float, costs: StageCostModel, safety: float = 0.9,
+                 min_canvas: int = 640):
+        """
+        Args:
+            budget_ms: Time allowed for the image (from process_image start)
+            costs: Shared StageCostModel
+            safety: Fraction of the remaining budget decisions plan with
+            min_canvas: Smallest detector canvas the deadline may choose
+        """
+        self.budget_ms = float(budget_ms)
+        self.costs = costs
+        self.safety = safety
+        self.min_canvas = min_canvas
+        self.degradations: List[str] = []
+        self.stages_ms: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def remaining_ms(self) -> float:
+        return self.budget_ms - self.elapsed_ms()
+
+    def record(self, stage: str, ms: float):
+        self.stages_ms[stage] = round(self.stages_ms.get(stage, 0.0) + ms, 1)
+
+    def _degrade(self, name: str):
+        if name not in self.degradations:
+            self.degradations.append(name)
+            logger.debug("Deadline: %s (%.0f ms left of %.0f)", name,
+                         self.remaining_ms(), self.budget_ms)
+
+    def _ocr_estimate(self, canvas_mp: float, regions: Optional[float] = None) -> float:
+        regions = self.costs.costs['regions'] if regions is None else regions
+        return self.costs.estimate('detect', canvas_mp) + self.costs.estimate('recognize', regions)
+
+    def choose_preprocess(self, megapixels: float, canvas_mp: float,
+                          deskew_enabled: bool = True,
+                          fast: bool = False) -> Tuple[bool, bool]:
+        """
+        Preprocessing chain and deskew for the remaining budget.
+
+        Args:
+            megapixels: Image size
+            canvas_mp: Detector canvas at the configured size
+            deskew_enabled: Deskew is configured
+            fast: The fast chain is configured (preprocessing.profile);
+                  kept as is, not recorded as a degradation
+
+        Returns:
+            (use fast chain, run deskew)
+        """
+        available = self.remaining_ms() * self.safety - self._ocr_estimate(canvas_mp)
+        deskew_ms = self.costs.estimate('deskew', megapixels) if deskew_enabled else 0.0
+
+        if not fast and self.costs.estimate('preprocess', megapixels) + deskew_ms > available:
+            fast = True
+            self._degrade('fast_preprocess')
+        chain = 'preprocess_fast' if fast else 'preprocess'
+        deskew = deskew_enabled
+        if deskew and self.costs.estimate(chain, megapixels) + deskew_ms > available:
+            deskew = False
+            self._degrade('skip_deskew')
+        return fast, deskew
+
+    def choose_canvas(self, height: int, width: int, canvas_size: int, mag_ratio: float) -> int:
+        """
+        Largest detector canvas (long side, 32 px grid) that fits, at most
+        canvas_size and at least min_canvas.
+        """
+        available = (self.remaining_ms() * self.safety
+                     - self.costs.estimate('recognize', self.costs.costs['regions']))
+        if self.costs.estimate('detect', canvas_megapixels(height, width, canvas_size, mag_ratio)) <= available:
+            return canvas_size
+
+        aspect = min(height, width) / max(height, width, 1)
+        max_mp = max(available, 0.0) / max(self.costs.costs['detect'], 1e-6)
+        long_side = math.sqrt(max_mp * 1e6 / max(aspect, 1e-3))
+        canvas = int(max(min(canvas_size, long_side) // 32 * 32, self.min_canvas))
+        # Canvas only limits the detector when it is below mag * long side
+        if canvas < min(canvas_size, mag_ratio * max(height, width)):
+            self._degrade('reduced_canvas')
+            return canvas
+        return canvas_size
+
+    def region_cap(self, canvas_mp: float) -> int:
+        """Most regions the recognizer can handle after detection (>= 1)."""
+        available = self.remaining_ms() * self.safety - self.costs.estimate('detect', canvas_mp)
+        return max(1, int(available // max(self.costs.costs['recognize'], 1e-6)))
+
+    def mark_region_cap(self):
+        """Record that the region cap removed regions."""
+        self._degrade('region_cap')
+
+    def report(self) -> Dict:
+        elapsed = self.elapsed_ms()
+        return {
+            'budget_ms': self.budget_ms,
+            'elapsed_ms': round(elapsed, 1),
+            'met': elapsed <= self.budget_ms,
+            'degradations': list(self.degradations),
+            'stages_ms': dict(self.stages_ms),
+        }
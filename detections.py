@@ -0,0 +1,247 @@
+"""
+Compact Detection Storage for Industrial OCR System
+====================================================
+Columnar representation of OCR detections
+
+Why not a dict per detection:
+- Each detection dict holds ~20 Python objects (dict, nested bbox and
+  polygon lists, boxed ints/floats, duplicated text strings)
+- Batch runs keep every result alive, so a million detections cost
+  gigabytes before anything is written to disk
+
+Approach:
+- One DetectionSet per image stores geometry and confidence in
+  contiguous numpy arrays (int32 boxes/polygons, float32 confidence)
+- Text stays as Python strings; raw_text is only stored when it differs
+  from the cleaned text
+- The familiar JSON dict shape is produced on demand (indexing,
+  iteration, serialization), so existing callers keep working
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+class DetectionSet:
+    """
+    Columnar container for the detections of one image.
+
+    Columns:
+    - texts: cleaned text per detection
+    - raw_texts: original OCR text, or None when identical to the cleaned text
+    - confidence: float32 array (N,)
+    - bbox: int32 array (N, 4) as [x_min, y_min, x_max, y_max]
+    - polygon: int32 array (N, 4, 2) as 4 corner points
+    - extra: optional named per-detection columns added by later stages
+    """
+
+    __slots__ = ('texts', 'raw_texts', 'confidence', 'bbox', 'polygon', 'extra')
+
+    def __init__(self, texts: List[str], raw_texts: List[Optional[str]],
+                 confidence: np.ndarray, polygon: np.ndarray,
+                 bbox: Optional[np.ndarray] = None,
+                 extra: Optional[Dict[str, List]] = None):
+        self.texts = texts
+        self.raw_texts = raw_texts
+        self.confidence = np.asarray(confidence, dtype=np.float32).reshape(-1)
+        self.polygon = np.asarray(polygon, dtype=np.int32).reshape(-1, 4, 2)
+        if bbox is None:
+            bbox = np.concatenate(
+                [self.polygon.min(axis=1), self.polygon.max(axis=1)], axis=1
+            ) if len(self.polygon) else np.empty((0, 4), dtype=np.int32)
+        self.bbox = np.asarray(bbox, dtype=np.int32).reshape(-1, 4)
+        self.extra = extra if extra is not None else {}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def empty(cls) -> 'DetectionSet':
+        """Create a set with no detections."""
+        return cls([], [], np.empty(0, np.float32), np.empty((0, 4, 2), np.int32))
+
+    @classmethod
+    def from_readtext(cls, results: Sequence, clean_fn: Callable[[str], str]) -> 'DetectionSet':
+        """
+        Build a set from EasyOCR readtext() output.
+
+        Args:
+            results: List of (bbox, text, confidence) tuples
+            clean_fn: Text cleaning function applied to each raw string
+
+        Returns:
+            DetectionSet with one row per result
+        """
+        if not results:
+            return cls.empty()
+
+        texts, raw_texts = [], []
+        for _, text, _ in results:
+            cleaned = clean_fn(text)
+            texts.append(cleaned)
+            raw_texts.append(None if cleaned == text else text)
+
+        # Same truncation as np.array(bbox).astype(int) in the dict version
+        polygon = np.array([r[0] for r in results], dtype=np.float64).astype(np.int32)
+        confidence = np.array([r[2] for r in results], dtype=np.float32)
+        return cls(texts, raw_texts, confidence, polygon)
+
+    @classmethod
+    def from_dicts(cls, detections: Iterable[Dict]) -> 'DetectionSet':
+        """Build a set from detection dictionaries (JSON shape)."""
+        detections = list(detections)
+        if not detections:
+            return cls.empty()
+
+        texts = [d['text'] for d in detections]
+        raw_texts = [
+            None if d.get('raw_text', d['text']) == d['text'] else d['raw_text']
+            for d in detections
+        ]
+        confidence = np.array([d['confidence'] for d in detections], dtype=np.float32)
+        polygon = np.array([d['bbox_polygon'] for d in detections], dtype=np.int32)
+        bbox = np.array([d['bbox'] for d in detections], dtype=np.int32)
+        return cls(texts, raw_texts, confidence, polygon, bbox)
+
+    @classmethod
+    def coerce(cls, detections) -> 'DetectionSet':
+        """Return detections as a DetectionSet (no copy if it already is one)."""
+        if isinstance(detections, cls):
+            return detections
+        return cls.from_dicts(detections)
+
+    @classmethod
+    def concat(cls, sets: Sequence['DetectionSet']) -> 'DetectionSet':
+        """Concatenate several sets (e.g. per-region results) into one."""
+        sets = [s for s in sets if len(s)]
+        if not sets:
+            return cls.empty()
+
+        names = set()
+        for s in sets:
+            names.update(s.extra)
+        extra = {
+            name: [v for s in sets for v in s.extra.get(name, [None] * len(s))]
+            for name in names
+        }
+        return cls(
+            [t for s in sets for t in s.texts],
+            [t for s in sets for t in s.raw_texts],
+            np.concatenate([s.confidence for s in sets]),
+            np.concatenate([s.polygon for s in sets]),
+            np.concatenate([s.bbox for s in sets]),
+            extra
+        )
+
+    # ------------------------------------------------------------------
+    # Column operations
+    # ------------------------------------------------------------------
+
+    def subset(self, index) -> 'DetectionSet':
+        """
+        Select detections by boolean mask or integer index array.
+
+        Example: detections.subset(detections.confidence >= 0.5)
+        """
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        idx = index.tolist()
+        return DetectionSet(
+            [self.texts[i] for i in idx],
+            [self.raw_texts[i] for i in idx],
+            self.confidence[index],
+            self.polygon[index],
+            self.bbox[index],
+            {name: [col[i] for i in idx] for name, col in self.extra.items()}
+        )
+
+    def set_column(self, name: str, values: List):
+        """Attach an optional per-detection column (None entries are omitted in output)."""
+        if len(values) != len(self):
+            raise ValueError(f"Column '{name}' has {len(values)} values, expected {len(self)}")
+        self.extra[name] = list(values)
+
+    def raw_text(self, i: int) -> str:
+        """Original OCR text of detection i."""
+        raw = self.raw_texts[i]
+        return self.texts[i] if raw is None else raw
+
+    def scale_geometry(self, factor: float):
+        """Scale boxes and polygons in place (e.g. back to full resolution)."""
+        if factor != 1.0 and len(self):
+            self.polygon = np.rint(self.polygon * factor).astype(np.int32)
+            self.bbox = np.rint(self.bbox * factor).astype(np.int32)
+
+    def translate_geometry(self, dx: int, dy: int):
+        """Shift boxes and polygons in place (e.g. from crop to frame coordinates)."""
+        if (dx or dy) and len(self):
+            self.polygon += np.array([dx, dy], dtype=np.int32)
+            self.bbox += np.array([dx, dy, dx, dy], dtype=np.int32)
+
+    def mean_confidence(self) -> float:
+        """Average confidence (0.0 when empty)."""
+        return float(self.confidence.mean()) if len(self) else 0.0
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint of the numpy columns in bytes."""
+        return self.confidence.nbytes + self.bbox.nbytes + self.polygon.nbytes
+
+    # ------------------------------------------------------------------
+    # JSON shape (materialized on demand)
+    # ------------------------------------------------------------------
+
+    def to_dict(self, i: int) -> Dict:
+        """Materialize detection i in the structure_output() JSON shape."""
+        detection = {
+            'id': f"detection_{i:03d}",
+            'text': self.texts[i],
+            'raw_text': self.raw_text(i),
+            'confidence': round(float(self.confidence[i]), 3),
+            'bbox': self.bbox[i].tolist(),
+            'bbox_polygon': self.polygon[i].tolist()
+        }
+        for name, column in self.extra.items():
+            if column[i] is not None:
+                detection[name] = column[i]
+        return detection
+
+    def to_dicts(self) -> List[Dict]:
+        """Materialize all detections as dictionaries."""
+        return [self.to_dict(i) for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, i: int) -> Dict:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("detection index out of range")
+        return self.to_dict(i)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self.to_dict(i)
+
+    def __repr__(self) -> str:
+        return f"DetectionSet({len(self)} detections)"
+
+
+def json_default(obj):
+    """
+    json.dump() hook for pipeline objects.
+
+    Usage: json.dump(output_data, f, default=json_default)
+    - DetectionSet -> list of detection dicts
+    - numpy scalars/arrays -> Python numbers/lists
+    """
+    if isinstance(obj, DetectionSet):
+        return obj.to_dicts()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,469 @@
+"""
+OCR Engine Backends for Industrial OCR System
+==============================================
+Common interface over recognizers plus a tiered escalation policy
+
+Engines:
+- easyocr:   CRAFT detector + CRNN recognizer (accurate, slow on CPU)
+- tesseract: Locally installed tesseract binary via pytesseract (fast
+             on clean, high-contrast preprocessed images)
+- stub:      No model; deterministic synthetic detections with configurable
+             latency (benchmarks and tests of the rest of the pipeline)
+
+Every engine returns EasyOCR-shaped results:
+    [(bbox, text, confidence), ...] with bbox = [[x1,y1], ..., [x4,y4]]
+so the rest of the pipeline (DetectionSet, lexicon, output) is engine
+agnostic. New engines are added with register_engine().
+
+Tiered policy (TieredOCR):
+1. Run the cheapest engine on the full image
+2. Regions whose confidence is too low or whose text fails pattern
+   validation are re-recognized by the next tier (crop only)
+3. If a tier finds nothing at all, the next tier gets the full image
+
+Region filtering (readtext_filtered):
+    detect -> RegionFilter (region_filter.py) -> recognize survivors;
+    engines without a separate detector recognize everything and drop
+    the filtered regions afterwards (same output, no saving)
+"""
+
+import time
+import zlib
+import shutil
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from region_filter import is_axis_aligned
+
+logger = logging.getLogger(__name__)
+
+# (bbox polygon, text, confidence)
+OCRResult = Tuple[List[List[int]], str, float]
+
+
+def polygon_bounds(polygon) -> Tuple[int, int, int, int]:
+    """Axis-aligned (x_min, y_min, x_max, y_max) of a 4-point polygon."""
+    pts = np.asarray(polygon)
+    return (int(pts[:, 0].min()), int(pts[:, 1].min()),
+            int(pts[:, 0].max()), int(pts[:, 1].max()))
+
+
+class OCREngine:
+    """
+    Base class for OCR backends.
+
+    Subclasses implement:
+    - readtext(image, **params): detect + recognize on a full image
+    - recognize(image, polygons, **params): recognize given regions only
+      (params: recognizer settings, e.g. allowlist; engines ignore those
+      they do not support)
+    - detect(image, **params): optional, regions without recognition
+    """
+
+    name = ''
+
+    def readtext(self, image: np.ndarray, **params) -> List[OCRResult]:
+        raise NotImplementedError
+
+    def recognize(self, image: np.ndarray, polygons: Sequence, **params) -> List[OCRResult]:
+        raise NotImplementedError
+
+    def detect(self, image: np.ndarray, **params) -> List[List[List[int]]]:
+        raise NotImplementedError
+
+    def readtext_filtered(self, image: np.ndarray, region_filter, **params) -> List[OCRResult]:
+        """
+        readtext with a RegionFilter between detection and recognition.
+
+        Args:
+            image: Image passed to the engine
+            region_filter: RegionFilter deciding which regions are recognized
+            **params: Detection parameters (as for readtext)
+        """
+        try:
+            polygons = self.detect(image, **params)
+        except NotImplementedError:
+            # No separate detector: recognize everything, keep what the
+            # filter keeps (merged regions are recognized again as a whole)
+            results = self.readtext(image, **params)
+            kept = region_filter.filter([r[0] for r in results])
+            merged = [region.polygon for region in kept if len(region.sources) > 1]
+            rerun = iter(self.recognize(image, merged)) if merged else iter(())
+            return [results[region.sources[0]] if len(region.sources) == 1 else next(rerun)
+                    for region in kept]
+
+        kept = region_filter.filter(polygons)
+        return self.recognize(image, [region.polygon for region in kept])
+
+
+class EasyOCREngine(OCREngine):
+    """EasyOCR reader (CRAFT + CRNN)."""
+
+    name = 'easyocr'
+
+    def __init__(self, languages: List[str] = ['en'], gpu: bool = False):
+        """
+        Technical Note:
+        - easyocr (and torch) are imported here, not at module import,
+          so pipelines that never use EasyOCR do not pay for loading torch
+        """
+        import easyocr
+        self.reader = easyocr.Reader(languages, gpu=gpu, verbose=False)
+
+    def readtext(self, image: np.ndarray, **params) -> List[OCRResult]:
+        return self.reader.readtext(image, detail=1, paragraph=False, **params)
+
+    def detect(self, image: np.ndarray, **params) -> List[List[List[int]]]:
+        """CRAFT regions as polygons (horizontal boxes first, then free-form)."""
+        horizontal, free = self.reader.detect(image, **params)
+        polygons = [[[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+                    for x1, x2, y1, y2 in horizontal[0]]
+        polygons.extend(np.asarray(p).astype(int).tolist() for p in free[0])
+        return polygons
+
+    def recognize(self, image: np.ndarray, polygons: Sequence, **params) -> List[OCRResult]:
+        """
+        Technical Note:
+        - params go to Reader.recognize (allowlist, blocklist, decoder,
+          beamWidth, contrast_ths, ...)
+        - Upright rectangles go to horizontal_list ([x_min, x_max, y_min,
+          y_max]), rotated polygons to free_list so they are rectified;
+          EasyOCR returns horizontal results first, so results are put
+          back into input order
+        """
+        if len(polygons) == 0:
+            return []
+        upright = [is_axis_aligned(polygon) for polygon in polygons]
+        order = ([i for i, u in enumerate(upright) if u]
+                 + [i for i, u in enumerate(upright) if not u])
+        horizontal, free = [], []
+        for polygon, u in zip(polygons, upright):
+            if u:
+                x_min, y_min, x_max, y_max = polygon_bounds(polygon)
+                horizontal.append([x_min, x_max, y_min, y_max])
+            else:
+                free.append(np.asarray(polygon).tolist())
+        results = self.reader.recognize(
+            image, horizontal_list=horizontal, free_list=free,
+            detail=1, paragraph=False, **params
+        )
+        ordered = [None] * len(polygons)
+        for i, result in zip(order, results):
+            ordered[i] = result
+        return [r for r in ordered if r is not None]
+
+
+# ISO 639-1 (EasyOCR) -> ISO 639-2 (Tesseract) for common industrial sites
+_TESSERACT_LANGS = {'en': 'eng', 'de': 'deu', 'fr': 'fra', 'es': 'spa',
+                    'it': 'ita', 'pt': 'por', 'nl': 'nld', 'pl': 'pol'}
+
+
+class TesseractEngine(OCREngine):
+    """
+    Tesseract via pytesseract and a locally installed binary.
+
+    Technical Note:
+    - Full-image mode uses --psm 11 (sparse text), which suits isolated
+      markings on box sides; words are grouped into lines
+    - Region mode uses --psm 7 (single text line) on each crop
+    """
+
+    name = 'tesseract'
+
+    def __init__(self, languages: List[str] = ['en'], gpu: bool = False,
+                 tesseract_cmd: Optional[str] = None):
+        import pytesseract
+        self._pytesseract = pytesseract
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        elif shutil.which('tesseract') is None:
+            raise RuntimeError("tesseract binary not found on PATH")
+        self.lang = '+'.join(_TESSERACT_LANGS.get(l, l) for l in languages)
+
+    def _words(self, image: np.ndarray, psm: int) -> Dict[str, list]:
+        return self._pytesseract.image_to_data(
+            image, lang=self.lang, config=f'--psm {psm}',
+            output_type=self._pytesseract.Output.DICT
+        )
+
+    def readtext(self, image: np.ndarray, **params) -> List[OCRResult]:
+        data = self._words(image, psm=11)
+        min_size = params.get('min_size', 0)
+
+        # Group words into lines: (block, paragraph, line)
+        lines: Dict[Tuple[int, int, int], list] = {}
+        for i, word in enumerate(data['text']):
+            conf = float(data['conf'][i])
+            if not word.strip() or conf < 0:
+                continue
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(i)
+
+        results = []
+        for indices in lines.values():
+            x1 = min(data['left'][i] for i in indices)
+            y1 = min(data['top'][i] for i in indices)
+            x2 = max(data['left'][i] + data['width'][i] for i in indices)
+            y2 = max(data['top'][i] + data['height'][i] for i in indices)
+            if max(x2 - x1, y2 - y1) < min_size:
+                continue
+            text = ' '.join(data['text'][i] for i in indices)
+            conf = float(np.mean([float(data['conf'][i]) for i in indices])) / 100.0
+            results.append(([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], text, conf))
+        return results
+
+    def recognize(self, image: np.ndarray, polygons: Sequence, **params) -> List[OCRResult]:
+        results = []
+        for polygon in polygons:
+            x_min, y_min, x_max, y_max = polygon_bounds(polygon)
+            crop = image[max(y_min, 0):y_max, max(x_min, 0):x_max]
+            text, conf = '', 0.0
+            if crop.size:
+                data = self._words(crop, psm=7)
+                words = [(w, float(c)) for w, c in zip(data['text'], data['conf'])
+                         if w.strip() and float(c) >= 0]
+                if words:
+                    text = ' '.join(w for w, _ in words)
+                    conf = float(np.mean([c for _, c in words])) / 100.0
+            results.append((np.asarray(polygon).tolist(), text, conf))
+        return results
+
+
+class StubEngine(OCREngine):
+    """
+    Model-free engine returning synthetic industrial codes.
+
+    Key Features:
+    - Deterministic: detections depend only on the seed and the image
+      (shape plus a checksum of a pixel subsample), never on call order
+    - Simulated model time: latency_ms per detection pass plus
+      per_region_ms per recognized region (sleeps, like a model that
+      runs outside the GIL)
+    - detect / recognize / readtext all supported, so region filtering,
+      tiering and orientation probes run unchanged
+
+    Config (ocr.engine_options.stub):
+        regions, latency_ms, per_region_ms, seed
+    """
+
+    name = 'stub'
+
+    _TEMPLATES = ('BATCH-{year}-{letter}', 'SERIAL-XYZ-{n3}', 'LOT-{n4}',
+                  'WEIGHT-{n2}KG', 'PART-{n3}-{letter}')
+
+    def __init__(self, languages: List[str] = ['en'], gpu: bool = False,
+                 regions: int = 6, latency_ms: float = 0.0, per_region_ms: float = 0.0,
+                 seed: int = 0):
+        """
+        Args:
+            languages, gpu: Accepted for interface compatibility (unused)
+            regions: Detections per image
+            latency_ms: Simulated detector time per call
+            per_region_ms: Simulated recognizer time per region
+            seed: Changes the generated texts and layout
+        """
+        self.regions = int(regions)
+        self.latency_ms = float(latency_ms)
+        self.per_region_ms = float(per_region_ms)
+        self.seed = int(seed)
+
+    def _rng(self, image: np.ndarray, salt: int = 0) -> np.random.Generator:
+        step = max(1, image.shape[0] // 64)
+        checksum = zlib.crc32(np.ascontiguousarray(image[::step, ::step]).tobytes())
+        return np.random.default_rng([self.seed, salt, checksum, *image.shape[:2]])
+
+    def _text(self, rng: np.random.Generator) -> str:
+        template = self._TEMPLATES[int(rng.integers(len(self._TEMPLATES)))]
+        return template.format(year=int(rng.integers(2018, 2031)),
+                               letter=chr(ord('A') + int(rng.integers(26))),
+                               n2=int(rng.integers(10, 100)),
+                               n3=int(rng.integers(100, 1000)),
+                               n4=int(rng.integers(1000, 10000)))
+
+    @staticmethod
+    def _sleep(ms: float):
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    def detect(self, image: np.ndarray, **params) -> List[List[List[int]]]:
+        """One text line per row band, left-aligned at a random indent."""
+        self._sleep(self.latency_ms)
+        h, w = image.shape[:2]
+        rng = self._rng(image)
+        band = h / max(self.regions, 1)
+        polygons = []
+        for i in range(self.regions):
+            y1 = int(i * band + band * 0.2)
+            y2 = max(int((i + 1) * band - band * 0.2), y1 + 1)
+            x1 = int(rng.integers(0, max(w // 4, 1)))
+            x2 = min(w - 1, x1 + int(w * rng.uniform(0.3, 0.7)))
+            polygons.append([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+        return polygons
+
+    def recognize(self, image: np.ndarray, polygons: Sequence, **params) -> List[OCRResult]:
+        self._sleep(self.per_region_ms * len(polygons))
+        results = []
+        for polygon in polygons:
+            rng = self._rng(image, salt=zlib.crc32(repr(polygon_bounds(polygon)).encode()))
+            results.append((np.asarray(polygon).tolist(), self._text(rng),
+                            round(float(rng.uniform(0.55, 0.99)), 4)))
+        return results
+
+    def readtext(self, image: np.ndarray, **params) -> List[OCRResult]:
+        return self.recognize(image, self.detect(image, **params))
+
+
+ENGINES: Dict[str, Callable[..., OCREngine]] = {
+    'easyocr': EasyOCREngine,
+    'tesseract': TesseractEngine,
+    'stub': StubEngine,
+}
+
+
+def register_engine(name: str, factory: Callable[..., OCREngine]):
+    """
+    Make a new backend available by name.
+
+    Args:
+        name: Engine name used in config/CLI
+        factory: Callable(languages=..., gpu=..., **options) returning an
+                 OCREngine
+    """
+    ENGINES[name] = factory
+
+
+def create_engine(name: str, languages: List[str] = ['en'], gpu: bool = False,
+                  **options) -> OCREngine:
+    """
+    Instantiate a registered engine by name.
+
+    Args:
+        options: Engine-specific keyword arguments (ocr.engine_options.<name>)
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown OCR engine '{name}' (choose from: {', '.join(ENGINES)})")
+    return ENGINES[name](languages=languages, gpu=gpu, **options)
+
+
+class TierStats:
+    """Latency and escalation counters for one tier."""
+
+    __slots__ = ('calls', 'regions', 'escalated', 'empty_escalated', 'improved', 'seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.regions = 0          # regions this tier produced or re-recognized
+        self.escalated = 0        # of those, regions passed on to the next tier
+        self.empty_escalated = 0  # images passed on whole (tier found nothing)
+        self.improved = 0         # regions whose result this tier replaced
+        self.seconds = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'regions': self.regions,
+            'escalated': self.escalated,
+            'escalation_rate': round(self.escalated / self.regions, 3) if self.regions else 0.0,
+            'empty_escalated': self.empty_escalated,
+            'improved': self.improved,
+            'avg_latency_ms': round(self.seconds * 1000 / self.calls, 2) if self.calls else 0.0,
+        }
+
+
+class TieredOCR(OCREngine):
+    """
+    Cheapest-first engine cascade with per-region escalation.
+
+    Key Features:
+    - Tier 1 runs on the full image
+    - Only failing regions are re-recognized by later tiers (crops)
+    - Empty tier results escalate the whole image
+    - Per-tier call latency and escalation-rate statistics
+    """
+
+    name = 'tiered'
+
+    def __init__(self, engines: List[OCREngine], min_confidence: float = 0.6,
+                 validate: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            engines: Engines ordered cheapest first
+            min_confidence: Regions below this confidence are escalated
+            validate: Optional text check (e.g. pattern match); regions
+                      failing it are escalated
+        """
+        if not engines:
+            raise ValueError("TieredOCR needs at least one engine")
+        self.engines = engines
+        self.min_confidence = min_confidence
+        self.validate = validate
+        self.tier_stats = [TierStats() for _ in engines]
+
+    def _accepted(self, text: str, confidence: float) -> bool:
+        if confidence < self.min_confidence:
+            return False
+        return self.validate is None or self.validate(text)
+
+    def readtext(self, image: np.ndarray, **params) -> List[OCRResult]:
+        return self._cascade(image, lambda engine: engine.readtext(image, **params))
+
+    def readtext_filtered(self, image: np.ndarray, region_filter, **params) -> List[OCRResult]:
+        """Cascade whose full-image passes go through region_filter."""
+        return self._cascade(
+            image, lambda engine: engine.readtext_filtered(image, region_filter, **params))
+
+    def _cascade(self, image: np.ndarray,
+                 full_pass: Callable[[OCREngine], List[OCRResult]]) -> List[OCRResult]:
+        results: List[OCRResult] = []
+
+        for tier, (engine, stats) in enumerate(zip(self.engines, self.tier_stats)):
+            if not results:
+                # Nothing found so far: this tier gets the whole image
+                start = time.perf_counter()
+                results = list(full_pass(engine))
+                stats.seconds += time.perf_counter() - start
+                stats.calls += 1
+                stats.regions += len(results)
+            else:
+                failing = [i for i, (_, text, conf) in enumerate(results)
+                           if not self._accepted(text, conf)]
+                if not failing:
+                    break
+                self.tier_stats[tier - 1].escalated += len(failing)
+                start = time.perf_counter()
+                rerun = engine.recognize(image, [results[i][0] for i in failing])
+                stats.seconds += time.perf_counter() - start
+                stats.calls += 1
+                stats.regions += len(failing)
+                for i, (_, text, conf) in zip(failing, rerun):
+                    if conf > results[i][2]:
+                        results[i] = (results[i][0], text, conf)
+                        stats.improved += 1
+                continue
+
+            if not results and tier + 1 < len(self.engines):
+                stats.empty_escalated += 1
+
+        return results
+
+    def recognize(self, image: np.ndarray, polygons: Sequence, **params) -> List[OCRResult]:
+        results = self.engines[0].recognize(image, polygons, **params)
+        for engine in self.engines[1:]:
+            failing = [i for i, (_, text, conf) in enumerate(results)
+                       if not self._accepted(text, conf)]
+            if not failing:
+                break
+            rerun = engine.recognize(image, [results[i][0] for i in failing], **params)
+            for i, result in zip(failing, rerun):
+                if result[2] > results[i][2]:
+                    results[i] = result
+        return results
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-tier statistics keyed by engine name."""
+        return {
+            f"{tier + 1}:{engine.name}": stats.as_dict()
+            for tier, (engine, stats) in enumerate(zip(self.engines, self.tier_stats))
+        }
@@ -0,0 +1,556 @@
+"""
+Shared Job Queue for Industrial OCR System
+===========================================
+Split one large intake folder across several worker processes / machines
+
+Why:
+- process_batch() walks a folder in one process; a second machine on the
+  same NAS would process the same images again
+- A small SQLite database next to the intake folder is enough to
+  coordinate workers (no server, 100% offline)
+
+Job lifecycle:
+    pending --claim--> running --complete--> done
+                          |  \\--fail--> pending (retry after backoff)
+                          |               \\--> failed (attempts exhausted)
+                          \\--lease expired (worker died)--> claimable again
+
+Key Features:
+- Leases: a claimed job belongs to one worker until its lease expires;
+  a heartbeat thread extends it while the image is being processed
+- Retries with exponential backoff (+ jitter) up to max_attempts
+- Results written back into the queue (summary JSON + result file path)
+- Per-worker throughput (images/min) for the status command
+
+Technical Note:
+- Claims run in BEGIN IMMEDIATE transactions, so two workers never
+  claim the same job
+- Rollback journal (not WAL): WAL needs shared memory and does not work
+  when the database lives on a network share
+- Lease times use the wall clock, so nodes must be time-synchronized
+  (NTP); keep lease_seconds well above the expected clock skew
+
+Usage:
+- python job_queue.py --db /mnt/nas/intake/queue.db enqueue /mnt/nas/intake/
+- python job_queue.py --db /mnt/nas/intake/queue.db work --config config.yaml
+- python job_queue.py --db /mnt/nas/intake/queue.db work --workers 8 --recycle-after 500
+  (one model copy shared by 8 forked workers, see worker_pool.py)
+- python job_queue.py --db /mnt/nas/intake/queue.db status
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import logging
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    not_before REAL NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    result_path TEXT,
+    result TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, not_before);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(status, lease_until);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class Job(NamedTuple):
+    """A claimed job."""
+    id: int
+    path: str
+    attempts: int
+
+
+def default_worker_id() -> str:
+    """host:pid, unique across the machines sharing a queue."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    SQLite-backed work queue with leases and retries.
+
+    One JobQueue object per thread (sqlite3 connections are not shared
+    between threads); all instances may point at the same database.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 300.0, max_attempts: int = 3,
+                 backoff_seconds: float = 30.0):
+        """
+        Open (or create) the queue database.
+
+        Args:
+            db_path: Queue database (on the shared NAS for multi-node use)
+            lease_seconds: How long a claim is valid without a heartbeat
+            max_attempts: Attempts before a job is marked failed
+            backoff_seconds: Retry delay after the first failure; doubles
+                             with every further attempt
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+
+        # isolation_level=None: transactions are opened explicitly below
+        self.conn = sqlite3.connect(str(self.db_path), timeout=60.0, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+
+    def _transaction(self):
+        return _ImmediateTransaction(self.conn)
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def enqueue(self, paths: Iterable[str]) -> int:
+        """
+        Add image paths (already queued paths are ignored).
+
+        Returns:
+            Number of new jobs
+        """
+        now = time.time()
+        with self._transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (path, enqueued_at) VALUES (?, ?)",
+                ((str(Path(p).resolve()), now) for p in paths)
+            )
+            return self.conn.total_changes - before
+
+    def enqueue_folder(self, folder: str, recursive: bool = False) -> int:
+        """Enqueue every image in a folder."""
+        root = Path(folder)
+        files = root.rglob('*') if recursive else root.iterdir()
+        return self.enqueue(
+            str(f) for f in sorted(files) if f.suffix.lower() in IMAGE_EXTENSIONS
+        )
+
+    def requeue_failed(self) -> int:
+        """Give failed jobs a fresh set of attempts."""
+        with self._transaction():
+            cur = self.conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, not_before = 0, error = NULL "
+                "WHERE status = 'failed'"
+            )
+            return cur.rowcount
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+
+    def register_worker(self, worker_id: str):
+        """Create or refresh the worker's throughput row."""
+        now = time.time()
+        with self._transaction():
+            self.conn.execute(
+                "INSERT INTO workers (worker, host, pid, started_at, last_seen) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(worker) DO UPDATE SET last_seen = excluded.last_seen",
+                (worker_id, socket.gethostname(), os.getpid(), now, now)
+            )
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """
+        Claim the next runnable job.
+
+        Runnable: pending and past its backoff time, or running with an
+        expired lease (its worker stopped heartbeating).
+
+        Returns:
+            Job, or None if nothing is runnable right now
+        """
+        now = time.time()
+        with self._transaction():
+            # Expired leases that used up their attempts fail for good
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                "error = COALESCE(error, 'lease expired') "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = self.conn.execute(
+                "SELECT id, path, attempts FROM jobs "
+                "WHERE (status = 'pending' AND not_before <= ?) "
+                "   OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY id LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, started_at = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row['id'])
+            )
+            return Job(row['id'], row['path'], row['attempts'] + 1)
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """
+        Extend the lease of a job this worker holds.
+
+        Returns:
+            False if the lease was lost (another worker took the job over)
+        """
+        now = time.time()
+        with self._transaction():
+            cur = self.conn.execute(
+                "UPDATE jobs SET lease_until = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease_seconds, job_id, worker_id)
+            )
+            self.conn.execute("UPDATE workers SET last_seen = ? WHERE worker = ?", (now, worker_id))
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Optional[Dict] = None,
+                 result_path: Optional[str] = None, seconds: float = 0.0) -> bool:
+        """
+        Mark a job done and store its result summary.
+
+        Returns:
+            False if the job is no longer this worker's (lease lost and
+            reclaimed); nothing is recorded then
+        """
+        now = time.time()
+        with self._transaction():
+            cur = self.conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, lease_until = NULL, "
+                "error = NULL, result_path = ?, result = ? WHERE id = ? AND worker = ?",
+                (now, result_path, json.dumps(result) if result is not None else None,
+                 job_id, worker_id)
+            )
+            held = cur.rowcount == 1
+            # Reason: a job taken over by another worker is counted there
+            self.conn.execute(
+                "UPDATE workers SET processed = processed + ?, busy_seconds = busy_seconds + ?, "
+                "last_seen = ? WHERE worker = ?",
+                (int(held), seconds, now, worker_id)
+            )
+            return held
+
+    def fail(self, job_id: int, worker_id: str, error: str, seconds: float = 0.0) -> bool:
+        """
+        Record a failure; retry later with backoff or give up.
+
+        Returns:
+            False if the job is no longer this worker's (nothing recorded)
+        """
+        now = time.time()
+        with self._transaction():
+            row = self.conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            attempts = row['attempts'] if row else self.max_attempts
+            if attempts >= self.max_attempts:
+                cur = self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, lease_until = NULL, "
+                    "error = ? WHERE id = ? AND worker = ?",
+                    (now, error, job_id, worker_id)
+                )
+            else:
+                # Exponential backoff; jitter keeps workers from retrying in lockstep
+                delay = self.backoff_seconds * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                cur = self.conn.execute(
+                    "UPDATE jobs SET status = 'pending', not_before = ?, lease_until = NULL, "
+                    "error = ? WHERE id = ? AND worker = ?",
+                    (now + delay, error, job_id, worker_id)
+                )
+            held = cur.rowcount == 1
+            self.conn.execute(
+                "UPDATE workers SET failed = failed + ?, busy_seconds = busy_seconds + ?, "
+                "last_seen = ? WHERE worker = ?",
+                (int(held), seconds, now, worker_id)
+            )
+            return held
+
+    # ------------------------------------------------------------------
+    # Monitoring
+    # ------------------------------------------------------------------
+
+    def runnable(self) -> int:
+        """Number of jobs claim() could hand out right now."""
+        now = time.time()
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM jobs "
+            "WHERE (status = 'pending' AND not_before <= ?) "
+            "   OR (status = 'running' AND lease_until < ?)",
+            (now, now)
+        ).fetchone()[0]
+
+    def status(self) -> Dict:
+        """Job counts by status and per-worker throughput."""
+        now = time.time()
+        counts = {row['status']: row['n'] for row in self.conn.execute(
+            "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+        workers = []
+        for row in self.conn.execute("SELECT * FROM workers ORDER BY worker"):
+            elapsed = max(row['last_seen'] - row['started_at'], 1e-9)
+            workers.append({
+                'worker': row['worker'],
+                'processed': row['processed'],
+                'failed': row['failed'],
+                'images_per_min': round(row['processed'] * 60.0 / elapsed, 2),
+                'avg_seconds': round(row['busy_seconds'] / row['processed'], 3)
+                               if row['processed'] else None,
+                'idle_seconds': round(now - row['last_seen'], 1),
+            })
+        return {
+            'jobs': {s: counts.get(s, 0) for s in ('pending', 'running', 'done', 'failed')},
+            'workers': workers,
+        }
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK (takes the write lock up front)."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class _Heartbeat:
+    """Background lease renewal for the job being processed."""
+
+    def __init__(self, queue: JobQueue, job: Job, worker_id: str):
+        self.queue_args = (str(queue.db_path), queue.lease_seconds)
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = queue.lease_seconds / 3.0
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='job-heartbeat')
+
+    def _run(self):
+        # Own connection: sqlite3 connections stay on their thread
+        queue = JobQueue(self.queue_args[0], lease_seconds=self.queue_args[1])
+        try:
+            while not self._stop.wait(self.interval):
+                if not queue.heartbeat(self.job.id, self.worker_id):
+                    self.lost = True
+                    logger.warning(f"Lease lost for job {self.job.id} ({self.job.path})")
+                    return
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(queue: JobQueue, ocr_system, worker_id: Optional[str] = None,
+               exit_when_empty: bool = False, poll_interval: float = 5.0,
+               max_jobs: Optional[int] = None) -> int:
+    """
+    Claim and process jobs until stopped.
+
+    Args:
+        queue: Queue to work on
+        ocr_system: IndustrialOCRSystem (model loaded once per worker)
+        worker_id: Name in the status table (default host:pid)
+        exit_when_empty: Return when nothing is runnable instead of polling
+        poll_interval: Seconds between polls of an empty queue
+        max_jobs: Stop after this many jobs (None: no limit)
+
+    Returns:
+        Number of jobs completed successfully
+    """
+    worker_id = worker_id or default_worker_id()
+    queue.register_worker(worker_id)
+    logger.info(f"Worker {worker_id} started on {queue.db_path}")
+
+    completed = handled = 0
+    while max_jobs is None or handled < max_jobs:
+        job = queue.claim(worker_id)
+        if job is None:
+            if exit_when_empty:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        handled += 1
+        start = time.perf_counter()
+        try:
+            with _Heartbeat(queue, job, worker_id) as heartbeat:
+                output = ocr_system.process_image(job.path)
+        except Exception as e:
+            queue.fail(job.id, worker_id, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+            continue
+        elapsed = time.perf_counter() - start
+
+        if heartbeat.lost:
+            # Another worker owns the job now; do not overwrite its result
+            continue
+        if output is None:
+            queue.fail(job.id, worker_id, "processing failed (see worker log)", elapsed)
+            continue
+
+        metadata = output['metadata']
+        summary = {
+            'total_detections': metadata['total_detections'],
+            'average_confidence': metadata['average_confidence'],
+            'texts': [d['text'] for d in output['detections']],
+        }
+        result_path = ocr_system.output_dir / f"{Path(job.path).stem}{ocr_system.serializer.extension}"
+        if queue.complete(job.id, worker_id, summary, str(result_path.resolve()), elapsed):
+            completed += 1
+        else:
+            logger.warning(f"Job {job.id} was reclaimed by another worker; result not recorded")
+
+    logger.info(f"Worker {worker_id} stopped after {completed} job(s)")
+    return completed
+
+
+def main():
+    """
+    Queue CLI.
+
+    Usage examples:
+    - python job_queue.py --db queue.db enqueue intake/
+    - python job_queue.py --db queue.db work --exit-when-empty
+    - python job_queue.py --db queue.db work --workers 8 --exit-when-empty
+    - python job_queue.py --db queue.db status
+    """
+    parser = argparse.ArgumentParser(description='Shared OCR job queue')
+    parser.add_argument('--db', type=str, default='outputs/queue.db',
+                        help='Queue database, on shared storage for multi-node use')
+    parser.add_argument('--lease', type=float, default=300.0, help='Lease length in seconds')
+    parser.add_argument('--max-attempts', type=int, default=3, help='Attempts per job')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    enq_p = sub.add_parser('enqueue', help='Add the images of a folder')
+    enq_p.add_argument('folder', type=str, help='Intake folder')
+    enq_p.add_argument('--recursive', action='store_true', help='Include subfolders')
+
+    work_p = sub.add_parser('work', help='Process jobs')
+    work_p.add_argument('--worker-id', type=str, help='Worker name (default host:pid)')
+    work_p.add_argument('--config', type=str, help='YAML configuration file')
+    work_p.add_argument('--engine', type=str, help='OCR engine (see main.py --engine)')
+    work_p.add_argument('--gpu', action='store_true', help='Enable GPU acceleration')
+    work_p.add_argument('--lang', type=str, default='en', help='Language code')
+    work_p.add_argument('--exit-when-empty', action='store_true',
+                        help='Stop when no job is runnable')
+    work_p.add_argument('--poll', type=float, default=5.0, help='Empty-queue poll interval')
+    work_p.add_argument('--workers', type=int, default=1,
+                        help='Forked worker processes sharing one loaded model (CPU only)')
+    work_p.add_argument('--recycle-after', type=int, default=200,
+                        help='Jobs per forked worker before it is replaced (0: never)')
+    work_p.add_argument('--threads', type=int, default=1,
+                        help='torch/OpenCV threads per forked worker')
+    work_p.add_argument('--memory-budget', type=float,
+                        help='Memory limit in MB: reduced decode/canvas, and fewer '
+                             'forked workers if --workers would not fit')
+    work_p.add_argument('--worker-mb', type=float,
+                        help='Private memory per forked worker in MB '
+                             '(default: performance.memory.worker_mb, else 800)')
+
+    sub.add_parser('status', help='Job counts and per-worker throughput')
+    sub.add_parser('requeue-failed', help='Retry failed jobs')
+
+    args = parser.parse_args()
+
+    with JobQueue(args.db, lease_seconds=args.lease, max_attempts=args.max_attempts) as queue:
+        if args.command == 'enqueue':
+            added = queue.enqueue_folder(args.folder, recursive=args.recursive)
+            print(f"Enqueued {added} new job(s) from {args.folder}")
+
+        elif args.command == 'work':
+            from main import IndustrialOCRSystem, load_config
+            if args.workers > 1 and args.gpu:
+                parser.error("--workers needs CPU inference (a CUDA context does not survive fork)")
+            config = load_config(args.config) if args.config else {}
+            ocr_system = IndustrialOCRSystem(
+                languages=[args.lang], gpu=args.gpu, config=config, engine=args.engine,
+                memory_budget_mb=args.memory_budget
+            )
+            if args.workers > 1:
+                from worker_pool import ForkedWorkerPool
+                memory_cfg = config.get('performance', {}).get('memory') or {}
+                pool = ForkedWorkerPool(args.db, ocr_system, workers=args.workers,
+                                        recycle_after=args.recycle_after or None,
+                                        threads=args.threads, lease_seconds=args.lease,
+                                        max_attempts=args.max_attempts,
+                                        memory_budget=ocr_system.memory_budget,
+                                        per_worker_mb=args.worker_mb or memory_cfg.get('worker_mb', 800.0))
+                report = pool.run(exit_when_empty=args.exit_when_empty, poll_interval=args.poll)
+                print(f"Completed {report['jobs']} job(s) in {len(report['workers'])} worker process(es)")
+                print(f"  parent (model)                 RSS {report['parent']['rss_mb']:>8} MB | "
+                      f"PSS {report['parent']['pss_mb']} MB")
+                for w in report['workers']:
+                    print(f"  {w['worker']:<30} jobs {w['jobs']:>5} | peak RSS {w['peak_rss_mb']:8.1f} MB | "
+                          f"peak PSS {w['peak_pss_mb']:8.1f} MB | shared {w['shared_mb']} MB")
+                print(f"  peak total: RSS {report['peak_total_rss_mb']} MB (shared pages counted per "
+                      f"worker), PSS {report['peak_total_pss_mb']} MB (actual)")
+            else:
+                done = run_worker(queue, ocr_system, args.worker_id,
+                                  exit_when_empty=args.exit_when_empty, poll_interval=args.poll)
+                print(f"Completed {done} job(s)")
+
+        elif args.command == 'status':
+            status = queue.status()
+            print("Jobs: " + ", ".join(f"{k}={v}" for k, v in status['jobs'].items()))
+            for w in status['workers']:
+                print(f"  {w['worker']:<30} done {w['processed']:>6} | failed {w['failed']:>4} | "
+                      f"{w['images_per_min']:7.2f} img/min | idle {w['idle_seconds']:.0f} s")
+
+        elif args.command == 'requeue-failed':
+            print(f"Requeued {queue.requeue_failed()} failed job(s)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    main()
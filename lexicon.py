@@ -0,0 +1,274 @@
+"""
+Lexicon-Constrained Correction for Industrial OCR System
+=========================================================
+Snap OCR strings to the nearest known SKU / serial / batch code
+
+TECHNICAL APPROACH:
+- Symmetric-delete index (SymSpell style): every code is indexed under
+  all strings reachable by deleting up to `max_distance` characters
+- A query generates its own deletes; any code sharing a delete is a
+  candidate, verified with a bounded Damerau-Levenshtein distance
+- Delete keys are stored as sorted 64-bit hashes in numpy arrays, so
+  150k codes fit in tens of MB and a lookup is a handful of binary
+  searches (sub-millisecond)
+- Optional confusable folding (O->0, I/L->1, S->5, B->8, Z->2) makes the
+  classic stencil OCR confusions free, so the distance budget is spent
+  on real errors only
+
+Pattern validation:
+- industrial.patterns from the config are compiled once and matched
+  against the full string (e.g. BATCH-\\d{4}-[A-Z])
+"""
+
+import re
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Characters commonly confused in stencil fonts, folded to one symbol
+_CONFUSABLES = str.maketrans({'O': '0', 'Q': '0', 'D': '0', 'I': '1', 'L': '1',
+                              'S': '5', 'B': '8', 'Z': '2', 'G': '6'})
+
+
+class LexiconMatch(NamedTuple):
+    """Nearest lexicon entry for an OCR string."""
+    code: str
+    distance: int
+
+
+def edit_distance(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """
+    Optimal string alignment (Damerau-Levenshtein) distance.
+
+    Args:
+        a, b: Strings to compare
+        max_distance: Stop early and return max_distance + 1 once the
+                      distance is known to exceed it
+
+    Returns:
+        Number of insertions, deletions, substitutions and adjacent
+        transpositions needed to turn a into b
+    """
+    if a == b:
+        return 0
+    limit = max_distance if max_distance is not None else max(len(a), len(b))
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    prev_prev: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        curr = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + cost)
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, prev_prev[j - 2] + 1)
+            curr[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        prev_prev, prev = prev, curr
+    return prev[-1]
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings reachable from word by deleting up to max_distance chars."""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for w in frontier:
+            if len(w) <= 1:
+                continue
+            for i in range(len(w)):
+                next_frontier.add(w[:i] + w[i + 1:])
+        next_frontier -= results
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+class CodeLexicon:
+    """
+    Edit-distance index over a list of valid industrial codes.
+
+    Key Features:
+    - Symmetric-delete candidate generation (no scan over all codes)
+    - Hash keys in sorted numpy arrays (compact, binary-searchable)
+    - Exact-code fast path via dictionary
+    - Confusable folding for stencil OCR errors; codes that differ only
+      by confusables share a folded key and are told apart by their
+      unfolded distance to the read
+    """
+
+    def __init__(self, codes: Iterable[str], max_distance: int = 1,
+                 fold_confusables: bool = True):
+        """
+        Build the index.
+
+        Args:
+            codes: Valid codes (SKUs, serials, batch numbers)
+            max_distance: Maximum edit distance for a correction
+            fold_confusables: Treat O/0, I/1, S/5, ... as identical
+
+        Technical Note:
+        - Index size grows with len(code)^max_distance; max_distance=1 is
+          ~18 keys per code, max_distance=2 ~150 keys per code
+        """
+        self.max_distance = max_distance
+        self.fold_confusables = fold_confusables
+
+        self.codes: List[str] = []
+        self._keys: List[str] = []
+        self._key_codes: List[List[int]] = []   # key index -> code indices
+        self._exact: Dict[str, int] = {}        # code -> code index
+        key_ids: Dict[str, int] = {}
+        for code in codes:
+            code = self.normalize(code)
+            if not code or code in self._exact:
+                continue
+            self._exact[code] = len(self.codes)
+            self.codes.append(code)
+
+            # Reason: SN-5100 and SN-S100 are both valid; one folded key,
+            # both codes kept
+            key = self._fold(code)
+            if key not in key_ids:
+                key_ids[key] = len(self._keys)
+                self._keys.append(key)
+                self._key_codes.append([])
+            self._key_codes[key_ids[key]].append(self._exact[code])
+
+        hashes: List[int] = []
+        ids: List[int] = []
+        for idx, key in enumerate(self._keys):
+            for variant in _deletes(key, max_distance):
+                hashes.append(hash(variant))
+                ids.append(idx)
+
+        order = np.argsort(np.array(hashes, dtype=np.int64), kind='stable')
+        self._hashes = np.array(hashes, dtype=np.int64)[order]
+        self._ids = np.array(ids, dtype=np.int32)[order]
+
+        logger.info(f"Lexicon built: {len(self.codes)} codes, "
+                    f"{len(self._hashes)} index keys (max_distance={max_distance})")
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'CodeLexicon':
+        """
+        Load codes from a text file (one code per line, '#' for comments).
+        """
+        def _codes():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        yield line.split(',')[0]
+
+        return cls(_codes(), **kwargs)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Uppercase and drop whitespace (stencil codes are case-free)."""
+        return ''.join(text.split()).upper()
+
+    def _fold(self, text: str) -> str:
+        return text.translate(_CONFUSABLES) if self.fold_confusables else text
+
+    def lookup(self, text: str) -> Optional[LexiconMatch]:
+        """
+        Find the nearest code within the distance budget.
+
+        Args:
+            text: Cleaned OCR text
+
+        Returns:
+            LexiconMatch(code, distance) or None if nothing is close enough.
+            distance is the edit distance between the normalized OCR text
+            and the code (confusable substitutions count as edits here).
+
+        Technical Note:
+        - An exact read of a valid code is returned before any folded
+          candidate, so a good read is never "corrected"
+        - Candidates are found on folded keys (confusables are free there)
+          and ranked by their unfolded distance, then folded distance
+        """
+        normalized = self.normalize(text)
+        if not normalized:
+            return None
+
+        # Fast path: the read is a valid code
+        if normalized in self._exact:
+            return LexiconMatch(normalized, 0)
+
+        idx = self._nearest(normalized)
+        if idx is None:
+            return None
+        code = self.codes[idx]
+        return LexiconMatch(code, edit_distance(normalized, code))
+
+    def _nearest(self, normalized: str) -> Optional[int]:
+        """Candidate generation on folded keys, ranking on unfolded codes."""
+        key = self._fold(normalized)
+        probes = np.array([hash(v) for v in _deletes(key, self.max_distance)], dtype=np.int64)
+        left = np.searchsorted(self._hashes, probes, side='left')
+        right = np.searchsorted(self._hashes, probes, side='right')
+
+        best_idx, best_rank = None, None
+        seen = set()
+        for lo, hi in zip(left.tolist(), right.tolist()):
+            for key_idx in self._ids[lo:hi].tolist():
+                if key_idx in seen:
+                    continue
+                seen.add(key_idx)
+                folded = edit_distance(key, self._keys[key_idx], self.max_distance)
+                if folded > self.max_distance:
+                    continue
+                for idx in self._key_codes[key_idx]:
+                    rank = (edit_distance(normalized, self.codes[idx]), folded, self.codes[idx])
+                    if best_rank is None or rank < best_rank:
+                        best_idx, best_rank = idx, rank
+        return best_idx
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class PatternValidator:
+    """
+    Precompiled industrial text patterns (config: industrial.patterns).
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        """
+        Args:
+            patterns: {name: regex}, e.g. {'batch_number': 'BATCH-\\d{4}-[A-Z]'}
+        """
+        self.patterns = {name: re.compile(regex) for name, regex in patterns.items()}
+
+    def match(self, text: str) -> Optional[str]:
+        """Name of the first pattern matching the whole text, else None."""
+        for name, pattern in self.patterns.items():
+            if pattern.fullmatch(text):
+                return name
+        return None
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+
+def load_lexicon(path: str, max_distance: int = 1,
+                 fold_confusables: bool = True) -> CodeLexicon:
+    """Load a code list, logging where it came from."""
+    lexicon = CodeLexicon.from_file(
+        str(Path(path)), max_distance=max_distance, fold_confusables=fold_confusables
+    )
+    logger.info(f"Loaded lexicon from {path}: {len(lexicon)} codes")
+    return lexicon
@@ -0,0 +1,212 @@
+"""
+Logging Setup for Industrial OCR System
+========================================
+Non-blocking, low-overhead logging for the processing hot path
+
+Why:
+- A synchronous FileHandler + StreamHandler makes every log call pay for
+  formatting, a file write and a console write on the pipeline thread
+- Per-detection messages scale with text density (hundreds of lines for
+  a busy pallet label) and drown the useful per-image information
+
+Key Features:
+- QueueHandler on the calling thread, QueueListener thread doing the
+  formatting and I/O (the pipeline only enqueues the record)
+- Optional structured (JSON lines) output with extra fields
+- Rate limiting + sampling for high-volume loggers (per-detection lines)
+- Re-runnable: setup_logging() replaces the previous configuration, so
+  main() can apply the config file after the import-time defaults
+- Fork-safe: a forked child (worker_pool.py) gets its own queue and
+  listener thread; the parent's listener does not survive the fork
+
+Config (logging section):
+    level, file, format, console_output   (existing keys)
+    structured: true                       JSON lines instead of text
+    detections: {max_per_second, sample_rate}
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+DEFAULT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Logger receiving per-detection / per-correction lines (DEBUG level)
+DETECTION_LOGGER = 'ocr.detections'
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+# LogRecord attributes that are not user-supplied extra fields
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message + extra fields.
+
+    Extra fields come from logger.info(..., extra={'image': ..., 'ms': ...}).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Keep a sample of records and at most max_per_second of them.
+
+    Dropped records are counted; the count is reported on the next record
+    that passes, so the log still shows that lines were suppressed.
+    """
+
+    def __init__(self, max_per_second: float = 20.0, sample_rate: float = 1.0):
+        """
+        Args:
+            max_per_second: Token-bucket rate (burst of the same size)
+            sample_rate: Fraction of records considered at all (0-1)
+        """
+        super().__init__()
+        self.max_per_second = max_per_second
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._tokens = max_per_second
+        self._last = None
+        self._random = random.Random(0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_rate < 1.0 and self._random.random() >= self.sample_rate:
+            self.dropped += 1
+            return False
+
+        # Token bucket refilled from record timestamps (no clock call)
+        if self._last is not None:
+            self._tokens = min(self.max_per_second,
+                               self._tokens + (record.created - self._last) * self.max_per_second)
+        self._last = record.created
+        if self._tokens < 1.0:
+            self.dropped += 1
+            return False
+        self._tokens -= 1.0
+
+        if self.dropped:
+            record.suppressed = self.dropped
+            self.dropped = 0
+        return True
+
+
+def setup_logging(config: Optional[Dict] = None, use_queue: bool = True) -> logging.Logger:
+    """
+    (Re)configure the root logger.
+
+    Args:
+        config: The `logging` section of config.yaml (all keys optional)
+        use_queue: Route records through a background listener thread
+                   (False writes synchronously, e.g. for debugging)
+
+    Returns:
+        The root logger
+    """
+    global _listener
+    config = config or {}
+
+    handlers = []
+    if config.get('file', 'ocr_system.log'):
+        handlers.append(logging.FileHandler(config.get('file', 'ocr_system.log'), encoding='utf-8'))
+    if config.get('console_output', True):
+        handlers.append(logging.StreamHandler(sys.stdout))
+
+    formatter = (JSONFormatter() if config.get('structured')
+                 else logging.Formatter(config.get('format', DEFAULT_FORMAT)))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    with _lock:
+        # Replace any previous configuration (ours or basicConfig's)
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+
+        if use_queue:
+            log_queue: queue.Queue = queue.SimpleQueue()
+            _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            _listener.start()
+            root.addHandler(QueueHandler(log_queue))
+        else:
+            for handler in handlers:
+                root.addHandler(handler)
+
+    root.setLevel(config.get('level', 'INFO'))
+
+    # High-volume per-detection lines: sampled and rate limited
+    detections_cfg = config.get('detections') or {}
+    detection_logger = logging.getLogger(DETECTION_LOGGER)
+    for old in detection_logger.filters[:]:
+        detection_logger.removeFilter(old)
+    detection_logger.addFilter(RateLimitFilter(
+        max_per_second=detections_cfg.get('max_per_second', 20.0),
+        sample_rate=detections_cfg.get('sample_rate', 1.0)
+    ))
+    if 'level' in detections_cfg:
+        detection_logger.setLevel(detections_cfg['level'])
+
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_after_fork():
+    """
+    Give a forked child its own listener (runs in the child after fork).
+
+    Only the forking thread exists in the child, so records put on the
+    inherited queue would never be written and the queue would grow
+    without bound. Records still queued at fork time belong to the parent
+    (which writes them) and are dropped with the old queue.
+    """
+    global _listener, _lock
+    # Reason: another parent thread may have held the lock at fork time
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+
+    log_queue: queue.Queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler) and handler.queue is _listener.queue:
+            handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -19,29 +19,67 @@ PIPELINE STAGES:
 """
 
 import os
+import re
+import copy
 import sys
 import json
+import time
 import logging
 import argparse
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Sequence, Tuple, Optional, Union
 
 import cv2
 import numpy as np
 from PIL import Image
-import easyocr
-
-# Configure logging system
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ocr_system.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+import yaml
+
+from consensus import ConsensusVoter
+from deadline import Deadline, StageCostModel, canvas_megapixels
+from detections import DetectionSet, json_default
+from engines import EasyOCREngine, OCREngine, TieredOCR, create_engine
+from image_analysis import (OrientationDetector, ScalePlan, TextPresencePrefilter,
+                            load_images, plan_detector_scale, rotate_image)
+from lexicon import CodeLexicon, PatternValidator, load_lexicon
+from log_config import DETECTION_LOGGER, setup_logging
+from memory_budget import MemoryBudget, MemoryTracker, image_dimensions
+from preprocessing import (PREPROCESS_PROFILES, FastPreprocessor, apply_adaptive_threshold,
+                           apply_bilateral, apply_clahe, apply_morphology, deskew,
+                           preprocess_params, to_gray)
+from profiling import PROFILE_MODES, PipelineProfiler
+from region_cache import RegionCache, region_key
+from region_filter import RegionFilter
+from result_store import ResultStore
+from serializers import SERIALIZERS, ColumnarBatchWriter, get_serializer
+from stations import StationProfile, load_stations
+from watcher import FolderWatcher, IngestDaemon
+
+# Configure logging system (queue-based; main() re-applies the config file)
+setup_logging()
 logger = logging.getLogger(__name__)
+# Per-detection lines: DEBUG, sampled and rate limited (see log_config.py)
+detection_logger = logging.getLogger(DETECTION_LOGGER)
+
+# Characters removed by _clean_text (keep alphanumeric, dash, underscore, space)
+# Compiled once at import instead of on every detection
+_CLEAN_PATTERN = re.compile(r'[^A-Za-z0-9\-_\s]')
+
+
+def load_config(config_path: str) -> Dict:
+    """
+    Load YAML configuration (see config.yaml for all options).
+    
+    Args:
+        config_path: Path to YAML file
+    
+    Returns:
+        Configuration dictionary (empty if the file is empty)
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    logger.info(f"Configuration loaded: {config_path}")
+    return config
 
 
 class IndustrialOCRSystem:
@@ -55,13 +93,43 @@ class IndustrialOCRSystem:
     - Structured JSON output
     """
     
-    def __init__(self, languages: List[str] = ['en'], gpu: bool = False):
+    def __init__(self, languages: List[str] = ['en'], gpu: bool = False,
+                 result_store: Optional[ResultStore] = None,
+                 output_format: str = 'json',
+                 config: Optional[Dict] = None,
+                 lexicon: Optional[CodeLexicon] = None,
+                 prefilter: Optional[TextPresencePrefilter] = None,
+                 engine: Optional[Union[str, List[str], OCREngine]] = None,
+                 memory_budget_mb: Optional[float] = None,
+                 profile: Optional[str] = None,
+                 station: Optional[Union[str, StationProfile]] = None):
         """
-        Initialize OCR system with EasyOCR reader.
+        Initialize OCR system with EasyOCR reader (or other engines).
         
         Args:
             languages: List of language codes (default: English only)
             gpu: Enable GPU acceleration if available
+            result_store: Optional SQLite sink; every processed image is
+                          also indexed there for full-text search
+            output_format: Result file format (json, json-compact, orjson,
+                           msgpack); see serializers.py
+            config: Parsed YAML configuration (see load_config())
+            lexicon: Code list index for snapping OCR text to valid codes;
+                     loaded from industrial.lexicon in the config if omitted
+            prefilter: Cheap text-presence check that skips OCR on empty
+                       frames; built from performance.prefilter if omitted
+            engine: OCR backend name ('easyocr', 'tesseract'), a list of
+                    names for a cheapest-first tiered cascade, or an
+                    OCREngine instance; defaults to ocr.engine or 'easyocr'
+            memory_budget_mb: Process memory limit; large images are decoded
+                              at reduced size and the detector canvas is
+                              capped to stay under it (performance.memory)
+            profile: 'sample' or 'cprofile' to profile process_image /
+                     process_batch runs (performance.profile); batches write
+                     their profile when done, otherwise call profiler.write()
+            station: Fixed-camera station (name in the stations file from
+                     advanced.perspective_correction, or a StationProfile);
+                     frames are rectified and only its ROIs are read
         
         Technical Note:
         - EasyOCR downloads models on first run (~100MB for English)
@@ -69,22 +137,208 @@ class IndustrialOCRSystem:
         - CRAFT detector + CRNN recognizer architecture
         """
         logger.info("Initializing Industrial OCR System...")
-        try:
-            self.reader = easyocr.Reader(
-                languages, 
-                gpu=gpu,
-                verbose=False
-            )
-            logger.info(f"EasyOCR initialized successfully (GPU: {gpu})")
-        except Exception as e:
-            logger.error(f"Failed to initialize EasyOCR: {e}")
-            raise
         
         # Create output directories
         self.output_dir = Path("outputs")
         self.output_dir.mkdir(exist_ok=True)
         
-    def preprocess_image(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        self.result_store = result_store
+        self.serializer = get_serializer(output_format)
+        self.config = config or {}
+        
+        # Post-processing: pattern validation + lexicon correction
+        industrial = self.config.get('industrial', {})
+        self.pattern_validator = PatternValidator(industrial.get('patterns') or {})
+        lexicon_cfg = industrial.get('lexicon') or {}
+        if lexicon is None and lexicon_cfg.get('enabled'):
+            lexicon = load_lexicon(
+                lexicon_cfg['path'],
+                max_distance=lexicon_cfg.get('max_distance', 1),
+                fold_confusables=lexicon_cfg.get('fold_confusables', True)
+            )
+        self.lexicon = lexicon
+        
+        # Text-presence prefilter (skips detector on textless frames)
+        prefilter_cfg = self.config.get('performance', {}).get('prefilter') or {}
+        if prefilter is None and prefilter_cfg.get('enabled'):
+            prefilter = TextPresencePrefilter(
+                max_side=prefilter_cfg.get('max_side', 320),
+                min_edge_density=prefilter_cfg.get('min_edge_density', 0.004),
+                min_text_regions=prefilter_cfg.get('min_text_regions', 3)
+            )
+            if prefilter_cfg.get('calibration_dir'):
+                # Thresholds from sample text images at the recall target
+                prefilter.calibrate(load_images(prefilter_cfg['calibration_dir']),
+                                    recall=prefilter_cfg.get('recall', 0.99))
+        self.prefilter = prefilter
+        
+        # Detector parameters (ocr.easyocr in the config)
+        # Defaults reproduce the original hard-coded readtext() call;
+        # canvas_size/mag_ratio default to EasyOCR's own values
+        easyocr_cfg = self.config.get('ocr', {}).get('easyocr') or {}
+        self.readtext_params = {
+            'min_size': easyocr_cfg.get('min_size', 10),
+            'text_threshold': easyocr_cfg.get('text_threshold', 0.6),
+            'low_text': easyocr_cfg.get('low_text', 0.3),
+            'link_threshold': easyocr_cfg.get('link_threshold', 0.3),
+            'canvas_size': easyocr_cfg.get('canvas_size', 2560),
+            'mag_ratio': easyocr_cfg.get('mag_ratio', 1.0),
+        }
+        self.adaptive_scale = self.config.get('ocr', {}).get('adaptive_scale') or {}
+        
+        # Region filter between detection and recognition (ocr.region_filter)
+        # Reason: recognition cost grows with the number of regions
+        region_cfg = self.config.get('ocr', {}).get('region_filter') or {}
+        self.region_filter = None
+        if region_cfg.get('enabled'):
+            self.region_filter = RegionFilter(
+                min_width=region_cfg.get('min_width', 8),
+                min_height=region_cfg.get('min_height', 8),
+                min_area=region_cfg.get('min_area', 0),
+                max_aspect=region_cfg.get('max_aspect', 30.0),
+                overlap=region_cfg.get('overlap', 0.7),
+                mode=region_cfg.get('mode', 'merge'),
+                top_k=region_cfg.get('top_k')
+            )
+        
+        # Detector output per image (ocr.region_cache)
+        # Reason: reocr_regions() and repeated runs reuse CRAFT regions and
+        # re-run recognition only
+        cache_cfg = self.config.get('ocr', {}).get('region_cache') or {}
+        self.region_cache = None
+        if cache_cfg.get('enabled'):
+            self.region_cache = RegionCache(
+                directory=cache_cfg.get('directory'),
+                max_entries=cache_cfg.get('max_entries', 256)
+            )
+        
+        # Preprocessing parameters (preprocessing section; defaults are the
+        # original hard-coded values)
+        self.preprocess_params = preprocess_params(self.config.get('preprocessing'))
+        profile_name = self.config.get('preprocessing', {}).get('profile', 'standard')
+        if profile_name not in PREPROCESS_PROFILES:
+            raise ValueError(f"Unknown preprocessing profile '{profile_name}' "
+                             f"(choose from: {', '.join(PREPROCESS_PROFILES)})")
+        self.preprocess_profile = profile_name
+        self.fast_preprocessor = (FastPreprocessor(self.preprocess_params)
+                                  if profile_name == 'fast' else None)
+        
+        # Per-image time budget (performance.deadline); the cost model
+        # learns stage times across images
+        self.deadline_cfg = self.config.get('performance', {}).get('deadline') or {}
+        self.deadline_costs = StageCostModel(self.deadline_cfg.get('costs'))
+        self.deadline_stats = {'images': 0, 'missed': 0}
+        
+        # Grayscale-first decode (performance.grayscale); annotated images
+        # (output.annotated_images.enabled) are the only use of colour
+        # Reason: preprocessing and the detector only read intensity
+        self.grayscale = bool(self.config.get('performance', {}).get('grayscale'))
+        annotated_cfg = self.config.get('output', {}).get('annotated_images') or {}
+        self.annotate = annotated_cfg.get('enabled', True)
+        
+        # Memory tracking / budget (performance.memory)
+        memory_cfg = self.config.get('performance', {}).get('memory') or {}
+        if memory_budget_mb is None:
+            memory_budget_mb = memory_cfg.get('budget_mb')
+        self.memory_budget = None
+        if memory_budget_mb:
+            # Working set without the 3-byte colour image in grayscale mode
+            self.memory_budget = MemoryBudget(memory_budget_mb,
+                                              image_bytes_per_pixel=10.0 if self.grayscale else 12.0)
+        self.memory = MemoryTracker(
+            enabled=bool(memory_cfg.get('track')) or self.memory_budget is not None,
+            trace_python=memory_cfg.get('trace_python', False)
+        )
+        
+        # Profiling (disabled profiler is a no-op context)
+        profile_cfg = self.config.get('performance', {}).get('profile') or {}
+        self.profiler = PipelineProfiler(
+            mode=profile or profile_cfg.get('mode'),
+            output_dir=profile_cfg.get('output_dir', str(self.output_dir / 'profile')),
+            interval=profile_cfg.get('interval_ms', 5) / 1000.0,
+            top=profile_cfg.get('top', 25)
+        )
+        
+        # OCR engine(s)
+        try:
+            if engine is None:
+                engine = self.config.get('ocr', {}).get('engine', 'easyocr')
+            self.engine = self._build_engine(engine, languages, gpu)
+            logger.info(f"OCR engine initialized successfully: {self.engine.name} (GPU: {gpu})")
+        except Exception as e:
+            logger.error(f"Failed to initialize OCR engine: {e}")
+            raise
+        
+        # Direct EasyOCR reader access (None if EasyOCR is not in use)
+        engines = self.engine.engines if isinstance(self.engine, TieredOCR) else [self.engine]
+        self.reader = next(
+            (e.reader for e in engines if isinstance(e, EasyOCREngine)), None
+        )
+        
+        # Fixed-camera station (advanced.perspective_correction)
+        perspective_cfg = self.config.get('advanced', {}).get('perspective_correction') or {}
+        if station is None and perspective_cfg.get('enabled'):
+            station = perspective_cfg.get('station')
+        if isinstance(station, str):
+            stations = load_stations(perspective_cfg.get('stations_file', 'stations.yaml'))
+            if station not in stations:
+                raise ValueError(f"Unknown station '{station}' (available: {', '.join(stations)})")
+            station = stations[station]
+        self.station = station
+        
+        # Coarse orientation (preprocessing.orientation); the probe reuses
+        # the engine's recognizer on a few text lines
+        orientation_cfg = self.config.get('preprocessing', {}).get('orientation') or {}
+        self.orientation = None
+        if orientation_cfg.get('enabled'):
+            self.orientation = OrientationDetector(
+                probe=self.engine.recognize if orientation_cfg.get('probe', True) else None,
+                max_side=orientation_cfg.get('max_side', 800),
+                max_lines=orientation_cfg.get('max_lines', 3)
+            )
+        
+        # Multi-frame consensus (postprocessing.consensus), see process_frames()
+        self.consensus_cfg = self.config.get('postprocessing', {}).get('consensus') or {}
+    
+    def _build_engine(self, spec: Union[str, List[str], OCREngine],
+                      languages: List[str], gpu: bool) -> OCREngine:
+        """
+        Create a single engine or a tiered cascade.
+        
+        Tiered mode ("tesseract,easyocr"): regions from the first engine are
+        escalated when confidence < ocr.escalation.min_confidence or, if
+        ocr.escalation.validate_patterns is set, when the text matches
+        neither an industrial pattern nor a lexicon code.
+        """
+        if isinstance(spec, OCREngine):
+            return spec
+        names = [n.strip() for n in spec.split(',')] if isinstance(spec, str) else list(spec)
+        options = self.config.get('ocr', {}).get('engine_options') or {}
+        engines = [create_engine(name, languages=languages, gpu=gpu, **(options.get(name) or {}))
+                   for name in names]
+        if len(engines) == 1:
+            return engines[0]
+        
+        escalation = self.config.get('ocr', {}).get('escalation') or {}
+        validate = None
+        if escalation.get('validate_patterns', True) and (self.pattern_validator or self.lexicon):
+            validate = self._is_valid_text
+        return TieredOCR(
+            engines,
+            min_confidence=escalation.get('min_confidence', 0.6),
+            validate=validate
+        )
+    
+    def _is_valid_text(self, text: str) -> bool:
+        """True if cleaned text matches an industrial pattern or a lexicon code."""
+        cleaned = self._clean_text(text)
+        if self.pattern_validator and self.pattern_validator.match(cleaned):
+            return True
+        return self.lexicon is not None and self.lexicon.lookup(cleaned) is not None
+        
+    def preprocess_image(self, image: np.ndarray, deskew: bool = True,
+                         params: Optional[Dict] = None,
+                         fast: Optional[bool] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Advanced preprocessing pipeline for industrial images.
         
@@ -96,7 +350,13 @@ class IndustrialOCRSystem:
         5. Morphological operations - Connects broken characters
         
         Args:
-            image: Input BGR image from cv2.imread()
+            image: Input BGR image from cv2.imread(), or a single-channel
+                   uint8 image (grayscale mode; used without a copy)
+            deskew: Estimate and correct small rotations (not needed for
+                    rectified station ROIs)
+            params: Per-step parameters (default: self.preprocess_params,
+                    i.e. the preprocessing section of the config)
+            fast: Use the FastPreprocessor chain (default: preprocessing.profile)
         
         Returns:
             Tuple of (preprocessed_image, visualization_image)
@@ -107,51 +367,51 @@ class IndustrialOCRSystem:
         - Adaptive threshold: Handles shadows and uneven lighting on boxes
         - Morphology: Reconnects cracked/chipped stenciled characters
         """
-        logger.info("Starting preprocessing pipeline...")
+        logger.debug("Starting preprocessing pipeline...")
+        if fast is None:
+            fast = self.preprocess_profile == 'fast'
+        if fast and params is None:
+            # Fast profile: reduced-resolution bilateral, reused buffers
+            # (see FastPreprocessor in preprocessing.py)
+            if self.fast_preprocessor is None:
+                self.fast_preprocessor = FastPreprocessor(self.preprocess_params)
+            return self.fast_preprocessor.apply(image, deskew_image=deskew)
+        params = params or self.preprocess_params
         
         # Step 1: Convert to grayscale
         # Reason: Reduces 3-channel complexity, focuses on luminance
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image.copy()
+        # (grayscale-decoded images are only read, so no copy is needed)
+        gray = image if image.ndim == 2 else to_gray(image)
         
         # Step 2: Apply CLAHE (Contrast Limited Adaptive Histogram Equalization)
         # Reason: Enhances local contrast in faded/weathered text regions
-        # Parameters: clipLimit=3.0 prevents over-amplification of noise
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
+        # Parameters: clip_limit (default 3.0) prevents over-amplification of noise
+        enhanced = apply_clahe(gray, params['clahe'])
         
         # Step 3: Bilateral filtering
         # Reason: Reduces noise while preserving sharp text edges
-        # Parameters: d=9 (neighborhood), sigmaColor=75, sigmaSpace=75
-        denoised = cv2.bilateralFilter(enhanced, d=9, sigmaColor=75, sigmaSpace=75)
+        # Parameters: d=9 (neighborhood), sigma_color=75, sigma_space=75 by default
+        denoised = apply_bilateral(enhanced, params['bilateral'])
         
         # Step 4: Adaptive thresholding
         # Reason: Binarization that adapts to local lighting conditions
         # Method: Gaussian-weighted mean of neighborhood
-        binary = cv2.adaptiveThreshold(
-            denoised,
-            255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY,
-            blockSize=11,
-            C=2
-        )
+        binary = apply_adaptive_threshold(denoised, params['adaptive_threshold'])
         
         # Step 5: Morphological operations
         # Reason: Connect broken characters, remove small noise artifacts
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-        morph = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=1)
+        morph = apply_morphology(binary, params['morphology'])
         
         # Optional: Deskewing (correct text rotation)
         # Useful for angled photos of boxes
-        morph = self._deskew_image(morph)
+        if deskew:
+            morph = self._deskew_image(morph, params['deskew'])
         
-        logger.info("Preprocessing completed successfully")
+        logger.debug("Preprocessing completed successfully")
         return morph, enhanced
     
-    def _deskew_image(self, image: np.ndarray) -> np.ndarray:
+    def _deskew_image(self, image: np.ndarray,
+                      params: Optional[Dict] = None) -> np.ndarray:
         """
         Correct skewed text orientation using moment-based angle detection.
         
@@ -159,46 +419,56 @@ class IndustrialOCRSystem:
         - Calculate image moments to find orientation
         - Rotate image to align text horizontally
         - Critical for angled photos of industrial boxes
+        - preprocessing.deskew in the config: enabled, min_angle (degrees)
+        """
+        return deskew(image, params or self.preprocess_params['deskew'])
+    
+    def plan_scale(self, preprocessed: np.ndarray) -> Optional[ScalePlan]:
         """
-        coords = np.column_stack(np.where(image > 0))
-        if len(coords) == 0:
-            return image
+        Choose detector canvas/magnification from the estimated text size.
         
-        angle = cv2.minAreaRect(coords)[-1]
+        Enabled by ocr.adaptive_scale.enabled in the config. The configured
+        canvas_size and mag_ratio act as upper bounds, min_size as lower bound.
         
-        # Adjust angle based on orientation
-        if angle < -45:
-            angle = -(90 + angle)
-        else:
-            angle = -angle
-        
-        # Only correct if skew is significant (> 0.5 degrees)
-        if abs(angle) < 0.5:
-            return image
-        
-        # Rotate image
-        (h, w) = image.shape[:2]
-        center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-        rotated = cv2.warpAffine(
-            image, M, (w, h),
-            flags=cv2.INTER_CUBIC,
-            borderMode=cv2.BORDER_REPLICATE
-        )
+        Returns:
+            ScalePlan, or None when adaptive scaling is disabled
+        """
+        if not self.adaptive_scale.get('enabled'):
+            return None
         
-        logger.info(f"Deskewed image by {angle:.2f} degrees")
-        return rotated
+        plan = plan_detector_scale(
+            preprocessed,
+            max_canvas=self.readtext_params['canvas_size'],
+            max_mag=self.readtext_params['mag_ratio'],
+            min_size=self.readtext_params['min_size'],
+            target_char_height=self.adaptive_scale.get('target_char_height', 32.0)
+        )
+        logger.debug("Scale plan: canvas=%d, mag=%s, min_size=%d (char height: %s)",
+                     plan.canvas_size, plan.mag_ratio, plan.min_size, plan.char_height)
+        return plan
     
-    def run_ocr(self, image: np.ndarray, preprocessed: np.ndarray) -> List[Dict]:
+    def run_ocr(self, image: np.ndarray, preprocessed: np.ndarray,
+                scale_plan: Optional[ScalePlan] = None,
+                params: Optional[Dict] = None,
+                region_filter: Optional[RegionFilter] = None) -> DetectionSet:
         """
         Execute OCR inference using EasyOCR with optimized parameters.
         
         Args:
             image: Original color image (for visualization)
             preprocessed: Preprocessed binary image (for better OCR)
+            scale_plan: Optional per-image detector resolution from plan_scale()
+            params: Detector parameter overrides (keys of readtext_params,
+                    e.g. text_threshold) for this call only
+            region_filter: Region filter for this call (default:
+                           self.region_filter from ocr.region_filter)
+        
+        With ocr.region_cache enabled, detector regions are looked up in
+        (or added to) the cache and only recognition runs on a hit.
         
         Returns:
-            List of detection dictionaries with text, confidence, and bbox
+            DetectionSet (columnar text, confidence, bbox and polygon);
+            indexing or iterating it yields the familiar detection dicts
         
         EasyOCR Parameters Explained:
         - detail=1: Returns bounding box coordinates
@@ -207,58 +477,95 @@ class IndustrialOCRSystem:
         - text_threshold=0.6: Confidence threshold for character detection
         - low_text=0.3: Threshold for linking characters into words
         - link_threshold=0.3: Threshold for linking text regions
+        - canvas_size / mag_ratio: Detector input resolution (config, or
+          per image from the scale plan)
         
         Why these settings for industrial text:
         - Lower thresholds (0.6 vs default 0.7) to catch faded text
         - min_size=10 to detect small stenciled characters
         - paragraph=False for isolated text blocks on boxes
         """
-        logger.info("Running OCR inference...")
+        logger.debug("Running OCR inference...")
         
         try:
-            # Run EasyOCR on preprocessed image
-            results = self.reader.readtext(
-                preprocessed,
-                detail=1,
-                paragraph=False,
-                min_size=10,
-                text_threshold=0.6,
-                low_text=0.3,
-                link_threshold=0.3
-            )
+            params = self._detector_params(preprocessed, scale_plan, params)
             
-            # Parse results into structured format
-            detections = []
-            for idx, (bbox, text, confidence) in enumerate(results):
-                # Extract bounding box coordinates
-                # bbox format: [[x1,y1], [x2,y2], [x3,y3], [x4,y4]]
-                bbox_array = np.array(bbox).astype(int)
-                x_min = int(bbox_array[:, 0].min())
-                y_min = int(bbox_array[:, 1].min())
-                x_max = int(bbox_array[:, 0].max())
-                y_max = int(bbox_array[:, 1].max())
-                
-                # Clean and validate text
-                cleaned_text = self._clean_text(text)
-                
-                detection = {
-                    'id': f"detection_{idx:03d}",
-                    'text': cleaned_text,
-                    'raw_text': text,
-                    'confidence': round(confidence, 3),
-                    'bbox': [x_min, y_min, x_max, y_max],
-                    'bbox_polygon': bbox_array.tolist()
-                }
-                
-                detections.append(detection)
-                logger.info(f"Detected: '{cleaned_text}' (confidence: {confidence:.3f})")
+            # Run OCR engine on preprocessed image
+            # (EasyOCR: detail=1, paragraph=False)
+            region_filter = region_filter or self.region_filter
+            polygons = self.detect_regions(preprocessed, params) if self.region_cache is not None else None
+            if polygons is not None:
+                if region_filter is not None:
+                    polygons = [region.polygon for region in region_filter.filter(polygons)]
+                results = self.engine.recognize(preprocessed, polygons)
+            elif region_filter is not None:
+                results = self.engine.readtext_filtered(preprocessed, region_filter, **params)
+            else:
+                results = self.engine.readtext(preprocessed, **params)
+            
+            # Parse results into compact columnar format
+            # bbox format: [[x1,y1], [x2,y2], [x3,y3], [x4,y4]]
+            # Reason: per-detection dicts with nested lists dominate memory in
+            # large batches; dicts are only materialized at serialization
+            detections = DetectionSet.from_readtext(results, self._clean_text)
+            detections = self._apply_lexicon(detections)
             
-            logger.info(f"OCR completed: {len(detections)} text regions detected")
+            # Reason: skip the loop entirely unless detection lines are wanted
+            if detection_logger.isEnabledFor(logging.DEBUG):
+                for text, confidence in zip(detections.texts, detections.confidence.tolist()):
+                    detection_logger.debug("Detected: '%s' (confidence: %.3f)", text, confidence)
+            
+            logger.debug("OCR completed: %d text regions detected", len(detections))
             return detections
             
         except Exception as e:
             logger.error(f"OCR inference failed: {e}")
-            return []
+            return DetectionSet.empty()
+    
+    def _detector_params(self, preprocessed: np.ndarray,
+                         scale_plan: Optional[ScalePlan] = None,
+                         params: Optional[Dict] = None) -> Dict:
+        """Detector parameters of one engine call (config, overrides, scale plan, memory budget)."""
+        params = dict(self.readtext_params, **(params or {}))
+        if scale_plan is not None:
+            params.update(
+                canvas_size=scale_plan.canvas_size,
+                mag_ratio=scale_plan.mag_ratio,
+                min_size=scale_plan.min_size
+            )
+        if self.memory_budget is not None:
+            # Detector activations scale with canvas area
+            h, w = preprocessed.shape[:2]
+            params['canvas_size'] = self.memory_budget.max_canvas(
+                params['canvas_size'], aspect=min(h, w) / max(h, w)
+            )
+        return params
+    
+    def detect_regions(self, preprocessed: np.ndarray,
+                       params: Optional[Dict] = None) -> Optional[List]:
+        """
+        Detector regions of a preprocessed image, from the region cache
+        when enabled.
+        
+        Args:
+            preprocessed: Image passed to the engine
+            params: Full detector parameters (as passed to readtext)
+        
+        Returns:
+            Polygons in preprocessed-image coordinates, or None if the
+            engine has no separate detector
+        """
+        params = dict(self.readtext_params) if params is None else params
+        key = region_key(preprocessed, params) if self.region_cache is not None else None
+        polygons = self.region_cache.get(key) if key is not None else None
+        if polygons is None:
+            try:
+                polygons = self.engine.detect(preprocessed, **params)
+            except NotImplementedError:
+                return None
+            if key is not None:
+                self.region_cache.put(key, polygons)
+        return polygons
     
     def _clean_text(self, text: str) -> str:
         """
@@ -278,8 +585,7 @@ class IndustrialOCRSystem:
         cleaned = text.strip()
         
         # Remove unwanted characters (keep alphanumeric, dash, underscore, space)
-        import re
-        cleaned = re.sub(r'[^A-Za-z0-9\-_\s]', '', cleaned)
+        cleaned = _CLEAN_PATTERN.sub('', cleaned)
         
         # Optional: Fix common OCR errors
         # Uncomment if needed for specific use cases
@@ -288,7 +594,58 @@ class IndustrialOCRSystem:
         
         return cleaned
     
-    def structure_output(self, detections: List[Dict], filename: str) -> Dict:
+    def _apply_lexicon(self, detections: DetectionSet) -> DetectionSet:
+        """
+        Snap detected text to known codes and validate industrial patterns.
+        
+        Adds per-detection fields (only when the feature is configured):
+        - edit_distance: distance to the matched lexicon code (0 = exact)
+        - corrected_from: cleaned OCR text before snapping (when changed)
+        - pattern_valid / pattern: whether (and which) industrial.patterns
+          regex matches the final text
+        
+        The original OCR string is always kept in raw_text.
+        
+        Why a lexicon for industrial text:
+        - Valid SKUs/serials are a closed set; a near-miss like SERIAL-XYZ-I23
+          is almost always a recognizer confusion, not a new code
+        - Distance budget keeps unrelated strings from being force-matched
+        """
+        if not len(detections) or (self.lexicon is None and not self.pattern_validator):
+            return detections
+        
+        distances, corrected_from = [], []
+        for i, text in enumerate(detections.texts):
+            match = self.lexicon.lookup(text) if self.lexicon is not None else None
+            if match is None:
+                distances.append(None)
+                corrected_from.append(None)
+                continue
+            
+            distances.append(match.distance)
+            if match.code != text:
+                # Keep original OCR output visible in raw_text
+                if detections.raw_texts[i] is None:
+                    detections.raw_texts[i] = text
+                detections.texts[i] = match.code
+                corrected_from.append(text)
+                detection_logger.debug("Lexicon correction: '%s' -> '%s' (distance: %d)",
+                                       text, match.code, match.distance)
+            else:
+                corrected_from.append(None)
+        
+        if self.lexicon is not None:
+            detections.set_column('edit_distance', distances)
+            detections.set_column('corrected_from', corrected_from)
+        
+        if self.pattern_validator:
+            patterns = [self.pattern_validator.match(t) for t in detections.texts]
+            detections.set_column('pattern_valid', [p is not None for p in patterns])
+            detections.set_column('pattern', patterns)
+        
+        return detections
+    
+    def structure_output(self, detections: DetectionSet, filename: str) -> Dict:
         """
         Convert OCR detections into structured JSON format.
         
@@ -298,15 +655,19 @@ class IndustrialOCRSystem:
         - Summary: statistics and quality metrics
         
         Args:
-            detections: List of detection dictionaries from run_ocr()
+            detections: DetectionSet from run_ocr() (a list of detection
+                        dictionaries is accepted too)
             filename: Original image filename
         
         Returns:
-            Structured dictionary ready for JSON serialization
+            Structured dictionary; 'detections' stays a DetectionSet until
+            serialized with json.dump(..., default=json_default)
         """
+        detections = DetectionSet.coerce(detections)
+        
         # Calculate summary statistics
-        avg_confidence = np.mean([d['confidence'] for d in detections]) if detections else 0.0
-        high_conf_count = sum(1 for d in detections if d['confidence'] > 0.8)
+        avg_confidence = detections.mean_confidence()
+        high_conf_count = int((detections.confidence > 0.8).sum())
         
         structured_output = {
             'metadata': {
@@ -319,14 +680,14 @@ class IndustrialOCRSystem:
             },
             'detections': detections,
             'summary': {
-                'extracted_texts': [d['text'] for d in detections],
+                'extracted_texts': list(detections.texts),
                 'quality_score': self._calculate_quality_score(detections)
             }
         }
         
         return structured_output
     
-    def _calculate_quality_score(self, detections: List[Dict]) -> str:
+    def _calculate_quality_score(self, detections: DetectionSet) -> str:
         """
         Assess overall OCR quality based on confidence scores.
         
@@ -336,10 +697,11 @@ class IndustrialOCRSystem:
         - FAIR: avg confidence > 0.50
         - POOR: avg confidence <= 0.50
         """
-        if not detections:
+        detections = DetectionSet.coerce(detections)
+        if not len(detections):
             return "NO_TEXT_DETECTED"
         
-        avg_conf = np.mean([d['confidence'] for d in detections])
+        avg_conf = detections.mean_confidence()
         
         if avg_conf > 0.85:
             return "EXCELLENT"
@@ -351,35 +713,45 @@ class IndustrialOCRSystem:
             return "POOR"
     
     def save_results(self, output_data: Dict, image: np.ndarray, 
-                     detections: List[Dict], output_name: str) -> Tuple[str, str]:
+                     detections: DetectionSet, output_name: str,
+                     annotation_scale: float = 1.0) -> Tuple[str, Optional[str]]:
         """
         Save OCR results to disk (JSON + annotated image).
         
         Outputs:
-        1. JSON file: Structured text data with metadata
+        1. Result file: Structured text data with metadata, encoded with
+           the configured serializer (pretty JSON by default)
         2. Annotated image: Visual verification with bounding boxes
         
         Args:
             output_data: Structured output from structure_output()
-            image: Original image for annotation
+            image: Original image for annotation (BGR, or grayscale: boxes
+                   are then drawn on a BGR copy made here)
             detections: Detection list for drawing boxes
             output_name: Base name for output files
+            annotation_scale: Image size / detection coordinate size
+                              (< 1 when the image was decoded reduced)
         
         Returns:
-            Tuple of (json_path, image_path)
+            Tuple of (result_path, image_path); image_path is None when
+            output.annotated_images.enabled is false
         """
-        # Save JSON output
-        json_path = self.output_dir / f"{output_name}.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        logger.info(f"JSON saved: {json_path}")
+        # Save structured output
+        json_path = self.output_dir / f"{output_name}{self.serializer.extension}"
+        self.serializer.write(output_data, json_path)
+        logger.debug("%s saved: %s", self.serializer.name, json_path)
+        if not self.annotate or image is None:
+            return str(json_path), None
         
         # Create annotated image
-        annotated = image.copy()
-        for detection in detections:
-            bbox = detection['bbox']
-            text = detection['text']
-            conf = detection['confidence']
+        # (the only colour buffer of a grayscale-mode image)
+        annotated = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image.copy()
+        detections = DetectionSet.coerce(detections)
+        boxes = detections.bbox
+        if annotation_scale != 1.0:
+            boxes = np.rint(boxes * annotation_scale).astype(np.int32)
+        for bbox, text, conf in zip(boxes.tolist(), detections.texts,
+                                    detections.confidence.tolist()):
             
             # Draw bounding box (color based on confidence)
             # Green: high confidence (>0.8)
@@ -402,11 +774,86 @@ class IndustrialOCRSystem:
         # Save annotated image
         image_path = self.output_dir / f"{output_name}_annotated.jpg"
         cv2.imwrite(str(image_path), annotated)
-        logger.info(f"Annotated image saved: {image_path}")
+        logger.debug("Annotated image saved: %s", image_path)
         
         return str(json_path), str(image_path)
     
-    def process_image(self, image_path: str) -> Optional[Dict]:
+    def _ocr_within_deadline(self, image: np.ndarray, deadline: Deadline
+                             ) -> Tuple[DetectionSet, Optional[ScalePlan], RegionFilter]:
+        """
+        Preprocess + OCR, degraded as far as needed to meet the deadline.
+        
+        Same steps as the standard path of process_image; before each one
+        the deadline compares estimated cost with the time left and picks
+        the fast chain, skips deskew, lowers the detector canvas and caps
+        the regions recognized. Measured times update the cost model.
+        
+        Returns:
+            Tuple of (detections, scale plan or None, region filter used)
+        """
+        h, w = image.shape[:2]
+        megapixels = h * w / 1e6
+        canvas_size = self.readtext_params['canvas_size']
+        mag_ratio = self.readtext_params['mag_ratio']
+        
+        # Step 1: Preprocessing chain and deskew
+        fast, run_deskew = deadline.choose_preprocess(
+            megapixels, canvas_megapixels(h, w, canvas_size, mag_ratio),
+            deskew_enabled=self.preprocess_params['deskew'].get('enabled', True),
+            fast=self.preprocess_profile == 'fast'
+        )
+        with self.memory.stage('preprocess'):
+            stage_start = time.perf_counter()
+            preprocessed, _ = self.preprocess_image(image, deskew=False, fast=fast)
+            ms = (time.perf_counter() - stage_start) * 1000
+            deadline.record('preprocess', ms)
+            self.deadline_costs.observe('preprocess_fast' if fast else 'preprocess', megapixels, ms)
+            if run_deskew:
+                stage_start = time.perf_counter()
+                preprocessed = self._deskew_image(preprocessed)
+                ms = (time.perf_counter() - stage_start) * 1000
+                deadline.record('deskew', ms)
+                self.deadline_costs.observe('deskew', megapixels, ms)
+        
+        with self.memory.stage('ocr'):
+            # Step 2: Detector canvas
+            # Reason: detector cost grows with canvas pixels
+            scale_plan = self.plan_scale(preprocessed)
+            if scale_plan is not None:
+                canvas_size, mag_ratio = scale_plan.canvas_size, scale_plan.mag_ratio
+            canvas = deadline.choose_canvas(h, w, canvas_size, mag_ratio)
+            overrides = None
+            if canvas < canvas_size:
+                if scale_plan is not None:
+                    scale_plan = scale_plan._replace(canvas_size=canvas)
+                else:
+                    overrides = {'canvas_size': canvas}
+            canvas_mp = canvas_megapixels(h, w, canvas, mag_ratio)
+            
+            # Step 3: Cap the regions recognized (largest first)
+            # Reason: recognition cost grows with the number of regions
+            cap = deadline.region_cap(canvas_mp)
+            if self.region_filter is not None:
+                # Shallow copy shares the configured filter's counters
+                region_filter = copy.copy(self.region_filter)
+                if region_filter.top_k is None or region_filter.top_k > cap:
+                    region_filter.top_k = cap
+            else:
+                region_filter = RegionFilter(min_width=0, min_height=0, max_aspect=float('inf'),
+                                             overlap=None, top_k=cap)
+            
+            stage_start = time.perf_counter()
+            detections = self.run_ocr(image, preprocessed, scale_plan, params=overrides,
+                                      region_filter=region_filter)
+            ms = (time.perf_counter() - stage_start) * 1000
+        deadline.record('ocr', ms)
+        self.deadline_costs.observe_ocr(canvas_mp, region_filter.last.get('recognized', len(detections)), ms)
+        if region_filter.last.get('top_k'):
+            deadline.mark_region_cap()
+        return detections, scale_plan, region_filter
+    
+    def process_image(self, image_path: str,
+                      deadline_ms: Optional[float] = None) -> Optional[Dict]:
         """
         Complete end-to-end OCR pipeline for a single image.
         
@@ -419,43 +866,488 @@ class IndustrialOCRSystem:
         
         Args:
             image_path: Path to input image
+            deadline_ms: Time budget for this image (default:
+                         performance.deadline.budget_ms); preprocessing and
+                         OCR degrade to fit it, recorded in metadata.deadline
         
         Returns:
-            Structured output dictionary or None if failed
+            Structured output dictionary or None if failed; 'detections'
+            is a DetectionSet (serialize with default=json_default, or
+            call .to_dicts() for a plain list)
         """
-        logger.info(f"Processing image: {image_path}")
+        logger.debug("Processing image: %s", image_path)
+        self.memory.reset()
+        start = time.perf_counter()
+        deadline_ms = deadline_ms or self.deadline_cfg.get('budget_ms')
+        deadline = None
+        if deadline_ms:
+            deadline = Deadline(deadline_ms, self.deadline_costs,
+                                safety=self.deadline_cfg.get('safety', 0.9),
+                                min_canvas=self.deadline_cfg.get('min_canvas', 640))
         
-        try:
-            # Load image
-            image = cv2.imread(image_path)
+        with self.profiler.session():
+            try:
+                # Load image
+                with self.memory.stage('load'):
+                    image, reduction = self._load_image(image_path)
+                if image is None:
+                    logger.error(f"Failed to load image: {image_path}")
+                    return None
+                if deadline is not None:
+                    deadline.record('load', deadline.elapsed_ms())
+                
+                # Text-presence prefilter (optional)
+                # Reason: empty belt/box-side frames never need CRAFT + CRNN
+                presence = None
+                orientation = None
+                regions = None
+                if self.prefilter is not None:
+                    with self.memory.stage('prefilter'):
+                        presence = self.prefilter.check(image)
+                scale_plan = None
+                
+                if presence is not None and not presence.has_text:
+                    logger.debug("Prefilter: no text-like structure, skipping OCR")
+                    detections = DetectionSet.empty()
+                elif self.station is not None:
+                    # Fixed camera: one cached remap, OCR on the label ROIs only
+                    with self.memory.stage('ocr'):
+                        detections, image = self.process_station_frame(image)
+                else:
+                    # Coarse 90-degree orientation (optional)
+                    # Reason: the rest of the pipeline then runs exactly once,
+                    # on upright text
+                    if self.orientation is not None:
+                        with self.memory.stage('orientation'):
+                            orientation = self.orientation.detect(image)
+                        if orientation.rotation:
+                            image = rotate_image(image, orientation.rotation)
+                    
+                    if deadline is not None:
+                        # Time budget: same steps, degraded to fit
+                        detections, scale_plan, region_filter = self._ocr_within_deadline(image, deadline)
+                        regions = dict(region_filter.last)
+                    else:
+                        # Preprocess
+                        with self.memory.stage('preprocess'):
+                            preprocessed, enhanced = self.preprocess_image(image)
+                        
+                        # Plan detector resolution (optional), then run OCR
+                        with self.memory.stage('ocr'):
+                            scale_plan = self.plan_scale(preprocessed)
+                            detections = self.run_ocr(image, preprocessed, scale_plan)
+                        if self.region_filter is not None:
+                            regions = dict(self.region_filter.last)
+                        del preprocessed, enhanced
+                
+                if not self.annotate:
+                    # Reason: the decoded image is only kept for annotations
+                    image = None
+                
+                # Report coordinates in full-resolution pixels
+                detections.scale_geometry(reduction)
+                
+                # Structure output
+                filename = Path(image_path).name
+                output_data = self.structure_output(detections, filename)
+                if reduction > 1:
+                    output_data['metadata']['decode_reduction'] = reduction
+                if scale_plan is not None:
+                    output_data['metadata']['scale_plan'] = scale_plan._asdict()
+                if orientation is not None:
+                    # Coordinates refer to the image after this rotation
+                    output_data['metadata']['orientation'] = orientation._asdict()
+                if self.station is not None:
+                    # Coordinates refer to the rectified station image
+                    output_data['metadata']['station'] = {
+                        'name': self.station.name,
+                        'rois': [roi.name for roi in self.station.rois]
+                    }
+                if regions is not None:
+                    output_data['metadata']['region_filter'] = regions
+                if presence is not None:
+                    output_data['metadata']['prefilter'] = {
+                        'skipped': not presence.has_text,
+                        'text_regions': presence.text_regions,
+                        'edge_density': round(presence.edge_density, 4)
+                    }
+                
+                if self.memory.enabled:
+                    output_data['metadata']['memory'] = self.memory.report()
+                if deadline is not None:
+                    # Elapsed up to here (saving the result is not included)
+                    report = deadline.report()
+                    output_data['metadata']['deadline'] = report
+                    self.deadline_stats['images'] += 1
+                    for name in report['degradations']:
+                        self.deadline_stats[name] = self.deadline_stats.get(name, 0) + 1
+                    if not report['met']:
+                        self.deadline_stats['missed'] += 1
+                        logger.warning(f"{Path(image_path).name}: deadline missed "
+                                       f"({report['elapsed_ms']:.0f} of {report['budget_ms']:.0f} ms, "
+                                       f"degradations: {', '.join(report['degradations']) or 'none'})")
+                
+                # Save results
+                output_name = Path(image_path).stem
+                with self.memory.stage('save'):
+                    json_path, img_path = self.save_results(
+                        output_data, image, detections, output_name,
+                        annotation_scale=1.0 / reduction
+                    )
+                
+                # Index in result store (optional)
+                if self.result_store is not None:
+                    self.result_store.add_result(output_data, source_path=image_path)
+                
+                # One summary line per image (stage details are DEBUG)
+                metadata = output_data['metadata']
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                logger.info(
+                    "%s: %d detections, avg confidence %.3f, %.0f ms",
+                    filename, metadata['total_detections'],
+                    metadata['average_confidence'], elapsed_ms,
+                    extra={'image': filename, 'detections': metadata['total_detections'],
+                           'avg_confidence': metadata['average_confidence'],
+                           'elapsed_ms': round(elapsed_ms, 1)}
+                )
+                return output_data
+                
+            except Exception as e:
+                logger.error(f"Error processing image: {e}", exc_info=True)
+                return None
+    
+    def reocr_regions(self, image: Union[str, np.ndarray], result: Optional[Dict] = None,
+                      indices: Optional[Sequence[int]] = None,
+                      rois: Optional[Sequence] = None,
+                      params: Optional[Dict] = None,
+                      save: bool = False) -> Optional[Dict]:
+        """
+        Re-run recognition only, on selected regions of a processed image.
+        
+        Use after an operator corrected a crop or to try other recognizer
+        settings: the detector is not run for selected detections and ROIs,
+        and a whole-image re-run takes its regions from the region cache.
+        
+        Args:
+            image: Image path, or the decoded image (BGR, full resolution)
+            result: Earlier process_image() output for this image
+            indices: Detections of result to recognize again (their
+                     bbox_polygon is reused)
+            rois: Additional regions in image pixels, [x1, y1, x2, y2] or
+                  4-point polygons (e.g. drawn in the Streamlit app);
+                  earlier detections mostly inside an ROI are replaced
+            params: Recognizer settings for this call (EasyOCR: allowlist,
+                    decoder, beamWidth, ...)
+            save: Also save the updated result (result file + annotated image)
+        
+        Returns:
+            Updated result (same shape as process_image output, with
+            metadata.reocr and a 'reocr' flag on re-read detections),
+            or None if the image cannot be loaded
+        
+        Technical Note:
+        - Without indices and ROIs every detector region is recognized
+          again and the result is replaced
+        - The image goes through the same decode reduction, orientation
+          and preprocessing as in process_image, so stored coordinates
+          map onto the preprocessed image
+        """
+        metadata = (result or {}).get('metadata', {})
+        if 'station' in metadata:
+            raise ValueError("Station results: re-run process_station_frame on the frame instead")
+        
+        # Step 1: Same image the detector saw
+        if isinstance(image, np.ndarray):
+            filename = metadata.get('filename', 'image')
+            reduction = 1
+        else:
+            filename = Path(image).name
+            image, reduction = self._load_image(str(image))
             if image is None:
-                logger.error(f"Failed to load image: {image_path}")
+                logger.error(f"Failed to load image: {filename}")
                 return None
-            
-            # Preprocess
-            preprocessed, enhanced = self.preprocess_image(image)
-            
-            # Run OCR
-            detections = self.run_ocr(image, preprocessed)
-            
-            # Structure output
-            filename = Path(image_path).name
-            output_data = self.structure_output(detections, filename)
-            
-            # Save results
-            output_name = Path(image_path).stem
-            json_path, img_path = self.save_results(
-                output_data, image, detections, output_name
-            )
-            
-            logger.info(f"Processing completed successfully")
-            return output_data
-            
-        except Exception as e:
-            logger.error(f"Error processing image: {e}", exc_info=True)
-            return None
+        rotation = (metadata.get('orientation') or {}).get('rotation', 0)
+        if rotation:
+            image = rotate_image(image, rotation)
+        preprocessed, _ = self.preprocess_image(image)
+        
+        # Step 2: Regions to recognize (preprocessed-image coordinates)
+        existing = DetectionSet.coerce(result['detections']) if result else DetectionSet.empty()
+        indices = sorted(set(int(i) for i in indices or []))
+        roi_polygons = [self._roi_polygon(roi) for roi in rois or []]
+        full_image = not indices and not roi_polygons
+        if full_image:
+            polygons = self.detect_regions(preprocessed,
+                                           self._detector_params(preprocessed, self.plan_scale(preprocessed)))
+            if polygons is None:
+                polygons = [r[0] for r in self.engine.readtext(preprocessed, **self.readtext_params)]
+            if self.region_filter is not None:
+                polygons = [region.polygon for region in self.region_filter.filter(polygons)]
+        else:
+            polygons = ([existing.polygon[i] for i in indices] + roi_polygons)
+            polygons = [np.rint(np.asarray(p, dtype=np.float64) / reduction).astype(int).tolist()
+                        for p in polygons]
+        
+        # Step 3: Recognition only
+        results = self.engine.recognize(preprocessed, polygons, **(params or {}))
+        fresh = self._apply_lexicon(DetectionSet.from_readtext(results, self._clean_text))
+        fresh.scale_geometry(reduction)
+        if len(fresh) != len(polygons):
+            logger.warning(f"Re-OCR: {len(polygons)} regions, {len(fresh)} results")
+        
+        # Step 4: Merge into the earlier result
+        # Reason: selected rows keep their position, ROI results replace
+        # what they cover and are appended after the remaining rows
+        if full_image:
+            merged = fresh
+            merged.set_column('reocr', [True] * len(merged))
+        else:
+            keep = np.ones(len(existing), dtype=bool)
+            keep[[i for i in indices if i < len(existing)]] = False
+            for polygon in roi_polygons:
+                keep &= ~self._covered(existing.bbox, polygon)
+            replaced = min(len(indices), len(fresh))
+            positions = (np.flatnonzero(keep).tolist() + indices[:replaced]
+                         + [len(existing) + k for k in range(len(fresh) - replaced)])
+            merged = DetectionSet.concat([existing.subset(keep), fresh])
+            merged.set_column('reocr', [None] * int(keep.sum()) + [True] * len(fresh))
+            merged = merged.subset(np.argsort(positions, kind='stable'))
+        
+        # Step 5: Structure (earlier metadata is kept where not recomputed)
+        output_data = self.structure_output(merged, filename)
+        for key, value in metadata.items():
+            if key not in ('reocr', 'timestamp'):
+                output_data['metadata'].setdefault(key, value)
+        output_data['metadata']['reocr'] = {
+            'detections': indices,
+            'rois': len(roi_polygons),
+            'full_image': full_image,
+            'recognized': len(fresh),
+            'params': dict(params or {}),
+        }
+        if self.region_cache is not None:
+            output_data['metadata']['reocr']['region_cache'] = self.region_cache.stats()
+        
+        if save:
+            self.save_results(output_data, image, merged, Path(filename).stem,
+                              annotation_scale=1.0 / reduction)
+        logger.info(f"{filename}: re-recognized {len(fresh)} region(s), "
+                    f"{len(merged)} detections")
+        return output_data
+    
+    @staticmethod
+    def _roi_polygon(roi) -> List[List[float]]:
+        """4-point polygon of an ROI given as [x1, y1, x2, y2] or as a polygon."""
+        pts = np.asarray(roi, dtype=np.float64)
+        if pts.shape == (4,):
+            x1, y1, x2, y2 = pts.tolist()
+            return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        return pts.reshape(4, 2).tolist()
+    
+    @staticmethod
+    def _covered(bbox: np.ndarray, polygon, fraction: float = 0.5) -> np.ndarray:
+        """Rows of bbox with at least `fraction` of their area inside the polygon's bounds."""
+        pts = np.asarray(polygon, dtype=np.float64)
+        x1, y1 = pts.min(axis=0)
+        x2, y2 = pts.max(axis=0)
+        ix = np.clip(np.minimum(bbox[:, 2], x2) - np.maximum(bbox[:, 0], x1), 0, None)
+        iy = np.clip(np.minimum(bbox[:, 3], y2) - np.maximum(bbox[:, 1], y1), 0, None)
+        area = (bbox[:, 2] - bbox[:, 0]) * (bbox[:, 3] - bbox[:, 1])
+        return ix * iy >= fraction * np.maximum(area, 1)
+    
+    def process_frames(self, frames: Sequence[Union[str, np.ndarray]],
+                       name: Optional[str] = None) -> Optional[Dict]:
+        """
+        Read several frames of the same object and vote per field.
+        
+        Frames are processed in order; processing stops as soon as every
+        field is read identically by min_agreement frames, so a clean
+        object costs min_frames frames instead of all of them.
+        
+        Args:
+            frames: Image paths or decoded images of one object, best first
+            name: Output base name (default: first frame's stem + '_consensus')
+        
+        Returns:
+            Structured output of the consensus detections (with
+            metadata.consensus) or None if no frame could be read
+        
+        Technical Note:
+        - Geometry of each field comes from the frame that read it best
+          ('frame' column); the annotated image is the frame supplying
+          most fields
+        - Frame paths are decoded like process_image (grayscale flag,
+          memory-budget reduction, coordinates scaled back); frames the
+          prefilter rejects are skipped (metadata.consensus.frames_skipped)
+        """
+        cfg = self.consensus_cfg
+        voter = ConsensusVoter(
+            min_agreement=cfg.get('min_agreement', 2),
+            min_frames=cfg.get('min_frames', 2),
+            match_distance=cfg.get('match_distance', 0.34),
+            min_presence=cfg.get('min_presence', 0.5)
+        )
+        max_frames = cfg.get('max_frames', 5)
+        if name is None:
+            first = frames[0] if frames else None
+            name = f"{Path(first).stem if isinstance(first, str) else 'frames'}_consensus"
+        
+        start = time.perf_counter()
+        images = []
+        reductions = []
+        skipped = 0
+        with self.profiler.session():
+            try:
+                for frame in list(frames)[:max_frames]:
+                    image, reduction = self._load_image(frame) if isinstance(frame, str) else (frame, 1)
+                    if image is None:
+                        logger.warning(f"Skipping unreadable frame: {frame}")
+                        continue
+                    
+                    # Same stages as process_image, without per-frame output
+                    # Reason: a frame without text-like structure has no
+                    # reads to vote with
+                    if self.prefilter is not None and not self.prefilter.check(image).has_text:
+                        logger.debug("Prefilter: no text-like structure in frame, skipped")
+                        skipped += 1
+                        continue
+                    if self.station is not None:
+                        detections, image = self.process_station_frame(image)
+                    else:
+                        if self.orientation is not None:
+                            orientation = self.orientation.detect(image)
+                            if orientation.rotation:
+                                image = rotate_image(image, orientation.rotation)
+                        preprocessed, _ = self.preprocess_image(image)
+                        detections = self.run_ocr(image, preprocessed,
+                                                  self.plan_scale(preprocessed))
+                    # Full-resolution coordinates, as in process_image
+                    detections.scale_geometry(reduction)
+                    images.append(image)
+                    reductions.append(reduction)
+                    voter.add(detections)
+                    logger.debug("Consensus frame %d: %d detections", len(images), len(detections))
+                    
+                    # Early stop: further frames cannot change the vote
+                    if voter.reached():
+                        break
+                
+                if not images:
+                    logger.error("No readable frames")
+                    return None
+                
+                detections, fields = voter.result()
+                output_data = self.structure_output(detections, name)
+                output_data['metadata']['consensus'] = {
+                    'frames_used': len(images),
+                    'frames_available': len(frames),
+                    'reached': voter.reached(),
+                    'fields': fields
+                }
+                if skipped:
+                    output_data['metadata']['consensus']['frames_skipped'] = skipped
+                
+                # Annotate the frame supplying most fields with its own boxes
+                reference = voter.reference_frame() or 0
+                drawn = detections
+                if len(detections):
+                    drawn = detections.subset(np.asarray(detections.extra['frame']) == reference)
+                self.save_results(output_data, images[reference], drawn, name,
+                                  annotation_scale=1.0 / reductions[reference])
+                if self.result_store is not None:
+                    self.result_store.add_result(output_data)
+                
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                logger.info(
+                    "%s: %d fields from %d/%d frames (consensus %s), %.0f ms",
+                    name, len(detections), len(images), len(frames),
+                    'reached' if voter.reached() else 'not reached', elapsed_ms,
+                    extra={'image': name, 'detections': len(detections),
+                           'frames_used': len(images), 'elapsed_ms': round(elapsed_ms, 1)}
+                )
+                return output_data
+                
+            except Exception as e:
+                logger.error(f"Error processing frames: {e}", exc_info=True)
+                return None
+    
+    def process_station_frame(self, frame: np.ndarray) -> Tuple[DetectionSet, np.ndarray]:
+        """
+        Rectify a fixed-camera frame and OCR only the station's label ROIs.
+        
+        Args:
+            frame: Camera frame at the station's calibrated size
+        
+        Returns:
+            Tuple of (detections in rectified coordinates with a 'roi'
+            column, rectified image)
+        
+        Technical Note:
+        - The homography is applied with the station's precomputed remap
+          maps (no per-frame perspective math, no generic deskew)
+        - ROI crops are views into the rectified image
+        """
+        if self.station is None:
+            raise ValueError("No station profile configured")
+        
+        rectified = self.station.rectify(frame)
+        per_roi = []
+        for roi, crop in self.station.crops(rectified):
+            preprocessed, _ = self.preprocess_image(crop, deskew=False)
+            detections = self.run_ocr(crop, preprocessed)
+            detections.translate_geometry(roi.x, roi.y)
+            detections.set_column('roi', [roi.name] * len(detections))
+            per_roi.append(detections)
+        return DetectionSet.concat(per_roi), rectified
     
-    def process_batch(self, input_folder: str) -> List[Dict]:
+    def _load_image(self, image_path: str,
+                    grayscale: Optional[bool] = None) -> Tuple[Optional[np.ndarray], int]:
+        """
+        Decode an image, reduced by 2/4/8 if the memory budget requires it.
+        
+        Args:
+            image_path: Image file
+            grayscale: Decode to one channel (default: performance.grayscale)
+        
+        Returns:
+            Tuple of (image or None, reduction factor)
+        
+        Technical Note:
+        - The header is read first (PIL, no pixel decode) to get dimensions
+        - cv2.IMREAD_REDUCED_COLOR_N decodes JPEGs directly at 1/N size,
+          so a 48 MP frame never exists at full resolution in memory
+        - Grayscale mode uses the IMREAD_(REDUCED_)GRAYSCALE flags: the
+          JPEG decoder then skips chroma upsampling and colour conversion
+          and returns one uint8 channel (a third of the colour buffer)
+        """
+        reduction = 1
+        # Station remap maps are built for full-size frames
+        if self.memory_budget is not None and self.station is None:
+            dims = image_dimensions(image_path)
+            if dims is not None:
+                reduction = self.memory_budget.decode_reduction(*dims)
+        
+        if self.grayscale if grayscale is None else grayscale:
+            flags = {
+                1: cv2.IMREAD_GRAYSCALE,
+                2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+            }[reduction]
+        else:
+            flags = {
+                1: cv2.IMREAD_COLOR,
+                2: cv2.IMREAD_REDUCED_COLOR_2,
+                4: cv2.IMREAD_REDUCED_COLOR_4,
+                8: cv2.IMREAD_REDUCED_COLOR_8,
+            }[reduction]
+        image = cv2.imread(image_path, flags)
+        if reduction > 1 and image is not None:
+            logger.debug("Memory budget: decoded %s at 1/%d size", image_path, reduction)
+        return image, reduction
+    
+    def process_batch(self, input_folder: str,
+                      export_path: Optional[str] = None) -> List[Dict]:
         """
         Process multiple images in batch mode.
         
@@ -466,6 +1358,8 @@ class IndustrialOCRSystem:
         
         Args:
             input_folder: Path to folder containing images
+            export_path: Optional columnar export of the whole batch
+                         (.parquet or .arrow, requires pyarrow)
         
         Returns:
             List of structured outputs for all processed images
@@ -486,14 +1380,42 @@ class IndustrialOCRSystem:
         
         logger.info(f"Found {len(image_files)} images to process")
         
+        exporter = ColumnarBatchWriter(export_path) if export_path else None
+        
         results = []
-        for idx, image_file in enumerate(image_files, 1):
-            logger.info(f"Processing {idx}/{len(image_files)}: {image_file.name}")
-            result = self.process_image(str(image_file))
-            if result:
-                results.append(result)
+        try:
+            with self.profiler.session():
+                for idx, image_file in enumerate(image_files, 1):
+                    logger.debug("Processing %d/%d: %s", idx, len(image_files), image_file.name)
+                    result = self.process_image(str(image_file))
+                    if result:
+                        results.append(result)
+                        if exporter is not None:
+                            exporter.add(result)
+        finally:
+            if exporter is not None:
+                exporter.close()
+            if self.profiler.enabled:
+                self.profiler.write(f"profile_{input_path.name}")
         
         logger.info(f"Batch processing completed: {len(results)}/{len(image_files)} successful")
+        if isinstance(self.engine, TieredOCR):
+            for tier, stats in self.engine.stats().items():
+                logger.info(f"Engine tier {tier}: {stats}")
+        if self.prefilter is not None:
+            stats = self.prefilter.stats()
+            logger.info(f"Prefilter skipped {stats['skipped']}/{stats['checked']} images "
+                        f"({stats['skip_rate']:.1%})")
+        if self.region_filter is not None:
+            stats = self.region_filter.stats()
+            logger.info(f"Region filter recognized {stats['recognized']}/{stats['detected']} regions "
+                        f"({stats['removed_rate']:.1%} removed: {stats['too_small']} small, "
+                        f"{stats['aspect']} aspect, {stats['overlap']} overlap, {stats['top_k']} top-k)")
+        if self.deadline_stats['images']:
+            stats = dict(self.deadline_stats)
+            images, missed = stats.pop('images'), stats.pop('missed')
+            logger.info(f"Deadline met for {images - missed}/{images} images "
+                        f"(degradations: {stats or 'none'}, costs: {self.deadline_costs.as_dict()})")
         return results
 
 
@@ -505,6 +1427,21 @@ def main():
     - Single image: python main.py --image test_images/box1.jpg
     - Batch mode: python main.py --batch test_images/
     - With GPU: python main.py --image test.jpg --gpu
+    - Indexed results: python main.py --batch test_images/ --db outputs/results.db
+    - Compact output: python main.py --batch test_images/ --format msgpack
+    - Columnar export: python main.py --batch test_images/ --batch-export outputs/batch.parquet
+    - Code correction: python main.py --image box.jpg --config config.yaml --lexicon codes.txt
+    - Skip empty frames: python main.py --batch test_images/ --prefilter
+    - Fewer regions to recognize: python main.py --batch test_images/ --region-filter
+    - Latency SLA: python main.py --batch test_images/ --deadline-ms 1000
+    - Tiered engines: python main.py --batch test_images/ --engine tesseract,easyocr
+    - Memory budget: python main.py --batch test_images/ --memory-budget 6000
+    - Grayscale only: python main.py --batch test_images/ --grayscale --no-annotate
+    - Profiling: python main.py --batch test_images/ --profile
+    - Rotated boxes: python main.py --batch test_images/ --auto-rotate
+    - Fixed camera: python main.py --batch frames/ --station line1_cam2 --stations stations.yaml
+    - Drop-folder daemon: python main.py --watch /data/drop --config config.yaml
+    - Multi-frame consensus: python main.py --frames box_1.jpg box_2.jpg box_3.jpg
     """
     parser = argparse.ArgumentParser(
         description='Offline OCR System for Industrial Stenciled Text'
@@ -519,6 +1456,18 @@ def main():
         type=str, 
         help='Path to folder for batch processing'
     )
+    parser.add_argument(
+        '--frames',
+        type=str,
+        nargs='+',
+        help='Several photos of one object: vote per field, stop once frames agree'
+    )
+    parser.add_argument(
+        '--watch',
+        type=str,
+        nargs='+',
+        help='Run as a daemon processing images as they arrive in these folders'
+    )
     parser.add_argument(
         '--gpu', 
         action='store_true', 
@@ -530,20 +1479,138 @@ def main():
         default='en', 
         help='Language code (default: en)'
     )
+    parser.add_argument(
+        '--engine',
+        type=str,
+        help='OCR engine, or comma-separated tiers cheapest first (default: easyocr)'
+    )
+    parser.add_argument(
+        '--memory-budget',
+        type=float,
+        help='Process memory limit in MB (track per-stage memory and downsize to fit)'
+    )
+    parser.add_argument(
+        '--grayscale',
+        action='store_true',
+        help='Decode images as grayscale (colour only for annotated images)'
+    )
+    parser.add_argument(
+        '--no-annotate',
+        action='store_true',
+        help='Do not save annotated images'
+    )
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='sample',
+        choices=PROFILE_MODES,
+        help='Profile the run (sample, default; or cprofile) into outputs/profile/'
+    )
+    parser.add_argument(
+        '--db',
+        type=str,
+        help='Also index results into this SQLite store (query with result_store.py)'
+    )
+    parser.add_argument(
+        '--format',
+        type=str,
+        default='json',
+        choices=list(SERIALIZERS),
+        help='Per-image result format (default: json)'
+    )
+    parser.add_argument(
+        '--config',
+        type=str,
+        help='YAML configuration file (e.g. config.yaml)'
+    )
+    parser.add_argument(
+        '--lexicon',
+        type=str,
+        help='Code list (one per line) to snap OCR text to valid codes'
+    )
+    parser.add_argument(
+        '--prefilter',
+        action='store_true',
+        help='Skip OCR on frames without text-like structure'
+    )
+    parser.add_argument(
+        '--region-filter',
+        action='store_true',
+        help='Drop tiny, sliver and duplicate text regions before recognition'
+    )
+    parser.add_argument(
+        '--station',
+        type=str,
+        help='Fixed-camera station profile: rectify frames and read only its ROIs'
+    )
+    parser.add_argument(
+        '--stations',
+        type=str,
+        help='Stations YAML file (default: advanced.perspective_correction.stations_file)'
+    )
+    parser.add_argument(
+        '--auto-rotate',
+        action='store_true',
+        help='Detect 90/180/270 degree rotated text and rotate upright before OCR'
+    )
+    parser.add_argument(
+        '--deadline-ms',
+        type=float,
+        help='Per-image time budget; degrade preprocessing/OCR to finish within it'
+    )
+    parser.add_argument(
+        '--batch-export',
+        type=str,
+        help='Write the whole batch to one .parquet or .arrow file (requires pyarrow)'
+    )
     
     args = parser.parse_args()
     
     # Validate arguments
-    if not args.image and not args.batch:
+    if not args.image and not args.batch and not args.watch and not args.frames:
         parser.print_help()
-        print("\nError: Please specify either --image or --batch")
+        print("\nError: Please specify --image, --batch, --frames or --watch")
         sys.exit(1)
     
     # Initialize OCR system
     try:
+        config = load_config(args.config) if args.config else {}
+        if config.get('logging'):
+            setup_logging(config['logging'])
+        
+        # CLI flags override the matching config sections
+        if args.lexicon:
+            lexicon_cfg = config.setdefault('industrial', {}).setdefault('lexicon', {})
+            lexicon_cfg.update({'enabled': True, 'path': args.lexicon})
+        if args.prefilter:
+            config.setdefault('performance', {}).setdefault('prefilter', {})['enabled'] = True
+        if args.region_filter:
+            config.setdefault('ocr', {}).setdefault('region_filter', {})['enabled'] = True
+        if args.station or args.stations:
+            perspective_cfg = config.setdefault('advanced', {}).setdefault('perspective_correction', {})
+            if args.station:
+                perspective_cfg.update({'enabled': True, 'station': args.station})
+            if args.stations:
+                perspective_cfg['stations_file'] = args.stations
+        if args.deadline_ms:
+            config.setdefault('performance', {}).setdefault('deadline', {})['budget_ms'] = args.deadline_ms
+        if args.auto_rotate:
+            config.setdefault('preprocessing', {}).setdefault('orientation', {})['enabled'] = True
+        if args.grayscale:
+            config.setdefault('performance', {})['grayscale'] = True
+        if args.no_annotate:
+            config.setdefault('output', {}).setdefault('annotated_images', {})['enabled'] = False
+        
+        result_store = ResultStore(args.db) if args.db else None
         ocr_system = IndustrialOCRSystem(
             languages=[args.lang], 
-            gpu=args.gpu
+            gpu=args.gpu,
+            result_store=result_store,
+            output_format=args.format,
+            config=config,
+            engine=args.engine,
+            memory_budget_mb=args.memory_budget,
+            profile=args.profile
         )
     except Exception as e:
         logger.error(f"Failed to initialize OCR system: {e}")
@@ -556,11 +1623,40 @@ def main():
             print("\n" + "="*60)
             print("OCR RESULTS")
             print("="*60)
-            print(json.dumps(result, indent=2))
+            print(json.dumps(result, indent=2, default=json_default))
+        if ocr_system.profiler.enabled:
+            ocr_system.profiler.write(f"profile_{Path(args.image).stem}")
+    
+    elif args.frames:
+        result = ocr_system.process_frames(args.frames)
+        if result:
+            consensus = result['metadata']['consensus']
+            print(f"\nConsensus {'reached' if consensus['reached'] else 'NOT reached'} "
+                  f"after {consensus['frames_used']}/{consensus['frames_available']} frames")
+            for field in consensus['fields']:
+                print(f"  {field['text']}: {field['agreeing_frames']}/{field['seen_in_frames']} frames agree")
+        if ocr_system.profiler.enabled:
+            ocr_system.profiler.write(f"profile_{Path(args.frames[0]).stem}_consensus")
     
     elif args.batch:
-        results = ocr_system.process_batch(args.batch)
+        results = ocr_system.process_batch(args.batch, export_path=args.batch_export)
         print(f"\nBatch processing completed: {len(results)} images processed")
+    
+    elif args.watch:
+        # Resident pipeline: the model stays loaded for the whole shift
+        watch_cfg = config.get('performance', {}).get('watch') or {}
+        mode = watch_cfg.get('mode', 'move')
+        watcher = FolderWatcher(
+            args.watch,
+            recursive=watch_cfg.get('recursive', False),
+            poll_interval=watch_cfg.get('poll_interval', 1.0),
+            settle_seconds=watch_cfg.get('settle_seconds', 2.0),
+            mark_done=mode == 'mark'
+        )
+        daemon = IngestDaemon(ocr_system, watcher, mode=mode,
+                              profile_every=watch_cfg.get('profile_every', 500))
+        daemon.run()
+        print(f"\nIngest daemon stopped: {daemon.summary()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,295 @@
+"""
+Memory Tracking & Budgeting for Industrial OCR System
+======================================================
+Per-stage peak memory measurement and budget-driven downsizing
+
+Why:
+- Industrial PCs often have 8 GB RAM shared by the OS, the torch model
+  and the pipeline; a few 48 MP images can OOM-kill the process
+- The biggest consumers are the decoded image copies (~1-3 bytes per
+  pixel each) and the CRAFT detector activations (~1 KB per canvas pixel)
+
+Components:
+- MemoryTracker: samples process RSS (and optionally tracemalloc) while a
+  named stage runs and reports the peak per stage
+- MemoryBudget: turns a limit in MB into concrete knobs - decode
+  reduction factor, detector canvas cap and worker count
+
+RSS source: psutil when installed, else /proc/self/statm (Linux), else
+resource.getrusage (peak only). process_memory_mb() adds PSS/USS for any
+process (worker_pool.py reports forked workers with it).
+"""
+
+import os
+import sys
+import math
+import time
+import threading
+import tracemalloc
+import logging
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+    _PROCESS = psutil.Process()
+except ImportError:
+    _PROCESS = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    if _PROCESS is not None:
+        return _PROCESS.memory_info().rss / 1e6
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1e6
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Lifetime peak RSS of this process in MB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def process_memory_mb(pid: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """
+    RSS, PSS, USS and shared memory of a process in MB.
+
+    PSS charges every shared page 1/n to each of its n sharers, so the PSS
+    of forked workers adds up to their real footprint, while RSS counts
+    shared model weights once per worker. USS is memory only this process
+    holds. PSS/USS need psutil or /proc/<pid>/smaps_rollup (Linux 4.14+);
+    otherwise they are None.
+
+    Args:
+        pid: Process id (default: this process)
+    """
+    pid = pid or os.getpid()
+    if _PROCESS is not None:
+        try:
+            info = psutil.Process(pid).memory_full_info()
+            pss = getattr(info, 'pss', None)
+            return {
+                'rss_mb': round(info.rss / 1e6, 1),
+                'pss_mb': round(pss / 1e6, 1) if pss is not None else None,
+                'uss_mb': round(info.uss / 1e6, 1),
+                'shared_mb': round((info.rss - info.uss) / 1e6, 1),
+            }
+        except (psutil.Error, AttributeError):
+            pass
+    try:
+        fields = {}
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+        private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+        shared = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+        return {
+            'rss_mb': round(fields['Rss'] / 1e6, 1),
+            'pss_mb': round(fields['Pss'] / 1e6, 1),
+            'uss_mb': round(private / 1e6, 1),
+            'shared_mb': round(shared / 1e6, 1),
+        }
+    except (OSError, KeyError):
+        pass
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            rss = int(f.read().split()[1]) * _PAGE_SIZE / 1e6
+    except OSError:
+        rss = current_rss_mb() if pid == os.getpid() else None
+    return {'rss_mb': round(rss, 1) if rss is not None else None,
+            'pss_mb': None, 'uss_mb': None, 'shared_mb': None}
+
+
+class MemoryTracker:
+    """
+    Record peak memory per pipeline stage.
+
+    Key Features:
+    - Background thread samples RSS only while a stage is active
+    - Optional tracemalloc peak (Python + numpy allocations) per stage
+    - Disabled tracker returns a nullcontext (no measurable overhead)
+
+    Usage:
+        tracker = MemoryTracker()
+        with tracker.stage('preprocess'):
+            ...
+        tracker.report()  # {'stages': {...}, 'peak_rss_mb': ...}
+    """
+
+    def __init__(self, enabled: bool = True, trace_python: bool = False,
+                 interval: float = 0.005):
+        """
+        Args:
+            enabled: Track stages (False makes stage() free)
+            trace_python: Also record tracemalloc peaks (adds allocation
+                          overhead, useful for investigations)
+            interval: RSS sampling interval in seconds
+        """
+        self.enabled = enabled
+        self.trace_python = trace_python
+        self.interval = interval
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+        self._active: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sampler(self):
+        while True:
+            self._wake.wait()
+            rss = current_rss_mb()
+            with self._lock:
+                if not self._active:
+                    # Cleared under the lock, so a stage starting now
+                    # sets the event again after this point
+                    self._wake.clear()
+                    continue
+                for name, peak in self._active.items():
+                    if rss > peak:
+                        self._active[name] = rss
+            time.sleep(self.interval)
+
+    def stage(self, name: str):
+        """Context manager measuring one stage (no-op when disabled)."""
+        if not self.enabled:
+            return nullcontext()
+        return self._measure(name)
+
+    @contextmanager
+    def _measure(self, name: str):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._sampler, daemon=True,
+                                            name='memory-sampler')
+            self._thread.start()
+
+        if self.trace_python:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        start = current_rss_mb()
+        with self._lock:
+            self._active[name] = start
+            self._wake.set()
+        try:
+            yield
+        finally:
+            end = current_rss_mb()
+            with self._lock:
+                peak = max(self._active.pop(name, start), end)
+            record = {
+                'rss_start_mb': round(start, 1),
+                'rss_peak_mb': round(peak, 1),
+                'rss_delta_mb': round(peak - start, 1),
+            }
+            if self.trace_python:
+                record['python_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+            self.stages[name] = record
+
+    def reset(self):
+        """Forget recorded stages (call between images)."""
+        self.stages = {}
+
+    def report(self) -> Dict:
+        """Stage records plus overall peak RSS."""
+        return {
+            'stages': dict(self.stages),
+            'peak_rss_mb': round(max(
+                [s['rss_peak_mb'] for s in self.stages.values()] or [current_rss_mb()]
+            ), 1),
+        }
+
+
+class MemoryBudget:
+    """
+    Derive pipeline limits from a memory budget.
+
+    Knobs:
+    - decode_reduction(): 1, 2, 4 or 8 - decode large images directly at
+      reduced size (cv2.IMREAD_REDUCED_*) so they never exist at full size
+    - max_canvas(): largest detector canvas whose activations fit
+    - worker_count(): how many worker processes fit next to each other
+
+    Technical Note:
+    - Estimates are deliberately conservative constants; tune
+      image_bytes_per_pixel / detector_bytes_per_pixel with the per-stage
+      report from MemoryTracker on the target machine
+    """
+
+    def __init__(self, limit_mb: float, reserve_mb: float = 256.0,
+                 image_bytes_per_pixel: float = 12.0,
+                 detector_bytes_per_pixel: float = 1000.0):
+        """
+        Args:
+            limit_mb: Total memory the process may use
+            reserve_mb: Headroom kept free (allocator slack, logging, ...)
+            image_bytes_per_pixel: Working set of decode + preprocessing
+                                   (colour image + ~5 grayscale copies)
+            detector_bytes_per_pixel: CRAFT activation memory per canvas pixel
+        """
+        self.limit_mb = limit_mb
+        self.reserve_mb = reserve_mb
+        self.image_bytes_per_pixel = image_bytes_per_pixel
+        self.detector_bytes_per_pixel = detector_bytes_per_pixel
+
+    def available_mb(self) -> float:
+        """Budget left on top of what the process already uses."""
+        return max(self.limit_mb - current_rss_mb() - self.reserve_mb, 0.0)
+
+    def decode_reduction(self, width: int, height: int) -> int:
+        """
+        Smallest power-of-two reduction whose working set fits the budget.
+
+        Returns:
+            1 (full size), 2, 4 or 8
+        """
+        available = self.available_mb() * 1e6
+        for factor in (1, 2, 4):
+            pixels = (width // factor) * (height // factor)
+            if pixels * self.image_bytes_per_pixel <= available:
+                return factor
+        return 8
+
+    def max_canvas(self, canvas_size: int, aspect: float = 1.0) -> int:
+        """
+        Largest detector canvas (long side) that fits the budget.
+
+        Args:
+            canvas_size: Configured canvas size (upper bound)
+            aspect: Short side / long side of the image
+        """
+        available = self.available_mb() * 1e6
+        max_pixels = available / self.detector_bytes_per_pixel
+        long_side = math.sqrt(max_pixels / max(aspect, 1e-3))
+        # Round down to the 32 px grid CRAFT uses, keep a usable minimum
+        return int(max(min(canvas_size, long_side) // 32 * 32, 320))
+
+    def worker_count(self, requested: int, per_worker_mb: float) -> int:
+        """Number of workers (>= 1) that fit, at most `requested`."""
+        fit = int(self.available_mb() // max(per_worker_mb, 1.0))
+        return max(1, min(requested, fit))
+
+
+def image_dimensions(path: str) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) read from the file header without decoding pixels.
+    """
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
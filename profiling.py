@@ -0,0 +1,248 @@
+"""
+Pipeline Profiling for Industrial OCR System
+=============================================
+Capture where run time goes without editing the pipeline
+
+Modes:
+- sample:   A background thread snapshots the pipeline thread's Python
+            stack every few milliseconds (low overhead, safe for long
+            batch runs on site)
+- cprofile: Deterministic cProfile tracing of every call (exact call
+            counts, noticeably slower; use for short reproductions)
+
+Outputs (written by PipelineProfiler.write()):
+- <name>.collapsed: one "frame;frame;frame count" line per unique stack,
+  the input format of flamegraph.pl, speedscope and inferno (sample mode)
+- <name>.prof:      pstats file for snakeviz / pstats browser (cprofile)
+- <name>_top.txt:   top-N functions by self and total time (both modes)
+
+Usage:
+- python main.py --batch test_images/ --profile
+- python main.py --image box.jpg --profile cprofile
+- flamegraph.pl outputs/profile/profile_*.collapsed > flame.svg
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+from io import StringIO
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('sample', 'cprofile')
+
+
+def _frame_label(code) -> str:
+    """Stack frame name: function (file:first line)."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class PipelineProfiler:
+    """
+    Sampling or deterministic profiler around pipeline runs.
+
+    Key Features:
+    - session() wraps a run; nested sessions (process_batch calling
+      process_image) are profiled once by the outermost one
+    - Samples/stats accumulate across sessions until write()
+    - Disabled profiler returns a nullcontext (no overhead)
+
+    Usage:
+        profiler = PipelineProfiler('sample')
+        with profiler.session():
+            system.process_batch('images/')
+        profiler.write()
+    """
+
+    def __init__(self, mode: Optional[str] = 'sample', output_dir: str = 'outputs/profile',
+                 interval: float = 0.005, top: int = 25):
+        """
+        Args:
+            mode: 'sample', 'cprofile', or None to disable
+            output_dir: Folder for profile outputs
+            interval: Sampling interval in seconds (sample mode)
+            top: Number of functions in the text summary
+        """
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (choose from: {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.enabled = mode is not None
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.top = top
+
+        self._depth = 0
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._wall = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def session(self):
+        """Context manager profiling the enclosed run (no-op when disabled)."""
+        if not self.enabled:
+            return nullcontext()
+        return self._session()
+
+    @contextmanager
+    def _session(self):
+        outermost = self._depth == 0
+        self._depth += 1
+        if outermost:
+            self._start()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if outermost:
+                self._wall += time.perf_counter() - start
+                self._finish()
+
+    def _start(self):
+        if self.mode == 'cprofile':
+            if self._profile is None:
+                self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sampler, args=(threading.get_ident(),),
+                daemon=True, name='profile-sampler'
+            )
+            self._thread.start()
+
+    def _finish(self):
+        if self.mode == 'cprofile':
+            self._profile.disable()
+        else:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _sampler(self, thread_id: int):
+        """Record the target thread's stack until stopped."""
+        # Cache labels per code object: building strings dominates sampling cost
+        labels: Dict[object, str] = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            # Collapsed stacks are root first
+            stack.reverse()
+            self._stacks[';'.join(stack)] += 1
+            self._samples += 1
+
+    def top_functions(self) -> List[Dict]:
+        """
+        Per-function summary, sorted by self time.
+
+        Returns:
+            [{'function', 'self_s', 'total_s', 'self_pct', 'calls'}, ...]
+            (calls is None in sample mode)
+        """
+        rows = []
+        if self.mode == 'cprofile' and self._profile is not None:
+            stats = pstats.Stats(self._profile)
+            total = max(stats.total_tt, 1e-9)
+            for (filename, line, name), (_, calls, tt, ct, _) in stats.stats.items():
+                rows.append({
+                    'function': f"{name} ({os.path.basename(filename)}:{line})",
+                    'self_s': tt, 'total_s': ct,
+                    'self_pct': 100.0 * tt / total, 'calls': calls,
+                })
+        elif self._samples:
+            per_sample = self._wall / self._samples
+            self_counts: Counter = Counter()
+            total_counts: Counter = Counter()
+            for stack, count in self._stacks.items():
+                frames = stack.split(';')
+                self_counts[frames[-1]] += count
+                # Recursive functions count once per sample
+                for label in set(frames):
+                    total_counts[label] += count
+            for label, count in total_counts.items():
+                rows.append({
+                    'function': label,
+                    'self_s': self_counts[label] * per_sample,
+                    'total_s': count * per_sample,
+                    'self_pct': 100.0 * self_counts[label] / self._samples,
+                    'calls': None,
+                })
+        rows.sort(key=lambda r: r['self_s'], reverse=True)
+        return rows[:self.top]
+
+    def summary(self) -> str:
+        """Top-N table as text."""
+        out = StringIO()
+        detail = (f"{self._samples} samples @ {self.interval * 1000:.1f} ms"
+                  if self.mode == 'sample' else 'deterministic')
+        out.write(f"Profile ({self.mode}, {detail}), wall time {self._wall:.2f} s\n\n")
+        out.write(f"{'self s':>9} {'self %':>7} {'total s':>9} {'calls':>9}  function\n")
+        for row in self.top_functions():
+            calls = '' if row['calls'] is None else str(row['calls'])
+            out.write(f"{row['self_s']:9.3f} {row['self_pct']:6.1f}% {row['total_s']:9.3f} "
+                      f"{calls:>9}  {row['function']}\n")
+        return out.getvalue()
+
+    def write(self, name: Optional[str] = None) -> Dict[str, str]:
+        """
+        Write collected data and reset the profiler.
+
+        Args:
+            name: Output base name (default: profile_<timestamp>)
+
+        Returns:
+            {'summary': path, 'collapsed' or 'pstats': path}
+        """
+        if not self.enabled:
+            return {}
+        name = name or f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        paths = {}
+
+        if self.mode == 'cprofile':
+            if self._profile is not None:
+                prof_path = self.output_dir / f"{name}.prof"
+                self._profile.dump_stats(str(prof_path))
+                paths['pstats'] = str(prof_path)
+        else:
+            collapsed_path = self.output_dir / f"{name}.collapsed"
+            with open(collapsed_path, 'w', encoding='utf-8') as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths['collapsed'] = str(collapsed_path)
+
+        summary_path = self.output_dir / f"{name}_top.txt"
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(self.summary())
+        paths['summary'] = str(summary_path)
+
+        logger.info(f"Profile written: {', '.join(paths.values())}")
+        self.reset()
+        return paths
+
+    def reset(self):
+        """Drop collected samples / stats."""
+        self._stacks = Counter()
+        self._samples = 0
+        self._wall = 0.0
+        self._profile = None
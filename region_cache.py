@@ -0,0 +1,107 @@
+"""
+Detector Output Cache for Industrial OCR System
+================================================
+Keep CRAFT regions per image so recognition can be re-run alone
+
+Why:
+- Correcting one crop or trying other recognizer settings meant running
+  process_image again, detector included, although the detector would
+  return the same boxes
+- Detection is the larger share of OCR time on CPU; recognition of a few
+  regions is cheap
+
+Key Features:
+- Key = hash(preprocessed image bytes, detector parameters): the same
+  image under the same preprocessing and detector settings hits, a
+  changed threshold or canvas misses
+- In-memory LRU in front of an optional directory of small JSON files
+  (survives restarts, e.g. between a batch run and the Streamlit app)
+
+Config (ocr.region_cache):
+    enabled, directory (optional), max_entries
+
+Usage:
+    cache = RegionCache(directory='outputs/regions')
+    key = region_key(preprocessed, detector_params)
+    polygons = cache.get(key)
+    if polygons is None:
+        polygons = engine.detect(preprocessed, **detector_params)
+        cache.put(key, polygons)
+"""
+
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def region_key(preprocessed: np.ndarray, params: Dict) -> str:
+    """Cache key of one detector call (image content + parameters)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(preprocessed.shape).encode('utf-8'))
+    digest.update(np.ascontiguousarray(preprocessed).data)
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RegionCache:
+    """
+    Detector polygons by region_key().
+
+    Technical Note:
+    - Polygons are stored in the coordinates of the image given to the
+      detector (the decoded, possibly reduced and rotated image)
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 256):
+        """
+        Args:
+            directory: Also persist entries as <key>.json here (None: memory only)
+            max_entries: In-memory entries kept (least recently used evicted)
+        """
+        self.directory = Path(directory) if directory else None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, List]' = OrderedDict()
+
+    def get(self, key: str) -> Optional[List[List[List[int]]]]:
+        """Cached polygons or None."""
+        polygons = self._entries.get(key)
+        if polygons is None and self.directory is not None:
+            path = self.directory / f"{key}.json"
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    polygons = json.load(f)['polygons']
+                self._remember(key, polygons)
+        if polygons is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return polygons
+
+    def put(self, key: str, polygons: List):
+        polygons = [np.asarray(p).astype(int).tolist() for p in polygons]
+        self._remember(key, polygons)
+        if self.directory is not None:
+            with open(self.directory / f"{key}.json", 'w', encoding='utf-8') as f:
+                json.dump({'polygons': polygons}, f)
+        logger.debug("Region cache: stored %d regions (%s)", len(polygons), key[:8])
+
+    def _remember(self, key: str, polygons: List):
+        self._entries[key] = polygons
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,411 @@
+"""
+SQLite Result Store for Industrial OCR System
+==============================================
+Indexed, searchable storage for structured OCR output
+
+Why a database next to the JSON files:
+- outputs/ holds one JSON file per image, so finding "which photo had
+  SERIAL-XYZ-123 last month" means parsing every file
+- SQLite is part of the Python standard library (100% offline, no server)
+- FTS5 full-text index answers text lookups over millions of detections
+  in milliseconds
+
+Tables:
+- images: one row per processed image (metadata block of structure_output);
+  (filename, timestamp) is unique, so importing a result twice, or
+  importing files a daemon/queue already indexed, adds no duplicates
+- detections: one row per detected text region
+- detections_fts: FTS5 index over detections.text / detections.raw_text
+
+Usage:
+- python result_store.py search "SERIAL-XYZ-123" --db outputs/results.db
+- python result_store.py search "BATCH-2024" --prefix --since 2026-01-01
+- python result_store.py import outputs/ --db outputs/results.db
+- python result_store.py stats --db outputs/results.db
+"""
+
+import sys
+import json
+import logging
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional, Iterable
+
+from serializers import SERIALIZERS, get_serializer
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    source_path TEXT,
+    timestamp TEXT NOT NULL,
+    total_detections INTEGER NOT NULL,
+    average_confidence REAL,
+    quality_score TEXT,
+    processing_version TEXT
+);
+
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    image_id INTEGER NOT NULL REFERENCES images(id) ON DELETE CASCADE,
+    detection_id TEXT,
+    text TEXT,
+    raw_text TEXT,
+    confidence REAL,
+    x_min INTEGER,
+    y_min INTEGER,
+    x_max INTEGER,
+    y_max INTEGER,
+    polygon TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_images_timestamp ON images(timestamp);
+CREATE INDEX IF NOT EXISTS idx_images_filename ON images(filename);
+CREATE INDEX IF NOT EXISTS idx_detections_image ON detections(image_id);
+CREATE INDEX IF NOT EXISTS idx_detections_confidence ON detections(confidence);
+
+-- External-content FTS5 table: the text lives once in `detections`,
+-- the index only stores tokens. '-' and '_' are token characters so
+-- industrial codes such as SERIAL-XYZ-123 stay a single searchable token.
+CREATE VIRTUAL TABLE IF NOT EXISTS detections_fts USING fts5(
+    text,
+    raw_text,
+    content='detections',
+    content_rowid='id',
+    tokenize="unicode61 tokenchars '-_'"
+);
+
+CREATE TRIGGER IF NOT EXISTS detections_ai AFTER INSERT ON detections BEGIN
+    INSERT INTO detections_fts(rowid, text, raw_text)
+    VALUES (new.id, new.text, new.raw_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS detections_ad AFTER DELETE ON detections BEGIN
+    INSERT INTO detections_fts(detections_fts, rowid, text, raw_text)
+    VALUES ('delete', old.id, old.text, old.raw_text);
+END;
+"""
+
+
+class ResultStore:
+    """
+    SQLite-backed sink for structure_output() results.
+
+    Key Features:
+    - Images and detections stored in normalized tables
+    - Indexes on timestamp and confidence for range filters
+    - FTS5 full-text search over cleaned and raw OCR text
+    - Batched inserts in a single transaction per call
+    """
+
+    def __init__(self, db_path: str = "outputs/results.db"):
+        """
+        Open (or create) the result database.
+
+        Args:
+            db_path: Path to the SQLite database file
+
+        Technical Note:
+        - WAL journal lets the query CLI read while a batch run is writing
+        - synchronous=NORMAL is safe with WAL and avoids an fsync per insert
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._ensure_unique()
+        logger.info(f"Result store opened: {self.db_path}")
+
+    def _ensure_unique(self):
+        """
+        One image row per (filename, timestamp).
+
+        Reason: stores created before the constraint may already hold
+        duplicates; the newest copies are dropped (detections cascade)
+        before the unique index is built.
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_images_unique'"
+        ).fetchone()
+        if exists:
+            return
+        with self.conn:
+            removed = self.conn.execute(
+                "DELETE FROM images WHERE id NOT IN "
+                "(SELECT MIN(id) FROM images GROUP BY filename, timestamp)"
+            ).rowcount
+            self.conn.execute(
+                "CREATE UNIQUE INDEX idx_images_unique ON images(filename, timestamp)"
+            )
+        if removed:
+            logger.warning(f"Removed {removed} duplicate result(s) from {self.db_path}")
+
+    def add_result(self, output_data: Dict, source_path: Optional[str] = None) -> Optional[int]:
+        """
+        Insert one structured OCR result.
+
+        Args:
+            output_data: Structured output from structure_output()
+            source_path: Original image path (optional, for traceability)
+
+        Returns:
+            Row id of the inserted image, or None for a duplicate: a result
+            with the same (filename, timestamp) is already stored, the
+            INSERT OR IGNORE skips it and no detections are added
+        """
+        with self.conn:
+            return self._insert(output_data, source_path)
+
+    def add_results(self, results: Iterable[Dict]) -> int:
+        """
+        Insert many structured results in a single transaction.
+
+        Args:
+            results: Iterable of structure_output() dictionaries
+
+        Returns:
+            Number of images inserted (already stored results are skipped)
+        """
+        count = 0
+        with self.conn:
+            for output_data in results:
+                if self._insert(output_data, None) is not None:
+                    count += 1
+        return count
+
+    def _insert(self, output_data: Dict, source_path: Optional[str]) -> Optional[int]:
+        """Insert image + detection rows (caller owns the transaction)."""
+        metadata = output_data.get('metadata', {})
+        summary = output_data.get('summary', {})
+        detections = output_data.get('detections', [])
+
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO images (filename, source_path, timestamp, total_detections, "
+            "average_confidence, quality_score, processing_version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                metadata.get('filename'),
+                source_path,
+                metadata.get('timestamp'),
+                metadata.get('total_detections', len(detections)),
+                float(metadata.get('average_confidence', 0.0)),
+                summary.get('quality_score'),
+                metadata.get('processing_version'),
+            )
+        )
+        if not cursor.rowcount:
+            logger.debug("Result already stored: %s (%s)",
+                         metadata.get('filename'), metadata.get('timestamp'))
+            return None
+        image_id = cursor.lastrowid
+
+        rows = []
+        for detection in detections:
+            bbox = detection['bbox']
+            rows.append((
+                image_id,
+                detection.get('id'),
+                detection.get('text'),
+                detection.get('raw_text'),
+                float(detection.get('confidence', 0.0)),
+                int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3]),
+                json.dumps(detection.get('bbox_polygon')),
+            ))
+
+        self.conn.executemany(
+            "INSERT INTO detections (image_id, detection_id, text, raw_text, confidence, "
+            "x_min, y_min, x_max, y_max, polygon) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        return image_id
+
+    def search(self, query: str, since: Optional[str] = None,
+               until: Optional[str] = None, min_confidence: float = 0.0,
+               prefix: bool = False, limit: int = 50) -> List[Dict]:
+        """
+        Full-text search over detected text.
+
+        Args:
+            query: Text to look for (e.g. "SERIAL-XYZ-123")
+            since: Only images processed at/after this ISO timestamp
+            until: Only images processed before this ISO timestamp
+            min_confidence: Minimum detection confidence
+            prefix: Treat the query as a prefix ("BATCH-2024" matches
+                    "BATCH-2024-A")
+            limit: Maximum number of rows returned
+
+        Returns:
+            List of matching detections joined with their image metadata,
+            newest first
+        """
+        sql = [
+            "SELECT i.filename, i.source_path, i.timestamp, d.detection_id, "
+            "d.text, d.raw_text, d.confidence, d.x_min, d.y_min, d.x_max, d.y_max "
+            "FROM detections_fts f "
+            "JOIN detections d ON d.id = f.rowid "
+            "JOIN images i ON i.id = d.image_id "
+            "WHERE detections_fts MATCH ? AND d.confidence >= ?"
+        ]
+        params: List = [self._fts_query(query, prefix), min_confidence]
+
+        if since:
+            sql.append("AND i.timestamp >= ?")
+            params.append(since)
+        if until:
+            sql.append("AND i.timestamp < ?")
+            params.append(until)
+
+        sql.append("ORDER BY i.timestamp DESC LIMIT ?")
+        params.append(limit)
+
+        rows = self.conn.execute(" ".join(sql), params).fetchall()
+        return [
+            {
+                'filename': row['filename'],
+                'source_path': row['source_path'],
+                'timestamp': row['timestamp'],
+                'detection_id': row['detection_id'],
+                'text': row['text'],
+                'raw_text': row['raw_text'],
+                'confidence': row['confidence'],
+                'bbox': [row['x_min'], row['y_min'], row['x_max'], row['y_max']],
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _fts_query(query: str, prefix: bool) -> str:
+        """
+        Quote user text as an FTS5 phrase.
+
+        Reason: bare FTS5 syntax treats '-' and ':' as operators, so a code
+        like SERIAL-XYZ-123 must be quoted to be matched literally.
+        """
+        phrase = '"' + query.strip().replace('"', '""') + '"'
+        return phrase + '*' if prefix else phrase
+
+    def stats(self) -> Dict:
+        """Return row counts and the covered timestamp range."""
+        row = self.conn.execute(
+            "SELECT COUNT(*) AS images, MIN(timestamp) AS first, MAX(timestamp) AS last "
+            "FROM images"
+        ).fetchone()
+        detections = self.conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        return {
+            'images': row['images'],
+            'detections': detections,
+            'first_timestamp': row['first'],
+            'last_timestamp': row['last'],
+        }
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def import_json_folder(store: ResultStore, folder: str) -> int:
+    """
+    Backfill the store from existing result files.
+
+    Args:
+        store: Open ResultStore
+        folder: Folder containing structure_output() result files in any
+                per-image format (.json, .msgpack; see serializers.py)
+
+    Returns:
+        Number of results imported (results already stored are skipped)
+    """
+    readers = {}
+    for name in SERIALIZERS:
+        try:
+            serializer = get_serializer(name)
+        except ImportError:
+            continue
+        readers.setdefault(serializer.extension, serializer)
+
+    def _load():
+        for path in sorted(Path(folder).iterdir()):
+            reader = readers.get(path.suffix)
+            if reader is None:
+                if path.suffix == '.msgpack':
+                    logger.warning(f"Skipping {path}: reading .msgpack results requires msgpack")
+                continue
+            try:
+                data = reader.read(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable result {path}: {e}")
+                continue
+            if isinstance(data, dict) and 'metadata' in data and 'detections' in data:
+                yield data
+
+    return store.add_results(_load())
+
+
+def main():
+    """
+    Query CLI for the result store.
+
+    Usage examples:
+    - python result_store.py search "SERIAL-XYZ-123"
+    - python result_store.py search "BATCH-2024" --prefix --min-confidence 0.8
+    - python result_store.py import outputs/
+    """
+    parser = argparse.ArgumentParser(description='Query the OCR result store')
+    parser.add_argument('--db', type=str, default='outputs/results.db',
+                        help='Path to SQLite database (default: outputs/results.db)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    search_p = sub.add_parser('search', help='Full-text search over detected text')
+    search_p.add_argument('query', type=str, help='Text to search for')
+    search_p.add_argument('--prefix', action='store_true', help='Prefix match')
+    search_p.add_argument('--since', type=str, help='ISO timestamp lower bound')
+    search_p.add_argument('--until', type=str, help='ISO timestamp upper bound')
+    search_p.add_argument('--min-confidence', type=float, default=0.0,
+                          help='Minimum detection confidence')
+    search_p.add_argument('--limit', type=int, default=50, help='Maximum rows')
+
+    import_p = sub.add_parser('import', help='Import existing result files (JSON, MessagePack)')
+    import_p.add_argument('folder', type=str, help='Folder with result files')
+
+    sub.add_parser('stats', help='Show store statistics')
+
+    args = parser.parse_args()
+
+    with ResultStore(args.db) as store:
+        if args.command == 'search':
+            matches = store.search(
+                args.query, since=args.since, until=args.until,
+                min_confidence=args.min_confidence, prefix=args.prefix,
+                limit=args.limit
+            )
+            for m in matches:
+                print(f"{m['timestamp']}  {m['filename']:<30} "
+                      f"{m['text']:<25} ({m['confidence']:.3f})")
+            print(f"\n{len(matches)} match(es)")
+
+        elif args.command == 'import':
+            count = import_json_folder(store, args.folder)
+            print(f"Imported {count} result(s) into {args.db}")
+
+        elif args.command == 'stats':
+            print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    main()
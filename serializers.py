@@ -0,0 +1,260 @@
+"""
+Result Serializers for Industrial OCR System
+=============================================
+Pluggable encoders for structure_output() results
+
+Available formats:
+- json:         Pretty-printed JSON (indent=2), the original output format
+- json-compact: JSON without whitespace (~half the size, faster to write)
+- orjson:       Compact JSON via the optional orjson library (much faster)
+- msgpack:      MessagePack binary via the optional msgpack library
+
+Batch exports (one columnar file per batch run, requires pyarrow):
+- .parquet: compressed columnar file, one row per detection
+- .arrow:   Arrow IPC (Feather v2) file, fastest to write and memory-map
+
+Optional libraries are only imported when their format is requested, so
+the default JSON path has no extra dependencies.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from detections import DetectionSet, json_default
+
+logger = logging.getLogger(__name__)
+
+
+class ResultSerializer:
+    """
+    Base class for per-image result encoders.
+
+    Subclasses set `name` and `extension` and implement dumps() / loads().
+    """
+
+    name = ''
+    extension = ''
+
+    def dumps(self, output_data: Dict) -> bytes:
+        """Encode one structured result."""
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Dict:
+        """Decode one result (detections as plain dictionaries)."""
+        raise NotImplementedError
+
+    def write(self, output_data: Dict, path: Path) -> Path:
+        """Encode output_data and write it to path."""
+        with open(path, 'wb') as f:
+            f.write(self.dumps(output_data))
+        return path
+
+    def read(self, path: Path) -> Dict:
+        """Read and decode a result file written by write()."""
+        with open(path, 'rb') as f:
+            return self.loads(f.read())
+
+
+class JSONSerializer(ResultSerializer):
+    """Standard library JSON (pretty or compact)."""
+
+    def __init__(self, indent: Optional[int] = 2):
+        self.indent = indent
+        self.name = 'json' if indent else 'json-compact'
+        self.extension = '.json'
+        # Compact separators drop the spaces json adds after ',' and ':'
+        self.separators = None if indent else (',', ':')
+
+    def dumps(self, output_data: Dict) -> bytes:
+        return json.dumps(
+            output_data, indent=self.indent, separators=self.separators,
+            ensure_ascii=False, default=json_default
+        ).encode('utf-8')
+
+    def loads(self, data: bytes) -> Dict:
+        return json.loads(data.decode('utf-8'))
+
+
+class OrjsonSerializer(ResultSerializer):
+    """Compact JSON through orjson (Rust implementation, optional)."""
+
+    name = 'orjson'
+    extension = '.json'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        # OPT_SERIALIZE_NUMPY encodes numpy scalars/arrays natively
+        self._options = orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, output_data: Dict) -> bytes:
+        return self._orjson.dumps(output_data, default=json_default, option=self._options)
+
+    def loads(self, data: bytes) -> Dict:
+        return self._orjson.loads(data)
+
+
+class MsgPackSerializer(ResultSerializer):
+    """MessagePack binary encoding (optional msgpack library)."""
+
+    name = 'msgpack'
+    extension = '.msgpack'
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def dumps(self, output_data: Dict) -> bytes:
+        return self._msgpack.packb(output_data, default=json_default, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Dict:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS = {
+    'json': lambda: JSONSerializer(indent=2),
+    'json-compact': lambda: JSONSerializer(indent=None),
+    'orjson': OrjsonSerializer,
+    'msgpack': MsgPackSerializer,
+}
+
+
+def get_serializer(name: str) -> ResultSerializer:
+    """
+    Create a serializer by format name.
+
+    Raises:
+        ValueError: Unknown format name
+        ImportError: Format needs an optional library that is not installed
+    """
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown output format '{name}' (choose from: {', '.join(SERIALIZERS)})")
+    try:
+        return SERIALIZERS[name]()
+    except ImportError as e:
+        raise ImportError(f"Output format '{name}' requires an optional library: {e}") from e
+
+
+def available_serializers() -> List[str]:
+    """Names of formats whose dependencies are installed."""
+    names = []
+    for name in SERIALIZERS:
+        try:
+            get_serializer(name)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+class ColumnarBatchWriter:
+    """
+    Streaming columnar export of a batch run (one row per detection).
+
+    Columns: filename, timestamp, detection_id, text, raw_text, confidence,
+    x_min, y_min, x_max, y_max, polygon (8 int32 values per row).
+
+    Technical Note:
+    - Rows are buffered and flushed as one record batch every
+      `flush_every` images, so memory stays flat for long batches
+    - Columns are taken straight from DetectionSet arrays (no dicts)
+    - Output type follows the file extension: .parquet or .arrow
+    """
+
+    def __init__(self, path: str, flush_every: int = 256):
+        import pyarrow as pa
+        self._pa = pa
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.schema = pa.schema([
+            ('filename', pa.string()),
+            ('timestamp', pa.string()),
+            ('detection_id', pa.string()),
+            ('text', pa.string()),
+            ('raw_text', pa.string()),
+            ('confidence', pa.float32()),
+            ('x_min', pa.int32()),
+            ('y_min', pa.int32()),
+            ('x_max', pa.int32()),
+            ('y_max', pa.int32()),
+            ('polygon', pa.list_(pa.int32(), 8)),
+        ])
+
+        suffix = self.path.suffix.lower()
+        if suffix == '.parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(str(self.path), self.schema, compression='zstd')
+        elif suffix in ('.arrow', '.feather'):
+            import pyarrow.ipc as ipc
+            self._writer = ipc.new_file(str(self.path), self.schema)
+        else:
+            raise ValueError(f"Unsupported batch export type '{suffix}' (use .parquet or .arrow)")
+
+        self._pending: List[Dict] = []
+        self.rows_written = 0
+
+    def add(self, output_data: Dict):
+        """Queue one structured result for export."""
+        self._pending.append(output_data)
+        if len(self._pending) >= self.flush_every:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pa = self._pa
+
+        columns = {name: [] for name in self.schema.names}
+        numeric = {'confidence': [], 'bbox': [], 'polygon': []}
+        for output_data in self._pending:
+            metadata = output_data['metadata']
+            detections = DetectionSet.coerce(output_data['detections'])
+            n = len(detections)
+            columns['filename'].extend([metadata['filename']] * n)
+            columns['timestamp'].extend([metadata['timestamp']] * n)
+            columns['detection_id'].extend(f"detection_{i:03d}" for i in range(n))
+            columns['text'].extend(detections.texts)
+            columns['raw_text'].extend(detections.raw_text(i) for i in range(n))
+            numeric['confidence'].append(detections.confidence)
+            numeric['bbox'].append(detections.bbox)
+            numeric['polygon'].append(detections.polygon.reshape(-1, 8))
+
+        confidence = np.concatenate(numeric['confidence'])
+        bbox = np.concatenate(numeric['bbox'])
+        polygon = np.concatenate(numeric['polygon'])
+
+        arrays = [
+            pa.array(columns['filename'], pa.string()),
+            pa.array(columns['timestamp'], pa.string()),
+            pa.array(columns['detection_id'], pa.string()),
+            pa.array(columns['text'], pa.string()),
+            pa.array(columns['raw_text'], pa.string()),
+            pa.array(confidence, pa.float32()),
+            pa.array(bbox[:, 0]), pa.array(bbox[:, 1]),
+            pa.array(bbox[:, 2]), pa.array(bbox[:, 3]),
+            pa.FixedSizeListArray.from_arrays(pa.array(polygon.reshape(-1)), 8),
+        ]
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+        if hasattr(self._writer, 'write_batch'):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(pa.Table.from_batches([batch]))
+
+        self.rows_written += batch.num_rows
+        self._pending = []
+
+    def close(self):
+        """Flush remaining rows and finalize the file."""
+        self._flush()
+        self._writer.close()
+        logger.info(f"Batch export written: {self.path} ({self.rows_written} rows)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
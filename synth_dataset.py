@@ -0,0 +1,358 @@
+"""
+Synthetic Stencil Dataset for Industrial OCR System
+====================================================
+Seeded generator of degraded stencil labels with ground truth
+
+Why:
+- create_test_image() in test_system.py draws three clean strings on
+  flat gray, which says nothing about faded paint, rust, skew or low light
+- Real labelled photos are scarce; throughput and accuracy at realistic
+  scale need thousands of images with known text
+
+Key Features:
+- Deterministic: image i depends only on (seed, i), so any shard or a
+  single image can be regenerated independently of worker count
+- Stencil look: bold Hershey glyphs with bridges cut through them,
+  spray-paint edges, cardboard/metal/wood backgrounds
+- Controllable degradations, each drawn per image from [0, max]:
+  fade, occlusion, perspective, blur, noise, resolution, rust, low light
+- Streaming: images are written as they are generated and each manifest
+  line is flushed immediately (constant memory for any count)
+- Manifest is the tuner's labelled-set format plus boxes and levels:
+  {"image": "synth_000042.jpg", "texts": [...], "boxes": [[x1, y1, x2, y2], ...],
+   "levels": {"fade": 0.31, ...}}
+
+Usage:
+- python synth_dataset.py --out data/synth --count 5000 --seed 7
+- python synth_dataset.py --out data/synth --count 5000 --severity 0.5 --workers 4
+- python synth_dataset.py --out data/synth --count 200 --fade 0.9 --blur 0 --perspective 0
+- python tuner.py --manifest data/synth/manifest.jsonl --search halving --workers 4
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FONTS = (cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX, cv2.FONT_HERSHEY_TRIPLEX)
+
+# Field templates: @ = letter, # = digit, other characters literal
+TEMPLATES = (
+    'SN-####-@@@', 'BATCH-####-@', 'LOT ###', 'WEIGHT-##KG', 'PO ######',
+    '@@##-###', 'PART ####-##', 'EXP ##-####', 'NET ##KG', 'UN####',
+)
+
+LETTERS = 'ABCDEFGHJKLMNPRSTUVWXYZ'   # I/O excluded as on real stencil sets
+DIGITS = '0123456789'
+
+
+class Degradation(NamedTuple):
+    """Maximum level per degradation (each image draws from [0, max])."""
+    fade: float = 0.7           # paint loss (1 = invisible)
+    occlusion: float = 0.3      # fraction of one field covered by tape/strap
+    perspective: float = 0.08   # corner displacement / image side
+    blur: float = 2.0           # Gaussian sigma (px)
+    noise: float = 12.0         # sensor noise std (gray levels)
+    resolution: float = 0.5     # downscale: output size factor in [1 - r, 1]
+    rust: float = 0.6           # dirt/rust blotch coverage
+    low_light: float = 0.6      # darkening and vignetting
+
+    def scaled(self, severity: float) -> 'Degradation':
+        return Degradation(*[min(v * severity, 1.0) if name in _UNIT else v * severity
+                             for name, v in zip(self._fields, self)])
+
+
+# Levels that are fractions and must stay <= 1
+_UNIT = {'fade', 'occlusion', 'resolution', 'rust', 'low_light'}
+
+
+class Sample(NamedTuple):
+    """Ground truth of one generated image."""
+    index: int
+    texts: List[str]
+    boxes: List[List[int]]      # x1, y1, x2, y2 in output pixels
+    levels: Dict[str, float]
+
+
+def _random_text(rng: np.random.Generator) -> str:
+    template = TEMPLATES[rng.integers(len(TEMPLATES))]
+    return ''.join(
+        LETTERS[rng.integers(len(LETTERS))] if c == '@'
+        else DIGITS[rng.integers(10)] if c == '#' else c
+        for c in template
+    )
+
+
+def _smooth_field(rng: np.random.Generator, h: int, w: int, cells: int = 6) -> np.ndarray:
+    """Low-frequency random field in [0, 1] (upsampled coarse noise)."""
+    coarse = rng.random((cells, max(2, int(cells * w / h)))).astype(np.float32)
+    return cv2.resize(coarse, (w, h), interpolation=cv2.INTER_CUBIC).clip(0, 1)
+
+
+def _background(rng: np.random.Generator, h: int, w: int) -> np.ndarray:
+    """Cardboard, painted metal or wood: base color, texture and grain."""
+    kind = rng.integers(3)
+    base = [np.array([110, 150, 185]), np.array([120, 125, 120]),
+            np.array([95, 135, 170])][kind] + rng.integers(-25, 26, size=3)
+    img = np.empty((h, w, 3), np.float32)
+    img[:] = base
+    img += (_smooth_field(rng, h, w)[..., None] - 0.5) * 40
+    if kind == 0:
+        # Corrugation: soft vertical stripes
+        period = rng.uniform(12, 30)
+        img += (np.sin(np.arange(w) / period * 2 * np.pi) * 6)[None, :, None]
+    elif kind == 2:
+        # Wood grain: stretched horizontal noise
+        grain = cv2.resize(rng.random((h // 4, 8)).astype(np.float32), (w, h))
+        img += (grain[..., None] - 0.5) * 30
+    return img
+
+
+def _stencil_mask(rng: np.random.Generator, text: str, font: int, scale: float,
+                  thickness: int) -> Tuple[np.ndarray, int]:
+    """
+    Paint mask of one field: glyphs with stencil bridges cut through.
+
+    Returns:
+        Tuple of (float mask sized to the text, baseline offset)
+    """
+    (tw, th), baseline = cv2.getTextSize(text, font, scale, thickness)
+    pad = thickness * 2
+    mask = np.zeros((th + baseline + 2 * pad, tw + 2 * pad), np.uint8)
+    cv2.putText(mask, text, (pad, pad + th), font, scale, 255, thickness, cv2.LINE_AA)
+
+    # Bridges: thin vertical gaps through roughly half the glyphs
+    bridge = max(1, thickness // 2)
+    x = pad
+    for ch in text:
+        cw = cv2.getTextSize(ch, font, scale, thickness)[0][0]
+        if ch.strip() and rng.random() < 0.5:
+            cx = x + cw // 2 + int(rng.integers(-1, 2))
+            mask[:, max(cx - bridge // 2, 0):cx + bridge - bridge // 2] = 0
+        x += cw
+
+    # Spray edges: slight blur plus ragged erosion
+    soft = cv2.GaussianBlur(mask.astype(np.float32) / 255.0, (0, 0), 0.8)
+    ragged = soft * (0.75 + 0.25 * rng.random(soft.shape).astype(np.float32))
+    return ragged.clip(0, 1), baseline
+
+
+def render_sample(index: int, seed: int = 0, degradation: Degradation = Degradation(),
+                  size: Tuple[int, int] = (1280, 960)) -> Tuple[np.ndarray, Sample]:
+    """
+    Render image `index` of the dataset defined by `seed`.
+
+    Args:
+        index: Image number (the same (seed, index) always gives the same image)
+        seed: Dataset seed
+        degradation: Maximum degradation levels
+        size: Canvas size (width, height) before perspective and resolution
+
+    Returns:
+        Tuple of (BGR image, ground truth)
+    """
+    rng = np.random.default_rng([seed, index])
+    w, h = size
+    levels = {name: round(float(rng.uniform(0, limit)), 3) if limit > 0 else 0.0
+              for name, limit in zip(degradation._fields, degradation)}
+
+    img = _background(rng, h, w)
+    light_paint = rng.random() < 0.3
+    paint = np.array([235, 235, 230] if light_paint else [25, 25, 30], np.float32)
+    paint += rng.integers(-15, 16, size=3)
+
+    # Layout: 1-4 fields stacked, each fitted to 50-90% of the width
+    texts, boxes = [], []
+    count = int(rng.integers(1, 5))
+    font = FONTS[rng.integers(len(FONTS))]
+    slot = h / (count + 1)
+    for k in range(count):
+        text = _random_text(rng)
+        thickness = int(rng.integers(3, 8))
+        target_w = w * rng.uniform(0.5, 0.9)
+        scale = target_w / max(cv2.getTextSize(text, font, 1.0, thickness)[0][0], 1)
+        scale = min(scale, slot / 40.0)
+        mask, _ = _stencil_mask(rng, text, font, scale, thickness)
+        mh, mw = mask.shape
+        if mw >= w or mh >= h:
+            continue
+        x = int(rng.integers(0, w - mw))
+        y = int(np.clip(slot * (k + 1) - mh / 2 + rng.normal(0, slot * 0.05), 0, h - mh))
+
+        # Fading: overall paint loss modulated by a patchy field
+        patch = _smooth_field(rng, mh, mw, cells=3)
+        alpha = mask * (1 - levels['fade'] * (0.5 + 0.5 * patch))
+        region = img[y:y + mh, x:x + mw]
+        region[:] = region * (1 - alpha[..., None]) + paint * alpha[..., None]
+
+        texts.append(text)
+        boxes.append([x, y, x + mw, y + mh])
+
+    # Rust / dirt blotches, drawn and blurred at 1/8 size (they are soft anyway)
+    blotches = int(levels['rust'] * 12)
+    if blotches:
+        sw, sh = max(w // 8, 8), max(h // 8, 8)
+        field = np.zeros((sh, sw), np.float32)
+        for _ in range(blotches):
+            blot = np.zeros_like(field)
+            axes = (int(rng.integers(2, max(sw // 8, 3))), int(rng.integers(1, max(sh // 8, 2))))
+            cv2.ellipse(blot, (int(rng.integers(0, sw)), int(rng.integers(0, sh))), axes,
+                        float(rng.uniform(0, 180)), 0, 360, 1.0, -1)
+            blot = cv2.GaussianBlur(blot, (0, 0), max(axes) / 3 + 0.5) * rng.uniform(0.3, 0.8)
+            np.maximum(field, blot, out=field)
+        blot = cv2.resize(field, (w, h), interpolation=cv2.INTER_LINEAR)[..., None]
+        rust = np.array([30, 60, 110], np.float32) + rng.integers(-15, 16, size=3)
+        img -= (img - rust) * blot
+
+    # Occlusion: tape or strap across part of one field
+    if boxes and levels['occlusion'] > 0.02:
+        x1, y1, x2, y2 = boxes[int(rng.integers(len(boxes)))]
+        cover = int((x2 - x1) * levels['occlusion'])
+        ox = int(rng.integers(x1, max(x2 - cover, x1 + 1)))
+        tape = np.array([200, 200, 190] if rng.random() < 0.5 else [60, 50, 40], np.float32)
+        img[max(y1 - 5, 0):y2 + 5, ox:ox + cover] = tape + rng.normal(0, 4, 3)
+
+    # Low light: darkening plus vignette (separable radius, no full grids)
+    if levels['low_light'] > 0:
+        dx = ((np.arange(w, dtype=np.float32) - w / 2) ** 2)[None, :]
+        dy = ((np.arange(h, dtype=np.float32) - h / 2) ** 2)[:, None]
+        radius = (dx + dy) / ((w / 2) ** 2 + (h / 2) ** 2)
+        img *= ((1 - 0.6 * levels['low_light']) * (1 - 0.5 * levels['low_light'] * radius))[..., None]
+
+    img = img.clip(0, 255).astype(np.uint8)
+
+    # Perspective: displace the corners, transform the ground-truth boxes
+    if levels['perspective'] > 0:
+        shift = levels['perspective'] * min(w, h)
+        src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+        dst = (src + rng.uniform(-shift, shift, size=(4, 2))).astype(np.float32)
+        M = cv2.getPerspectiveTransform(src, dst)
+        img = cv2.warpPerspective(img, M, (w, h), borderMode=cv2.BORDER_REPLICATE)
+        boxes = [_warp_box(box, M, w, h) for box in boxes]
+
+    if levels['blur'] > 0.3:
+        img = cv2.GaussianBlur(img, (0, 0), levels['blur'])
+    # Sensor noise (at least a little surface grain on every image)
+    noise = rng.standard_normal(img.shape, dtype=np.float32) * max(levels['noise'], 3.0)
+    img = cv2.add(img, noise, dtype=cv2.CV_8U)
+
+    # Resolution: smaller output image
+    factor = 1 - levels['resolution']
+    if factor < 0.98:
+        img = cv2.resize(img, (int(w * factor), int(h * factor)), interpolation=cv2.INTER_AREA)
+        boxes = [[int(round(v * factor)) for v in box] for box in boxes]
+
+    return img, Sample(index, texts, boxes, levels)
+
+
+def _warp_box(box: List[int], M: np.ndarray, w: int, h: int) -> List[int]:
+    x1, y1, x2, y2 = box
+    corners = np.float32([[[x1, y1]], [[x2, y1]], [[x2, y2]], [[x1, y2]]])
+    warped = cv2.perspectiveTransform(corners, M).reshape(-1, 2)
+    (bx1, by1), (bx2, by2) = warped.min(axis=0), warped.max(axis=0)
+    return [int(max(bx1, 0)), int(max(by1, 0)), int(min(bx2, w)), int(min(by2, h))]
+
+
+def _render_encoded(args) -> Tuple[bytes, Sample]:
+    """Worker: render and JPEG-encode one image (quality is part of the noise)."""
+    index, seed, degradation, size = args
+    img, sample = render_sample(index, seed, degradation, size)
+    quality = int(95 - 45 * sample.levels['noise'] / max(degradation.noise, 1e-6)) \
+        if degradation.noise > 0 else 95
+    ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError(f"JPEG encoding failed for image {index}")
+    return encoded.tobytes(), sample
+
+
+def generate_dataset(out_dir: str, count: int, seed: int = 0,
+                     degradation: Degradation = Degradation(),
+                     size: Tuple[int, int] = (1280, 960), start: int = 0,
+                     workers: int = 1) -> Iterator[Sample]:
+    """
+    Write images and manifest lines as they are generated.
+
+    Args:
+        out_dir: Output folder (images + manifest.jsonl)
+        count: Number of images
+        seed: Dataset seed
+        degradation: Maximum degradation levels
+        size: Canvas size (width, height)
+        start: First image index (shards / resuming append to the manifest)
+        workers: Rendering processes (output order and content unchanged)
+
+    Yields:
+        Ground truth of each written image
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    tasks = ((i, seed, degradation, size) for i in range(start, start + count))
+    mode = 'a' if start > 0 else 'w'
+
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        results = (pool.imap(_render_encoded, tasks, chunksize=8) if pool is not None
+                   else map(_render_encoded, tasks))
+        with open(out / 'manifest.jsonl', mode, encoding='utf-8') as manifest:
+            for encoded, sample in results:
+                name = f"synth_{sample.index:06d}.jpg"
+                with open(out / name, 'wb') as f:
+                    f.write(encoded)
+                manifest.write(json.dumps({
+                    'image': name, 'texts': sample.texts,
+                    'boxes': sample.boxes, 'levels': sample.levels
+                }) + '\n')
+                manifest.flush()
+                yield sample
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def main():
+    """Dataset generation CLI."""
+    defaults = Degradation()
+    parser = argparse.ArgumentParser(description='Synthetic degraded stencil dataset')
+    parser.add_argument('--out', type=str, required=True, help='Output folder')
+    parser.add_argument('--count', type=int, default=1000, help='Number of images')
+    parser.add_argument('--seed', type=int, default=0, help='Dataset seed')
+    parser.add_argument('--start', type=int, default=0,
+                        help='First image index (append a shard to an existing set)')
+    parser.add_argument('--size', type=str, default='1280x960', help='Canvas size WxH')
+    parser.add_argument('--severity', type=float, default=1.0,
+                        help='Multiplier on all maximum degradation levels')
+    parser.add_argument('--workers', type=int, default=1, help='Rendering processes')
+    for name, value in zip(defaults._fields, defaults):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=value,
+                            help=f"Maximum {name.replace('_', ' ')} level (default: {value})")
+    args = parser.parse_args()
+
+    degradation = Degradation(*[getattr(args, name) for name in defaults._fields])
+    degradation = degradation.scaled(args.severity)
+    w, h = (int(v) for v in args.size.lower().split('x'))
+
+    start = time.perf_counter()
+    written = 0
+    for written, _ in enumerate(generate_dataset(args.out, args.count, args.seed, degradation,
+                                                 (w, h), args.start, args.workers), 1):
+        if written % 500 == 0:
+            logger.info(f"{written}/{args.count} images")
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {written} images to {args.out} in {elapsed:.1f} s "
+          f"({written / max(elapsed, 1e-9):.1f} img/s); manifest: "
+          f"{Path(args.out) / 'manifest.jsonl'}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    sys.exit(main())
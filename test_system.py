@@ -8,11 +8,21 @@ import os
 import sys
 import time
 import json
+import logging
+import multiprocessing
 from pathlib import Path
 import cv2
 import numpy as np
 
 from main import IndustrialOCRSystem
+from result_store import ResultStore, import_json_folder
+from lexicon import CodeLexicon, PatternValidator
+from image_analysis import OrientationDetector, rotate_image
+from consensus import ConsensusVoter
+from detections import DetectionSet
+from engines import StubEngine
+from job_queue import JobQueue
+from log_config import setup_logging, shutdown_logging
 
 
 def create_test_image():
@@ -220,6 +230,421 @@ def test_error_handling(ocr):
     return True
 
 
+def test_result_store():
+    """Test SQLite result store and full-text search."""
+    print("\n" + "="*60)
+    print("TEST 7: Result Store")
+    print("="*60)
+    
+    try:
+        db_path = Path("outputs/test_results.db")
+        if db_path.exists():
+            db_path.unlink()
+        
+        sample = {
+            'metadata': {
+                'filename': 'synthetic_test.jpg',
+                'timestamp': '2026-01-15T10:00:00',
+                'total_detections': 1,
+                'average_confidence': 0.9,
+                'processing_version': '1.0.0'
+            },
+            'detections': [{
+                'id': 'detection_000',
+                'text': 'SERIAL-XYZ-123',
+                'raw_text': 'SERIAL-XYZ-123.',
+                'confidence': 0.9,
+                'bbox': [50, 270, 400, 310],
+                'bbox_polygon': [[50, 270], [400, 270], [400, 310], [50, 310]]
+            }],
+            'summary': {'extracted_texts': ['SERIAL-XYZ-123'], 'quality_score': 'EXCELLENT'}
+        }
+        
+        import_dir = Path("outputs/test_import")
+        import_dir.mkdir(parents=True, exist_ok=True)
+        with open(import_dir / "synthetic_test.json", 'w', encoding='utf-8') as f:
+            json.dump(sample, f)
+        
+        with ResultStore(str(db_path)) as store:
+            store.add_result(sample)
+            # Same result again (e.g. backfill after a daemon indexed it)
+            duplicate = store.add_result(sample)
+            imported = import_json_folder(store, str(import_dir))
+            exact = store.search("SERIAL-XYZ-123")
+            prefix = store.search("SERIAL-XYZ", prefix=True)
+            later = store.search("SERIAL-XYZ-123", since="2026-02-01")
+        
+        print(f"  Exact matches: {len(exact)}")
+        print(f"  Prefix matches: {len(prefix)}")
+        print(f"  Matches after time filter: {len(later)}")
+        
+        if len(exact) != 1 or len(prefix) != 1 or later:
+            print("✗ Unexpected search results")
+            return False
+        if duplicate is not None or imported:
+            print("✗ Duplicate result was stored again")
+            return False
+        
+        print("✓ Result store tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Result store test failed: {e}")
+        return False
+
+
+def test_lexicon_correction():
+    """Test lexicon snapping and pattern validation."""
+    print("\n" + "="*60)
+    print("TEST 8: Lexicon Correction")
+    print("="*60)
+    
+    try:
+        lexicon = CodeLexicon(["BATCH-2024-A", "WEIGHT-50KG", "SERIAL-XYZ-123"])
+        validator = PatternValidator({'batch_number': r"BATCH-\d{4}-[A-Z]"})
+        
+        cases = [
+            ("BATCH-2O24-A", "BATCH-2024-A"),     # O/0 confusion
+            ("SERIAL-XYZ-12", "SERIAL-XYZ-123"),  # dropped character
+            ("WEIGHT-50KG", "WEIGHT-50KG"),       # exact
+        ]
+        for text, expected in cases:
+            match = lexicon.lookup(text)
+            print(f"  '{text}' -> {match}")
+            if match is None or match.code != expected:
+                print(f"✗ Expected '{expected}'")
+                return False
+        
+        if lexicon.lookup("COMPLETELY-DIFFERENT") is not None:
+            print("✗ Unrelated text should not match")
+            return False
+        
+        # Codes differing only by a confusable (S/5) are both kept
+        twins = CodeLexicon(["SN-5100", "SN-S100"])
+        cases = [
+            ("SN-S100", ("SN-S100", 0)),    # valid read, not "corrected"
+            ("SN-5100", ("SN-5100", 0)),
+            ("SN-S10O", ("SN-S100", 1)),    # nearest by unfolded distance
+        ]
+        if len(twins) != 2:
+            print(f"✗ Expected 2 codes, got {len(twins)}")
+            return False
+        for text, expected in cases:
+            match = twins.lookup(text)
+            print(f"  '{text}' -> {match}")
+            if match is None or tuple(match) != expected:
+                print(f"✗ Expected {expected}")
+                return False
+        
+        if validator.match("BATCH-2024-A") != 'batch_number' or validator.match("BATCH-24"):
+            print("✗ Pattern validation mismatch")
+            return False
+        
+        print("✓ Lexicon correction tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Lexicon test failed: {e}")
+        return False
+
+
+def test_orientation_detection(image_path):
+    """Test coarse text-axis detection on rotated copies of the test image."""
+    print("\n" + "="*60)
+    print("TEST 9: Orientation Detection")
+    print("="*60)
+    
+    try:
+        image = cv2.imread(image_path)
+        detector = OrientationDetector()  # axis only, no recognizer probe
+        
+        for rotation in (0, 90, 180, 270):
+            result = detector.detect(rotate_image(image, rotation))
+            print(f"  rotated {rotation:3d} -> {result}")
+            # Without a probe, 0/180 and 90/270 are indistinguishable
+            if (rotation + result.rotation) % 180 != 0:
+                print(f"✗ Wrong text axis for {rotation} degree rotation")
+                return False
+        
+        print("✓ Orientation detection tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Orientation test failed: {e}")
+        return False
+
+
+def test_frame_consensus():
+    """Test per-field voting and early stopping across frames."""
+    print("\n" + "="*60)
+    print("TEST 10: Multi-Frame Consensus")
+    print("="*60)
+    
+    def frame(*readings):
+        return DetectionSet(
+            [text for text, _ in readings], [None] * len(readings),
+            [conf for _, conf in readings],
+            np.zeros((len(readings), 4, 2)), np.zeros((len(readings), 4))
+        )
+    
+    try:
+        voter = ConsensusVoter(min_agreement=2, min_frames=2)
+        voter.add(frame(('AB12-345', 0.70), ('LOT 9', 0.90)))
+        voter.add(frame(('A812-345', 0.80), ('LOT 9', 0.90)))
+        if voter.reached():
+            print("✗ Consensus reached although the serial readings disagree")
+            return False
+        
+        voter.add(frame(('AB12-345', 0.60), ('LOT 9', 0.85), ('X', 0.20)))
+        detections, fields = voter.result()
+        print(f"  fields: {[(f['text'], f['agreeing_frames']) for f in fields]}")
+        if not voter.reached() or sorted(detections.texts) != ['AB12-345', 'LOT 9']:
+            print("✗ Expected consensus on AB12-345 and LOT 9 after three frames")
+            return False
+        
+        # No two frames agree: character-level vote repairs each misread
+        voter = ConsensusVoter(min_agreement=2)
+        for text in ('AB12-34S', 'A812-345', 'AB1Z-345'):
+            voter.add(frame((text, 0.7)))
+        detections, _ = voter.result()
+        if detections.texts != ['AB12-345'] or voter.reached():
+            print(f"✗ Character vote gave {detections.texts}")
+            return False
+        
+        print("✓ Consensus tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Consensus test failed: {e}")
+        return False
+
+
+def test_stub_pipeline(image_path):
+    """Test the full pipeline around the model with the stub engine."""
+    print("\n" + "="*60)
+    print("TEST 11: Pipeline With Stub Engine")
+    print("="*60)
+    
+    try:
+        config = {'ocr': {'engine_options': {'stub': {'regions': 4, 'latency_ms': 5}}}}
+        ocr = IndustrialOCRSystem(config=config, engine='stub')
+        if not isinstance(ocr.engine, StubEngine):
+            print("✗ Stub engine not selected")
+            return False
+        
+        start = time.time()
+        first = ocr.process_image(image_path)
+        elapsed = time.time() - start
+        second = ocr.process_image(image_path)
+        print(f"  {first['metadata']['total_detections']} detections in {elapsed * 1000:.0f} ms")
+        
+        texts = [d['text'] for d in first['detections']]
+        if len(texts) != 4 or texts != [d['text'] for d in second['detections']]:
+            print(f"✗ Expected 4 identical detections per run, got {texts}")
+            return False
+        
+        result_path = ocr.output_dir / f"{Path(image_path).stem}{ocr.serializer.extension}"
+        if not result_path.exists():
+            print(f"✗ Result file missing: {result_path}")
+            return False
+        
+        print("✓ Stub pipeline tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Stub pipeline test failed: {e}")
+        return False
+
+
+def test_region_reocr(image_path):
+    """Test recognition-only re-runs on cached detector regions."""
+    print("\n" + "="*60)
+    print("TEST 12: Re-OCR of Selected Regions")
+    print("="*60)
+    
+    try:
+        config = {'ocr': {'region_cache': {'enabled': True},
+                          'engine_options': {'stub': {'regions': 4}}}}
+        ocr = IndustrialOCRSystem(config=config, engine='stub')
+        result = ocr.process_image(image_path)
+        before = [d['text'] for d in result['detections']]
+        
+        # Detector must not run again
+        ocr.engine.detect = None
+        updated = ocr.reocr_regions(image_path, result, indices=[1], rois=[[0, 0, 40, 40]])
+        after = updated['detections']
+        print(f"  {len(before)} -> {len(after)} detections")
+        
+        if len(after) != len(before) + 1 or [d['text'] for d in after][0] != before[0]:
+            print("✗ Unselected detections changed or ROI result missing")
+            return False
+        if not after[1].get('reocr') or after[0].get('reocr'):
+            print("✗ Re-read detections not flagged")
+            return False
+        
+        full = ocr.reocr_regions(image_path, result)
+        if len(full['detections']) != len(before) or ocr.region_cache.stats()['hits'] < 1:
+            print("✗ Whole-image re-run did not use the cached regions")
+            return False
+        
+        print("✓ Re-OCR tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Re-OCR test failed: {e}")
+        return False
+
+
+def _log_from_child(message):
+    """Forked-child body for test_forked_logging."""
+    logging.getLogger('ocr.worker').warning(message)
+    shutdown_logging()
+
+
+def test_forked_logging():
+    """Test that log records of forked workers reach the log handlers."""
+    print("\n" + "="*60)
+    print("TEST 13: Logging From Forked Workers")
+    print("="*60)
+    
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        print("  fork start method not available, skipped")
+        return True
+    
+    log_file = Path("outputs/test_logging") / "forked_logging.log"
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    log_file.unlink(missing_ok=True)
+    try:
+        setup_logging({'file': str(log_file), 'console_output': False})
+        logging.getLogger('ocr.worker').warning("parent record")
+        
+        message = "child record from forked worker"
+        process = multiprocessing.get_context('fork').Process(
+            target=_log_from_child, args=(message,))
+        process.start()
+        process.join(timeout=30)
+        shutdown_logging()
+        
+        lines = log_file.read_text(encoding='utf-8').splitlines()
+        print(f"  {len(lines)} line(s) logged, child exit code {process.exitcode}")
+        if process.exitcode != 0 or not any(message in line for line in lines):
+            print("✗ Child record missing from the log file")
+            return False
+        if sum('parent record' in line for line in lines) != 1:
+            print("✗ Parent record lost or duplicated by the child")
+            return False
+        
+        print("✓ Forked logging tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Forked logging test failed: {e}")
+        return False
+    finally:
+        setup_logging()
+
+
+def test_deadline_degradation(image_path):
+    """Test the degradations the deadline picks under a tight budget."""
+    print("\n" + "="*60)
+    print("TEST 14: Deadline Degradation")
+    print("="*60)
+    
+    try:
+        # Costs far above the budget: every degradation is needed
+        costs = {'preprocess': 1e5, 'preprocess_fast': 1.0, 'deskew': 1e5,
+                 'detect': 1e4, 'recognize': 1.0}
+        config = {'performance': {'deadline': {'costs': costs}},
+                  'ocr': {'engine_options': {'stub': {'regions': 4}}}}
+        ocr = IndustrialOCRSystem(config=config, engine='stub')
+        result = ocr.process_image(image_path, deadline_ms=2000)
+        report = result['metadata']['deadline']
+        print(f"  tight budget: {report['degradations']}")
+        
+        for name in ('fast_preprocess', 'skip_deskew', 'reduced_canvas'):
+            if name not in report['degradations']:
+                print(f"✗ Expected degradation '{name}'")
+                return False
+        if ocr.deadline_costs.costs['preprocess'] != costs['preprocess']:
+            print("✗ Standard chain ran despite the fast_preprocess decision")
+            return False
+        
+        # Loose budget with profile: fast keeps the fast chain
+        config['preprocessing'] = {'profile': 'fast'}
+        config['performance']['deadline']['costs'] = {'preprocess': 60.0, 'preprocess_fast': 25.0}
+        ocr = IndustrialOCRSystem(config=config, engine='stub')
+        result = ocr.process_image(image_path, deadline_ms=60000)
+        report = result['metadata']['deadline']
+        print(f"  loose budget, fast profile: {report['degradations'] or 'none'}, "
+              f"costs {ocr.deadline_costs.as_dict()}")
+        if report['degradations'] or ocr.deadline_costs.costs['preprocess'] != 60.0 \
+                or ocr.deadline_costs.costs['preprocess_fast'] == 25.0:
+            print("✗ Configured fast profile not used under a loose deadline")
+            return False
+        
+        print("✓ Deadline tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Deadline test failed: {e}")
+        return False
+
+
+def test_job_queue():
+    """Test leases, reclaiming, retries and status counts of the job queue."""
+    print("\n" + "="*60)
+    print("TEST 15: Job Queue Leases and Retries")
+    print("="*60)
+    
+    db_path = Path("outputs/test_queue/queue.db")
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    db_path.unlink(missing_ok=True)
+    try:
+        with JobQueue(str(db_path), lease_seconds=0.2, max_attempts=2,
+                      backoff_seconds=0.0) as queue:
+            paths = [str(db_path.parent / name) for name in ("a.jpg", "b.jpg")]
+            if queue.enqueue(paths) != 2 or queue.enqueue(paths) != 0:
+                print("✗ Enqueue did not ignore already queued paths")
+                return False
+            for worker in ("worker-a", "worker-b"):
+                queue.register_worker(worker)
+            
+            # Worker A stops heartbeating; B reclaims the expired lease
+            first = queue.claim("worker-a")
+            time.sleep(0.3)
+            reclaimed = queue.claim("worker-b")
+            print(f"  claimed {first}, reclaimed {reclaimed}")
+            if reclaimed is None or reclaimed.id != first.id or reclaimed.attempts != 2:
+                print("✗ Expired lease not reclaimed by the other worker")
+                return False
+            if queue.complete(first.id, "worker-a"):
+                print("✗ Completion accepted from the worker that lost the lease")
+                return False
+            
+            # Second failure reaches max_attempts: failed for good
+            queue.fail(reclaimed.id, "worker-b", "boom")
+            
+            # First failure of the other job: retried (no backoff here)
+            job = queue.claim("worker-a")
+            queue.fail(job.id, "worker-a", "transient")
+            retry = queue.claim("worker-a")
+            if retry is None or retry.id != job.id or retry.attempts != 2:
+                print("✗ Failed job not retried")
+                return False
+            queue.complete(retry.id, "worker-a", {'texts': []})
+            
+            status = queue.status()
+            workers = {w['worker']: (w['processed'], w['failed']) for w in status['workers']}
+            print(f"  jobs {status['jobs']}, workers {workers}")
+            if status['jobs'] != {'pending': 0, 'running': 0, 'done': 1, 'failed': 1}:
+                print("✗ Unexpected job counts")
+                return False
+            if workers != {'worker-a': (1, 1), 'worker-b': (0, 1)}:
+                print("✗ Unexpected worker counts")
+                return False
+            if queue.runnable() != 0:
+                print("✗ Nothing should be runnable")
+                return False
+        
+        print("✓ Job queue tests passed")
+        return True
+    except Exception as e:
+        print(f"✗ Job queue test failed: {e}")
+        return False
+
+
 def run_all_tests():
     """Run complete test suite."""
     print("\n" + "="*70)
@@ -256,6 +681,33 @@ def run_all_tests():
     # Test 6: Error Handling
     results['error_handling'] = test_error_handling(ocr)
     
+    # Test 7: Result Store
+    results['result_store'] = test_result_store()
+    
+    # Test 8: Lexicon Correction
+    results['lexicon_correction'] = test_lexicon_correction()
+    
+    # Test 9: Orientation Detection
+    results['orientation_detection'] = test_orientation_detection(test_image)
+    
+    # Test 10: Multi-Frame Consensus
+    results['frame_consensus'] = test_frame_consensus()
+    
+    # Test 11: Stub Engine Pipeline
+    results['stub_pipeline'] = test_stub_pipeline(test_image)
+    
+    # Test 12: Region Re-OCR
+    results['region_reocr'] = test_region_reocr(test_image)
+    
+    # Test 13: Forked Worker Logging
+    results['forked_logging'] = test_forked_logging()
+    
+    # Test 14: Deadline Degradation
+    results['deadline_degradation'] = test_deadline_degradation(test_image)
+    
+    # Test 15: Job Queue
+    results['job_queue'] = test_job_queue()
+    
     # Summary
     print("\n" + "="*70)
     print(" "*25 + "TEST SUMMARY")
@@ -0,0 +1,537 @@
+"""
+Parameter Tuner for Industrial OCR System
+==========================================
+Parallel parameter sweeps with an accuracy vs. latency Pareto report
+
+Why:
+- config.yaml exposes CLAHE, bilateral, threshold, morphology and
+  detector parameters, but choosing values was guesswork and every trial
+  was a slow full run
+- The tuner scores each configuration on a labelled image set and keeps
+  only settings no other setting beats on both accuracy and latency
+
+Key Features:
+- Search: full grid, random sample, or successive halving (many
+  configurations on a few images, survivors on more images)
+- Parallel: images are split across worker processes; each worker loads
+  the model once and keeps a stage cache (pipeline_graph.py), so
+  configurations that differ only in detector thresholds reuse the
+  preprocessing outputs
+- Accuracy: exact-match F1 of expected field texts, plus character
+  accuracy (1 - edit distance / length of the closest detection)
+- Latency: per-image pipeline time, summed from measured stage times
+  (also for stages served from cache)
+- Output: tuning_report.json, and one ready-to-use config per Pareto
+  configuration (base config with the tuned values)
+
+Labelled set (JSONL, paths relative to the manifest):
+    {"image": "box_001.jpg", "texts": ["SN-2024-0042", "LOT 7"]}
+
+Search space (YAML, "stage.param": [values]):
+    clahe.clip_limit: [2.0, 3.0, 4.0]
+    bilateral.d: [5, 9]
+    ocr.text_threshold: [0.5, 0.6, 0.7]
+
+Usage:
+- python tuner.py --manifest labels.jsonl --search grid --workers 4
+- python tuner.py --manifest labels.jsonl --space space.yaml --search halving --trials 64
+- python tuner.py --manifest labels.jsonl --search random --trials 30 --config config.yaml
+
+Technical Note:
+- Latency is measured while workers share the machine; compare trials
+  with each other, not with production numbers (--workers 1 for clean
+  absolute timings)
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+from lexicon import edit_distance
+from pipeline_graph import StageCache, build_ocr_graph
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ('grid', 'random', 'halving')
+
+# Used when no --space file is given
+DEFAULT_SPACE: Dict[str, List] = {
+    'clahe.clip_limit': [2.0, 3.0, 4.0],
+    'bilateral.d': [5, 9],
+    'adaptive_threshold.block_size': [11, 21],
+    'ocr.text_threshold': [0.5, 0.6, 0.7],
+    'ocr.low_text': [0.3, 0.4],
+}
+
+# Graph stage -> config section receiving its parameters
+CONFIG_SECTIONS = {
+    'clahe': ('preprocessing', 'clahe'),
+    'bilateral': ('preprocessing', 'bilateral'),
+    'adaptive_threshold': ('preprocessing', 'adaptive_threshold'),
+    'morphology': ('preprocessing', 'morphology'),
+    'deskew': ('preprocessing', 'deskew'),
+    'ocr': ('ocr', 'easyocr'),
+}
+
+
+class LabelledImage(NamedTuple):
+    """One image of the labelled set with its expected field texts."""
+    path: str
+    texts: List[str]
+
+
+class Trial(NamedTuple):
+    """Score of one configuration on a set of images."""
+    trial_id: int
+    params: Dict
+    accuracy: float         # exact-match F1 over all fields
+    char_accuracy: float
+    latency_ms: float       # mean per successfully processed image
+    images: int
+    errors: int             # images the configuration failed on
+
+
+# ----------------------------------------------------------------------
+# Labelled set, search space, scoring
+# ----------------------------------------------------------------------
+
+def load_manifest(path: str) -> List[LabelledImage]:
+    """Read a JSONL labelled set; image paths are relative to the manifest."""
+    base = Path(path).parent
+    images = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            image = Path(entry['image'])
+            if not image.is_absolute():
+                image = base / image
+            if not image.exists():
+                raise FileNotFoundError(f"{path}:{line_no}: image not found: {image}")
+            images.append(LabelledImage(str(image), [str(t) for t in entry.get('texts', [])]))
+    return images
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.upper().split())
+
+
+def score_texts(predicted: Sequence[str], expected: Sequence[str]) -> Tuple[int, int, int, float]:
+    """
+    Compare detected texts with the expected fields of one image.
+
+    Returns:
+        Tuple of (exact matches, predicted count, expected count,
+        summed character accuracy of the expected fields)
+    """
+    predicted = [_normalize(t) for t in predicted if t]
+    expected = [_normalize(t) for t in expected]
+    remaining = list(predicted)
+    matches = 0
+    for text in expected:
+        if text in remaining:
+            remaining.remove(text)
+            matches += 1
+
+    char_sum = 0.0
+    for text in expected:
+        if not predicted:
+            break
+        best = min(edit_distance(text, p, max_distance=len(text)) for p in predicted)
+        char_sum += max(0.0, 1.0 - best / max(len(text), 1))
+    return matches, len(predicted), len(expected), char_sum
+
+
+def load_space(path: Optional[str]) -> Dict[str, List]:
+    """Read a search space file ("stage.param": [values]) or the default."""
+    if path is None:
+        return dict(DEFAULT_SPACE)
+    with open(path, 'r', encoding='utf-8') as f:
+        space = yaml.safe_load(f) or {}
+    for name, values in space.items():
+        if '.' not in name or name.split('.', 1)[0] not in CONFIG_SECTIONS:
+            raise ValueError(f"Unknown parameter '{name}' (use stage.param, stages: "
+                             f"{', '.join(CONFIG_SECTIONS)})")
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"Parameter '{name}' needs a non-empty list of values")
+    return space
+
+
+def grid_configs(space: Dict[str, List]) -> List[Dict]:
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_configs(space: Dict[str, List], count: int, seed: int = 0) -> List[Dict]:
+    """Distinct random configurations (the whole grid if it is smaller)."""
+    grid = grid_configs(space)
+    if count >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, count)
+
+
+def to_overrides(params: Dict) -> Dict[str, Dict]:
+    """{'clahe.clip_limit': 2.0} -> {'clahe': {'clip_limit': 2.0}} (graph overrides)."""
+    overrides: Dict[str, Dict] = {}
+    for name, value in params.items():
+        stage, key = name.split('.', 1)
+        overrides.setdefault(stage, {})[key] = value
+    return overrides
+
+
+def to_config(params: Dict, base: Optional[Dict] = None) -> Dict:
+    """Base config with the tuned values written into their sections."""
+    config = json.loads(json.dumps(base or {}))  # deep copy of plain YAML data
+    for stage, values in to_overrides(params).items():
+        section = config
+        for part in CONFIG_SECTIONS[stage]:
+            section = section.setdefault(part, {})
+        section.update(values)
+    return config
+
+
+def pareto_ranks(trials: Sequence[Trial]) -> List[int]:
+    """
+    Non-dominated sorting rank per trial (0 = Pareto front).
+
+    A trial dominates another if it is at least as accurate and at least
+    as fast, and strictly better in one of the two.
+    """
+    ranks = [0] * len(trials)
+    remaining = set(range(len(trials)))
+    rank = 0
+    while remaining:
+        front = {
+            i for i in remaining
+            if not any(
+                trials[j].accuracy >= trials[i].accuracy
+                and trials[j].latency_ms <= trials[i].latency_ms
+                and (trials[j].accuracy > trials[i].accuracy
+                     or trials[j].latency_ms < trials[i].latency_ms)
+                for j in remaining if j != i
+            )
+        }
+        for i in front:
+            ranks[i] = rank
+        remaining -= front
+        rank += 1
+    return ranks
+
+
+# ----------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------
+
+def _build_graph(config: Dict, engine: Optional[str], cache_mb: float):
+    from main import IndustrialOCRSystem
+    system = IndustrialOCRSystem(config=config, engine=engine)
+    return build_ocr_graph(system, StageCache(cache_mb))
+
+
+# Per worker process: stage graph and measured time per stage cache key
+_graph = None
+_stage_ms: Dict[str, float] = {}
+
+
+def _init_worker(config: Dict, engine: Optional[str], cache_mb: float):
+    """Load the model once per worker process."""
+    global _graph
+    _graph = _build_graph(config, engine, cache_mb)
+
+
+def _evaluate_in_worker(images: List[LabelledImage], configs: List[Tuple[int, Dict]]) -> List[Tuple]:
+    return _evaluate(_graph, _stage_ms, images, configs)
+
+
+def _evaluate(graph, stage_ms: Dict[str, float], images: List[LabelledImage],
+              configs: List[Tuple[int, Dict]]) -> List[Tuple]:
+    """
+    Run every configuration on every image of a chunk.
+
+    Images are the outer loop so the stage cache holds one image's
+    intermediates while all configurations are tried on it.
+
+    Returns:
+        (trial_id, matches, predicted, expected, char_sum, latency_ms, error)
+        per image and configuration
+    """
+    rows = []
+    for image in images:
+        for trial_id, params in configs:
+            try:
+                run = graph.run(image.path, to_overrides(params))
+            except Exception as e:
+                logger.debug("Trial %d failed on %s: %s", trial_id, image.path, e)
+                rows.append((trial_id, 0, 0, len(image.texts), 0.0, 0.0, True))
+                continue
+            for stage, ms in run.timings_ms.items():
+                stage_ms[run.keys[stage]] = ms
+            latency = sum(stage_ms.get(key, 0.0) for key in run.keys.values())
+            rows.append((trial_id, *score_texts(run.outputs['ocr'].texts, image.texts),
+                         latency, False))
+    return rows
+
+
+def _sort_for_cache(configs: List[Tuple[int, Dict]], stage_order: Sequence[str]):
+    """Order configurations so those sharing early-stage parameters are adjacent."""
+    def key(item):
+        params = item[1]
+        names = sorted(params, key=lambda n: (stage_order.index(n.split('.', 1)[0])
+                                              if n.split('.', 1)[0] in stage_order else 99, n))
+        return [json.dumps(params[n], sort_keys=True) for n in names]
+    return sorted(configs, key=key)
+
+
+# ----------------------------------------------------------------------
+# Tuner
+# ----------------------------------------------------------------------
+
+class ParameterTuner:
+    """
+    Evaluate configurations on a labelled set in parallel.
+
+    Usage:
+        tuner = ParameterTuner(load_manifest('labels.jsonl'), workers=4)
+        trials = tuner.search(DEFAULT_SPACE, mode='halving', trials=48)
+        front = tuner.pareto_front(trials)
+    """
+
+    STAGE_ORDER = ['clahe', 'bilateral', 'adaptive_threshold', 'morphology', 'deskew', 'ocr']
+
+    def __init__(self, images: List[LabelledImage], config: Optional[Dict] = None,
+                 engine: Optional[str] = None, workers: int = 1, cache_mb: float = 512.0):
+        """
+        Args:
+            images: Labelled set
+            config: Base configuration (parameters not being tuned)
+            engine: OCR engine name (see main.py --engine)
+            workers: Worker processes (each loads the model once)
+            cache_mb: Stage cache size per worker
+        """
+        if not images:
+            raise ValueError("Labelled set is empty")
+        self.images = images
+        self.config = config or {}
+        self.engine = engine
+        self.workers = max(1, workers)
+        self.cache_mb = cache_mb
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._graph = None          # in-process graph when workers == 1
+        self._stage_ms: Dict[str, float] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def evaluate(self, configs: List[Dict], images: Optional[List[LabelledImage]] = None,
+                 first_id: int = 0) -> List[Trial]:
+        """Score configurations on images (default: the whole set)."""
+        images = images or self.images
+        numbered = _sort_for_cache(list(enumerate(configs, first_id)), self.STAGE_ORDER)
+
+        if self.workers == 1:
+            if self._graph is None:
+                self._graph = _build_graph(self.config, self.engine, self.cache_mb)
+            rows = _evaluate(self._graph, self._stage_ms, images, numbered)
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker,
+                    initargs=(self.config, self.engine, self.cache_mb)
+                )
+            # Same image always goes to the same chunk position; chunks
+            # are strided so slow and fast images spread over workers
+            chunks = [images[i::self.workers] for i in range(self.workers)]
+            futures = [self._pool.submit(_evaluate_in_worker, chunk, numbered)
+                       for chunk in chunks if chunk]
+            rows = [row for future in futures for row in future.result()]
+
+        return self._aggregate(rows, dict(enumerate(configs, first_id)), len(images))
+
+    @staticmethod
+    def _aggregate(rows: Iterable[Tuple], configs: Dict[int, Dict], image_count: int) -> List[Trial]:
+        totals = {tid: np.zeros(6) for tid in configs}
+        for tid, matches, predicted, expected, char_sum, latency, error in rows:
+            totals[tid] += (matches, predicted, expected, char_sum, latency, error)
+
+        trials = []
+        for tid, (matches, predicted, expected, char_sum, latency, errors) in totals.items():
+            precision = matches / predicted if predicted else 0.0
+            recall = matches / expected if expected else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            # Reason: failed images have no latency; counting them as 0 ms
+            # would make a failing configuration look faster
+            succeeded = image_count - errors
+            trials.append(Trial(
+                tid, configs[tid], round(float(f1), 4),
+                round(float(char_sum / expected), 4) if expected else 0.0,
+                round(float(latency / succeeded), 1) if succeeded else 0.0,
+                image_count, int(errors)
+            ))
+        return trials
+
+    def search(self, space: Dict[str, List], mode: str = 'grid', trials: int = 32,
+               eta: int = 3, seed: int = 0) -> List[Trial]:
+        """
+        Run a search.
+
+        Args:
+            space: {"stage.param": [values]}
+            mode: 'grid' (all combinations), 'random' (`trials` samples) or
+                  'halving' (`trials` samples, successive halving)
+            eta: Halving factor: each rung keeps 1/eta of the configurations
+                 and evaluates them on eta times as many images
+            seed: Random seed for sampling and image order
+
+        Returns:
+            Trials of the last round (all evaluated on the whole set)
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}' (choose from: {', '.join(SEARCH_MODES)})")
+        configs = grid_configs(space) if mode == 'grid' else random_configs(space, trials, seed)
+        logger.info(f"Tuning {len(configs)} configuration(s) on {len(self.images)} image(s), "
+                    f"{mode} search, {self.workers} worker(s)")
+
+        if mode != 'halving':
+            return self.evaluate(configs)
+        return self._successive_halving(configs, eta, seed)
+
+    def _successive_halving(self, configs: List[Dict], eta: int, seed: int) -> List[Trial]:
+        """
+        Successive halving on image budget.
+
+        Survivors are chosen by Pareto rank, then accuracy, so fast
+        configurations are not discarded only for being slightly less
+        accurate. Configurations that failed on any image are ranked
+        after all others (fewest failures first).
+        """
+        images = list(self.images)
+        random.Random(seed).shuffle(images)
+        rungs = max(0, int(math.log(len(configs), eta))) if len(configs) > 1 else 0
+        budget = max(1, len(images) // (eta ** rungs))
+
+        next_id = 0
+        while True:
+            subset = images[:budget]
+            trials = self.evaluate(configs, subset, first_id=next_id)
+            next_id += len(configs)
+            logger.info(f"Halving rung: {len(configs)} configuration(s) on {len(subset)} image(s)")
+            if budget >= len(images) or len(configs) <= 1:
+                if budget < len(images):
+                    trials = self.evaluate(configs, first_id=next_id)
+                return trials
+
+            valid = [i for i, t in enumerate(trials) if not t.errors]
+            ranks = dict.fromkeys(range(len(trials)), len(trials))
+            ranks.update(zip(valid, pareto_ranks([trials[i] for i in valid])))
+            order = sorted(range(len(trials)),
+                           key=lambda i: (ranks[i], trials[i].errors,
+                                          -trials[i].accuracy, trials[i].latency_ms))
+            keep = max(1, math.ceil(len(configs) / eta))
+            configs = [trials[i].params for i in order[:keep]]
+            budget = min(len(images), budget * eta)
+
+    @staticmethod
+    def pareto_front(trials: Sequence[Trial]) -> List[Trial]:
+        """Non-dominated trials, most accurate first."""
+        valid = [t for t in trials if not t.errors]
+        ranks = pareto_ranks(valid)
+        front = [t for t, r in zip(valid, ranks) if r == 0]
+        return sorted(front, key=lambda t: (-t.accuracy, t.latency_ms))
+
+
+def write_report(trials: Sequence[Trial], front: Sequence[Trial], output_dir: str,
+                 base_config: Optional[Dict] = None) -> Path:
+    """
+    Write tuning_report.json and one config per Pareto configuration.
+
+    Configs are named pareto_<k>.yaml, k = 0 being the most accurate.
+
+    Returns:
+        Path of the report
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    for k, trial in enumerate(front):
+        with open(out / f"pareto_{k}.yaml", 'w', encoding='utf-8') as f:
+            f.write(f"# Tuned: accuracy (F1) {trial.accuracy:.3f}, "
+                    f"{trial.latency_ms:.0f} ms/image on {trial.images} image(s)\n")
+            yaml.safe_dump(to_config(trial.params, base_config), f, sort_keys=False)
+
+    report_path = out / 'tuning_report.json'
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'pareto_front': [t._asdict() for t in front],
+            'trials': [t._asdict() for t in sorted(trials, key=lambda t: -t.accuracy)],
+        }, f, indent=2)
+    return report_path
+
+
+def main():
+    """
+    Tuning CLI.
+
+    Usage examples:
+    - python tuner.py --manifest labels.jsonl --search grid --workers 4
+    - python tuner.py --manifest labels.jsonl --space space.yaml --search halving --trials 81
+    """
+    parser = argparse.ArgumentParser(description='Accuracy vs. latency parameter tuning')
+    parser.add_argument('--manifest', type=str, required=True, help='Labelled set (JSONL)')
+    parser.add_argument('--space', type=str, help='Search space YAML (default: built-in)')
+    parser.add_argument('--search', type=str, default='grid', choices=SEARCH_MODES,
+                        help='Search strategy (default: grid)')
+    parser.add_argument('--trials', type=int, default=32,
+                        help='Configurations sampled for random/halving search')
+    parser.add_argument('--eta', type=int, default=3, help='Successive halving factor')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes')
+    parser.add_argument('--config', type=str, help='Base YAML configuration')
+    parser.add_argument('--engine', type=str, help='OCR engine (see main.py --engine)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--out', type=str, default='outputs/tuning', help='Report directory')
+    args = parser.parse_args()
+
+    from main import load_config
+    base_config = load_config(args.config) if args.config else {}
+    images = load_manifest(args.manifest)
+    space = load_space(args.space)
+
+    start = time.perf_counter()
+    with ParameterTuner(images, config=base_config, engine=args.engine,
+                        workers=args.workers) as tuner:
+        trials = tuner.search(space, mode=args.search, trials=args.trials,
+                              eta=args.eta, seed=args.seed)
+    front = ParameterTuner.pareto_front(trials)
+    report = write_report(trials, front, args.out, base_config)
+
+    print(f"\n{len(trials)} configuration(s) scored in {time.perf_counter() - start:.1f} s")
+    print(f"{'#':>3}  {'F1':>6}  {'chars':>6}  {'ms/img':>8}  parameters")
+    for k, trial in enumerate(front):
+        params = ', '.join(f"{n}={v}" for n, v in trial.params.items())
+        print(f"{k:>3}  {trial.accuracy:6.3f}  {trial.char_accuracy:6.3f}  "
+              f"{trial.latency_ms:8.1f}  {params}")
+    print(f"\nReport: {report}; configs: {Path(args.out) / 'pareto_<#>.yaml'}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+Watch-Folder Ingestion for Industrial OCR System
+=================================================
+Daemon mode: a resident pipeline processing images as they arrive
+
+Why:
+- Handheld scanners drop images into a folder throughout the shift; a
+  cron-driven --batch run adds minutes of latency and reloads the model
+  on every run
+- The daemon keeps one IndustrialOCRSystem (model loaded once) and
+  processes each file within about a second of it being complete
+
+Key Features:
+- inotify (optional inotify_simple package) wakes the daemon as soon as a
+  file is closed or moved in; polling covers other platforms and network
+  shares (remote writes never raise local inotify events)
+- Debounce: a file is ready when the writer closed it, or when its size
+  and mtime have not changed for settle_seconds
+- Processed files are moved to processed/ (failures to failed/) inside
+  the watched folder, or marked with a .done sidecar
+- End-to-end latency per file (arrival -> result) appended to
+  <output_dir>/ingest_latency.jsonl, p50/p95 logged on shutdown
+- With --profile, the profile is written every profile_every files and
+  on shutdown (one file set per interval instead of an unbounded one)
+
+Usage:
+- python main.py --watch /data/drop
+- python main.py --watch /data/drop1 /data/drop2 --config config.yaml
+"""
+
+import os
+import json
+import time
+import signal
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+PROCESSED_DIR = 'processed'
+FAILED_DIR = 'failed'
+DONE_SUFFIX = '.done'
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+
+class ReadyFile(NamedTuple):
+    """A completely written image and when it first appeared."""
+    path: Path
+    arrived: float
+
+
+class _FileState:
+    __slots__ = ('size', 'mtime', 'first_seen', 'stable_since', 'closed')
+
+    def __init__(self, size: int, mtime: float, first_seen: float):
+        self.size = size
+        self.mtime = mtime
+        self.first_seen = first_seen
+        self.stable_since = first_seen
+        self.closed = False
+
+
+class FolderWatcher:
+    """
+    Detect new, completely written images in one or more folders.
+
+    Usage:
+        watcher = FolderWatcher(['/data/drop'])
+        while True:
+            for ready in watcher.poll():
+                ...
+                watcher.forget(ready.path)
+    """
+
+    def __init__(self, folders: Sequence[str], recursive: bool = False,
+                 poll_interval: float = 1.0, settle_seconds: float = 2.0,
+                 use_inotify: bool = True, mark_done: bool = False):
+        """
+        Args:
+            folders: Folders to watch
+            recursive: Include subfolders (processed/ and failed/ excluded)
+            poll_interval: Seconds between scans (also the inotify timeout)
+            settle_seconds: Unchanged size/mtime time that marks a file as
+                            complete when no close event was seen
+            use_inotify: Use inotify_simple if installed
+            mark_done: Skip files that have a .done sidecar
+        """
+        self.folders = [Path(f) for f in folders]
+        for folder in self.folders:
+            if not folder.is_dir():
+                raise FileNotFoundError(f"Watch folder not found: {folder}")
+        self.recursive = recursive
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.mark_done = mark_done
+
+        self._states: Dict[Path, _FileState] = {}
+        self._emitted = set()
+        self._startup = True
+
+        self._inotify = None
+        self._watches: Dict[int, Path] = {}
+        if use_inotify and INotify is not None:
+            self._inotify = INotify()
+            mask = inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE
+            for folder in self.folders:
+                dirs = [folder] + ([d for d in folder.rglob('*') if d.is_dir()
+                                    and not self._excluded(d)] if recursive else [])
+                for d in dirs:
+                    self._watches[self._inotify.add_watch(str(d), mask)] = d
+        logger.info(f"Watching {', '.join(map(str, self.folders))} "
+                    f"({'inotify' if self._inotify else 'polling'}, every {poll_interval:g} s)")
+
+    @staticmethod
+    def _excluded(path: Path) -> bool:
+        return PROCESSED_DIR in path.parts or FAILED_DIR in path.parts
+
+    def _wait(self):
+        """Block until an event arrives or poll_interval passes."""
+        if self._inotify is None:
+            time.sleep(self.poll_interval)
+            return
+        now = time.time()
+        for event in self._inotify.read(timeout=int(self.poll_interval * 1000)):
+            folder = self._watches.get(event.wd)
+            if folder is None or not event.name:
+                continue
+            path = folder / event.name
+            state = self._states.get(path)
+            if event.mask & (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO):
+                # Writer finished: record the final size so the next scan
+                # does not mistake it for a change
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                if state is None:
+                    state = self._states[path] = _FileState(st.st_size, st.st_mtime, now)
+                state.size, state.mtime, state.closed = st.st_size, st.st_mtime, True
+            elif state is None and event.mask & inotify_flags.CREATE:
+                # Arrival time from the create event, before any scan
+                self._states[path] = _FileState(-1, 0.0, now)
+
+    def _candidates(self):
+        for folder in self.folders:
+            entries = folder.rglob('*') if self.recursive else folder.iterdir()
+            for path in entries:
+                if path.suffix.lower() not in IMAGE_EXTENSIONS or path.name.startswith('.'):
+                    continue
+                if self.recursive and self._excluded(path.relative_to(folder)):
+                    continue
+                if self.mark_done and path.with_name(path.name + DONE_SUFFIX).exists():
+                    continue
+                yield path
+
+    def poll(self) -> List[ReadyFile]:
+        """
+        Wait up to poll_interval, then return files that became ready.
+
+        Files already present at startup are returned on the first call
+        (backlog), with their mtime as arrival time.
+        """
+        if not self._startup:
+            self._wait()
+        now = time.time()
+        seen = set()
+        ready = []
+
+        for path in self._candidates():
+            seen.add(path)
+            if path in self._emitted:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # moved/deleted between listing and stat
+
+            state = self._states.get(path)
+            if state is None:
+                # Backlog files count as stable since their last write,
+                # so old files are ready at once and fresh ones still settle
+                first_seen = min(now, st.st_mtime) if self._startup else now
+                state = self._states[path] = _FileState(st.st_size, st.st_mtime, first_seen)
+            elif (st.st_size, st.st_mtime) != (state.size, state.mtime):
+                if state.size >= 0:
+                    # Still being written: restart the settle timer
+                    state.closed = False
+                state.size, state.mtime, state.stable_since = st.st_size, st.st_mtime, now
+
+            settled = now - state.stable_since >= self.settle_seconds
+            if state.size > 0 and (state.closed or settled):
+                ready.append(ReadyFile(path, state.first_seen))
+                self._emitted.add(path)
+
+        # Forget files that disappeared without being handled
+        for path in list(self._states):
+            if path not in seen and path not in self._emitted:
+                del self._states[path]
+
+        self._startup = False
+        return sorted(ready, key=lambda r: r.arrived)
+
+    def forget(self, path: Path):
+        """Drop bookkeeping for a handled file."""
+        self._emitted.discard(path)
+        self._states.pop(path, None)
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+
+
+class IngestDaemon:
+    """
+    Feed watched folders into a resident IndustrialOCRSystem.
+
+    Key Features:
+    - One model load for the whole shift
+    - Files handled in arrival order; moved or marked when done
+    - Latency record per file: queue wait, processing, end-to-end
+    - SIGINT/SIGTERM finish the current image, then stop
+    """
+
+    def __init__(self, ocr_system, watcher: FolderWatcher, mode: str = 'move',
+                 latency_log: Optional[str] = None, profile_every: int = 500):
+        """
+        Args:
+            ocr_system: IndustrialOCRSystem (already initialized)
+            watcher: FolderWatcher over the drop folders
+            mode: 'move' (processed/ and failed/ subfolders) or 'mark'
+                  (.done sidecar next to the image, file stays in place)
+            latency_log: JSONL path (default <output_dir>/ingest_latency.jsonl)
+            profile_every: Files per written profile when the system's
+                           profiler is enabled
+        """
+        if mode not in ('move', 'mark'):
+            raise ValueError(f"Unknown ingest mode '{mode}' (choose from: move, mark)")
+        self.ocr_system = ocr_system
+        self.watcher = watcher
+        self.mode = mode
+        self.latency_log = Path(latency_log or Path(ocr_system.output_dir) / 'ingest_latency.jsonl')
+        self.latencies_ms: List[float] = []
+        self.processed = 0
+        self.failed = 0
+        self.undisposed = 0
+        self.profile_every = max(1, int(profile_every))
+        self._unprofiled = 0
+        self._profile_parts = 0
+        self._stop = threading.Event()
+
+    def stop(self, *_):
+        """Request shutdown after the current image."""
+        self._stop.set()
+
+    def run(self, max_files: Optional[int] = None):
+        """
+        Process files until stopped.
+
+        Args:
+            max_files: Stop after this many files (None: run until signalled)
+        """
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+
+        logger.info("Ingest daemon started")
+        try:
+            while not self._stop.is_set():
+                for ready in self.watcher.poll():
+                    if self._stop.is_set():
+                        break
+                    self._handle(ready)
+                    if max_files is not None and self.processed + self.failed >= max_files:
+                        self._stop.set()
+        finally:
+            self.watcher.close()
+            if self._unprofiled:
+                self._write_profile()
+            logger.info(f"Ingest daemon stopped: {self.summary()}")
+
+    def _write_profile(self):
+        """Write and reset the samples of the files since the last write."""
+        self._profile_parts += 1
+        self.ocr_system.profiler.write(
+            f"profile_ingest_{time.strftime('%Y%m%d_%H%M%S')}_{self._profile_parts:04d}")
+        self._unprofiled = 0
+
+    def _handle(self, ready: ReadyFile):
+        started = time.time()
+        result = self.ocr_system.process_image(str(ready.path))
+        finished = time.time()
+        ok = result is not None
+
+        record = {
+            'file': str(ready.path),
+            'status': 'done' if ok else 'failed',
+            'arrived': round(ready.arrived, 3),
+            'queue_wait_ms': round((started - ready.arrived) * 1000, 1),
+            'processing_ms': round((finished - started) * 1000, 1),
+            'end_to_end_ms': round((finished - ready.arrived) * 1000, 1),
+        }
+        if ok:
+            record['detections'] = result['metadata']['total_detections']
+            self.processed += 1
+            self.latencies_ms.append(record['end_to_end_ms'])
+        else:
+            self.failed += 1
+
+        if self._dispose(ready.path, ok, record):
+            self.watcher.forget(ready.path)
+        else:
+            # Reason: the file is still in the inbox (read-only or locked
+            # share); forgetting it would hand it out again on the next
+            # poll, so it stays handled for the lifetime of the daemon
+            record['disposed'] = False
+            self.undisposed += 1
+
+        self.latency_log.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.latency_log, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        logger.info(f"Ingested {ready.path.name}: {record['status']}, "
+                    f"end-to-end {record['end_to_end_ms']:.0f} ms")
+
+        # Reason: samples accumulate until written; a shift-long daemon
+        # would otherwise hold them all and lose them on a crash
+        if self.ocr_system.profiler.enabled:
+            self._unprofiled += 1
+            if self._unprofiled >= self.profile_every:
+                self._write_profile()
+
+    def _dispose(self, path: Path, ok: bool, record: Dict) -> bool:
+        """Move or mark a handled file (False if that failed)."""
+        try:
+            if self.mode == 'mark':
+                with open(path.with_name(path.name + DONE_SUFFIX), 'w', encoding='utf-8') as f:
+                    json.dump(record, f)
+                return True
+            target_dir = path.parent / (PROCESSED_DIR if ok else FAILED_DIR)
+            target_dir.mkdir(exist_ok=True)
+            target = target_dir / path.name
+            if target.exists():
+                target = target_dir / f"{path.stem}_{int(time.time() * 1000)}{path.suffix}"
+            os.replace(path, target)
+            record['moved_to'] = str(target)
+            return True
+        except OSError as e:
+            logger.error(f"Could not move/mark {path}: {e} (not processed again by this daemon)")
+            return False
+
+    def summary(self) -> Dict:
+        """Counts and end-to-end latency percentiles (ms)."""
+        summary = {'processed': self.processed, 'failed': self.failed}
+        if self.undisposed:
+            summary['undisposed'] = self.undisposed
+        if self.latencies_ms:
+            latencies = np.asarray(self.latencies_ms)
+            summary['p50_ms'] = round(float(np.percentile(latencies, 50)), 1)
+            summary['p95_ms'] = round(float(np.percentile(latencies, 95)), 1)
+        return summary
@@ -0,0 +1,255 @@
+"""
+Forked Worker Pool for Industrial OCR System
+=============================================
+Several job-queue workers sharing one copy of the model weights
+
+Why:
+- Every `job_queue.py work` process builds its own IndustrialOCRSystem,
+  so 8 workers hold 8 copies of the CRAFT + CRNN weights
+- Loaded once in a parent and then forked, the weights are copy-on-write
+  pages: shared until written, and inference only reads them
+
+How:
+1. The parent builds IndustrialOCRSystem (loads the model) and runs no
+   inference itself
+2. gc.collect() + gc.freeze() before forking: preloaded objects move to
+   the permanent generation, so the cyclic GC in the children never
+   writes to (and thereby copies) their pages
+3. Each child opens its own JobQueue connection and runs run_worker()
+4. A child exits after recycle_after jobs (contains leaks and allocator
+   fragmentation); the parent forks a replacement from its clean state
+5. The parent samples RSS / PSS / USS of every child; PSS divides shared
+   pages between their sharers, so the sum of PSS is the real footprint
+   while the sum of RSS counts the weights once per worker
+
+Technical Note:
+- Needs the fork start method (Linux, macOS); on Windows run several
+  `job_queue.py work` processes instead
+- CPU only: a CUDA context does not survive fork
+- Reference count updates still dirty the pages holding Python object
+  headers (small); tensor storage lives in separate buffers that are
+  only read
+- Child thread pools (torch, OpenCV) are started after the fork; the
+  parent must not run inference before forking
+- One torch thread per child by default (cores are shared between workers)
+- Logging keeps working in the children: log_config restarts the queue
+  listener after fork (records go to the same file / console)
+- With a MemoryBudget, the worker count is capped to what fits next to
+  the parent: (limit - parent RSS - reserve) / per_worker_mb, where
+  per_worker_mb is the private (unshared) memory of one worker
+
+Usage:
+    python job_queue.py --db queue.db work --workers 8 --recycle-after 500
+"""
+
+import gc
+import os
+import sys
+import time
+import socket
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional
+
+from job_queue import JobQueue, run_worker
+from log_config import shutdown_logging
+from memory_budget import MemoryBudget, process_memory_mb
+
+logger = logging.getLogger(__name__)
+
+
+def _child_main(pool: 'ForkedWorkerPool', exit_when_empty: bool, poll_interval: float):
+    """Worker process body (runs in the forked child)."""
+    threads = pool.threads
+    if threads:
+        torch = sys.modules.get('torch')
+        if torch is not None:
+            torch.set_num_threads(threads)
+        cv2 = sys.modules.get('cv2')
+        if cv2 is not None:
+            cv2.setNumThreads(threads)
+
+    # Own connection: sqlite3 connections must not cross a fork
+    queue = JobQueue(pool.db_path, lease_seconds=pool.lease_seconds,
+                     max_attempts=pool.max_attempts)
+    try:
+        run_worker(queue, pool.ocr_system, exit_when_empty=exit_when_empty,
+                   poll_interval=poll_interval, max_jobs=pool.recycle_after)
+    finally:
+        queue.close()
+        # Reason: the child leaves through os._exit (no atexit handlers),
+        # so its log listener must be flushed here
+        shutdown_logging()
+
+
+class ForkedWorkerPool:
+    """
+    Fork job-queue workers from a parent holding the loaded model.
+
+    Usage:
+        ocr_system = IndustrialOCRSystem(config=config)   # loads weights
+        pool = ForkedWorkerPool('queue.db', ocr_system, workers=8, recycle_after=500)
+        report = pool.run(exit_when_empty=True)
+    """
+
+    def __init__(self, db_path: str, ocr_system, workers: int = 4,
+                 recycle_after: Optional[int] = 200, threads: Optional[int] = 1,
+                 lease_seconds: float = 300.0, max_attempts: int = 3,
+                 sample_interval: float = 2.0,
+                 memory_budget: Optional[MemoryBudget] = None,
+                 per_worker_mb: float = 800.0):
+        """
+        Args:
+            db_path: Job queue database
+            ocr_system: Initialized IndustrialOCRSystem (model loaded, CPU)
+            workers: Concurrent worker processes
+            recycle_after: Jobs per worker process before it is replaced
+                           (None: never recycle)
+            threads: torch/OpenCV threads per worker (None: library default)
+            lease_seconds, max_attempts: As for JobQueue
+            sample_interval: Seconds between worker memory samples
+            memory_budget: Machine memory limit; fewer workers are forked
+                           if `workers` would not fit
+            per_worker_mb: Private memory of one worker (image buffers,
+                           detector activations; the model is shared)
+        """
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("ForkedWorkerPool needs the fork start method "
+                               "(not available on this platform)")
+        self.db_path = str(db_path)
+        self.ocr_system = ocr_system
+        self.workers = max(1, int(workers))
+        self.recycle_after = recycle_after
+        self.threads = threads
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.sample_interval = sample_interval
+        self.memory_budget = memory_budget
+        self.per_worker_mb = per_worker_mb
+
+        self.records: List[Dict] = []
+        self.peak_total = {'rss_mb': 0.0, 'pss_mb': 0.0}
+        self._context = multiprocessing.get_context('fork')
+
+    def _spawn(self, slot: int, exit_when_empty: bool, poll_interval: float):
+        process = self._context.Process(
+            target=_child_main, args=(self, exit_when_empty, poll_interval),
+            name=f'ocr-worker-{slot}', daemon=False
+        )
+        process.start()
+        record = {
+            'worker': f"{socket.gethostname()}:{process.pid}",
+            'slot': slot,
+            'pid': process.pid,
+            'started_at': time.time(),
+            'exit_code': None,
+            'jobs': 0,
+            'failed': 0,
+            'rss_mb': None, 'pss_mb': None, 'uss_mb': None, 'shared_mb': None,
+            'peak_rss_mb': 0.0,
+            'peak_pss_mb': 0.0,
+        }
+        self.records.append(record)
+        logger.debug("Started worker %s (slot %d)", record['worker'], slot)
+        return process, record
+
+    def _sample(self, live: Dict):
+        """Record current and peak memory of the live workers and the parent."""
+        parent = process_memory_mb()
+        total_rss = parent['rss_mb'] or 0.0
+        total_pss = parent['pss_mb'] or 0.0
+        for _, record in live.values():
+            memory = process_memory_mb(record['pid'])
+            if not memory['rss_mb']:
+                continue    # exited (zombie) between wait() and sampling
+            record.update(memory)
+            record['peak_rss_mb'] = max(record['peak_rss_mb'], memory['rss_mb'])
+            if memory['pss_mb'] is not None:
+                record['peak_pss_mb'] = max(record['peak_pss_mb'], memory['pss_mb'])
+            total_rss += memory['rss_mb']
+            total_pss += memory['pss_mb'] or 0.0
+        self.peak_total['rss_mb'] = round(max(self.peak_total['rss_mb'], total_rss), 1)
+        self.peak_total['pss_mb'] = round(max(self.peak_total['pss_mb'], total_pss), 1)
+
+    def _finish(self, process, record: Dict):
+        """Exit code and job counts of a stopped worker."""
+        process.join()
+        record['exit_code'] = process.exitcode
+        record['ended_at'] = time.time()
+        with JobQueue(self.db_path, lease_seconds=self.lease_seconds) as queue:
+            for row in queue.status()['workers']:
+                if row['worker'] == record['worker']:
+                    record['jobs'] = row['processed']
+                    record['failed'] = row['failed']
+        logger.info(f"Worker {record['worker']} exited ({record['exit_code']}) after "
+                    f"{record['jobs']} job(s), peak RSS {record['peak_rss_mb']:.0f} MB / "
+                    f"PSS {record['peak_pss_mb']:.0f} MB")
+
+    def _has_work(self) -> bool:
+        with JobQueue(self.db_path, lease_seconds=self.lease_seconds) as queue:
+            return queue.runnable() > 0
+
+    def run(self, exit_when_empty: bool = True, poll_interval: float = 5.0) -> Dict:
+        """
+        Run workers until the queue is drained (or forever).
+
+        Args:
+            exit_when_empty: Stop when nothing is runnable; otherwise
+                             workers poll and are recycled indefinitely
+            poll_interval: Empty-queue poll interval of the workers
+
+        Returns:
+            report() dict
+        """
+        # Step 1: Freeze the preloaded heap
+        # Reason: GC passes in the children would otherwise touch every
+        # tracked object of the model and un-share those pages
+        gc.collect()
+        gc.freeze()
+        if self.memory_budget is not None:
+            fit = self.memory_budget.worker_count(self.workers, self.per_worker_mb)
+            if fit < self.workers:
+                logger.warning(f"Memory budget {self.memory_budget.limit_mb:.0f} MB: "
+                               f"{fit} of {self.workers} worker(s) fit "
+                               f"({self.per_worker_mb:.0f} MB each)")
+                self.workers = fit
+        logger.info(f"Forking {self.workers} worker(s) from parent {os.getpid()} "
+                    f"(RSS {process_memory_mb()['rss_mb']} MB, {gc.get_freeze_count()} objects frozen)")
+
+        live: Dict[int, tuple] = {}
+        try:
+            for slot in range(self.workers):
+                live[slot] = self._spawn(slot, exit_when_empty, poll_interval)
+
+            # Step 2: Supervise - sample memory, replace recycled workers
+            while live:
+                sentinels = {process.sentinel: slot for slot, (process, _) in live.items()}
+                ready = wait(list(sentinels), timeout=self.sample_interval)
+                self._sample(live)
+                for sentinel in ready:
+                    slot = sentinels[sentinel]
+                    process, record = live.pop(slot)
+                    self._finish(process, record)
+                    if not exit_when_empty or self._has_work():
+                        live[slot] = self._spawn(slot, exit_when_empty, poll_interval)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted; stopping workers (their leases expire and are reclaimed)")
+            for process, record in live.values():
+                process.terminate()
+            for process, record in live.values():
+                self._finish(process, record)
+        finally:
+            gc.unfreeze()
+
+        return self.report()
+
+    def report(self) -> Dict:
+        """Per-worker memory and job counts plus peak totals (parent + live workers)."""
+        return {
+            'parent': process_memory_mb(),
+            'workers': list(self.records),
+            'peak_total_rss_mb': self.peak_total['rss_mb'],
+            'peak_total_pss_mb': self.peak_total['pss_mb'],
+            'jobs': sum(r['jobs'] for r in self.records),
+        }